@@ -79,6 +79,40 @@ func (fm *FirewallManager) CreateIPSet(name string, maxElem int) error {
 	return nil
 }
 
+// CreateTimeoutIPSet creates a new ipset with per-element timeout support
+// (default timeout 0: elements added without a timeout never expire)
+func (fm *FirewallManager) CreateTimeoutIPSet(name string, maxElem int) error {
+	cmd := exec.Command("ipset", "create", name, "hash:net", "maxelem", fmt.Sprintf("%d", maxElem), "timeout", "0", "-exist")
+	output, err := cmd.CombinedOutput()
+	if err != nil {
+		fm.logger.Log("error", "ipset_create_failed", map[string]interface{}{
+			"name":   name,
+			"error":  err.Error(),
+			"output": string(output),
+		})
+		return err
+	}
+	return nil
+}
+
+// IPSetHasTimeout reports whether a set exists and was created with timeout support
+func (fm *FirewallManager) IPSetHasTimeout(name string) bool {
+	output, err := exec.Command("ipset", "list", "-t", name).CombinedOutput()
+	if err != nil {
+		return false
+	}
+	for _, line := range strings.Split(string(output), "\n") {
+		if strings.HasPrefix(line, "Header:") {
+			for _, field := range strings.Fields(line) {
+				if field == "timeout" {
+					return true
+				}
+			}
+		}
+	}
+	return false
+}
+
 // AddIPToSet adds an IP to an ipset
 func (fm *FirewallManager) AddIPToSet(setName, ip string) error {
 	cmd := exec.Command("ipset", "add", setName, ip, "-exist")
@@ -95,6 +129,23 @@ func (fm *FirewallManager) AddIPToSet(setName, ip string) error {
 	return nil
 }
 
+// AddIPToSetWithTimeout adds an IP to a timeout-enabled ipset; the kernel
+// removes it after the given number of seconds
+func (fm *FirewallManager) AddIPToSetWithTimeout(setName, ip string, seconds int) error {
+	cmd := exec.Command("ipset", "add", setName, ip, "timeout", fmt.Sprintf("%d", seconds), "-exist")
+	output, err := cmd.CombinedOutput()
+	if err != nil {
+		fm.logger.Log("error", "ipset_add_failed", map[string]interface{}{
+			"set":    setName,
+			"ip":     ip,
+			"error":  err.Error(),
+			"output": string(output),
+		})
+		return err
+	}
+	return nil
+}
+
 // RemoveIPFromSet removes an IP from an ipset
 func (fm *FirewallManager) RemoveIPFromSet(setName, ip string) error {
 	cmd := exec.Command("ipset", "del", setName, ip, "-exist")
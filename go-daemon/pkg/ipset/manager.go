@@ -11,6 +11,7 @@ import (
 	"fmt"
 	"os"
 	"sync"
+	"time"
 )
 
 type BlacklistEntry struct {
@@ -24,6 +25,7 @@ type Manager struct {
 	logger        Logger
 	temporarySets []string
 	nextTempSet   int
+	timeoutSets   bool
 	mu            sync.Mutex
 }
 
@@ -33,6 +35,7 @@ const (
 	SearchEngineSetName   = "ukabu-search-engines"
 	TemporarySetPrefix    = "ukabu-temporary_"
 	MaxIPsPerTemporarySet = 20000 // Increased from 10000 to 20000
+	MaxIPSetTimeout       = 2147483 // Largest per-element timeout ipset accepts (seconds)
 )
 
 func NewManager(fw *FirewallManager, logger Logger) *Manager {
@@ -84,7 +87,16 @@ func (m *Manager) Initialize() error {
 
 func (m *Manager) createTemporarySet(index int) error {
 	setName := fmt.Sprintf("%s%d", TemporarySetPrefix, index)
-	if err := m.fw.CreateIPSet(setName, MaxIPsPerTemporarySet); err != nil {
+	// Sets converted by `ukabu-manager blacklist migrate-timeouts` keep
+	// timeout support, and so do the sets created after them
+	if index == 0 {
+		m.timeoutSets = m.fw.IPSetHasTimeout(setName)
+	}
+	create := m.fw.CreateIPSet
+	if m.timeoutSets {
+		create = m.fw.CreateTimeoutIPSet
+	}
+	if err := create(setName, MaxIPsPerTemporarySet); err != nil {
 		return err
 	}
 	m.temporarySets = append(m.temporarySets, setName)
@@ -134,52 +146,162 @@ func (m *Manager) AddIP(setName, ip string) error {
 	return m.fw.AddIPToSet(setName, ip)
 }
 
+// AddTemporaryIP adds an IP to a temporary set; with timeout-enabled sets
+// the kernel releases it when the lockout ends
+func (m *Manager) AddTemporaryIP(setName, ip string, lockout time.Duration) error {
+	if !m.timeoutSets {
+		return m.fw.AddIPToSet(setName, ip)
+	}
+	seconds := int(lockout.Seconds())
+	if seconds > MaxIPSetTimeout {
+		seconds = MaxIPSetTimeout
+	} else if seconds < 1 {
+		// A timeout of 0 would make the entry permanent
+		seconds = 1
+	}
+	return m.fw.AddIPToSetWithTimeout(setName, ip, seconds)
+}
+
 // RemoveIP removes an IP from the specified set
 func (m *Manager) RemoveIP(setName, ip string) error {
 	return m.fw.RemoveIPFromSet(setName, ip)
 }
 
-// LoadBlacklist loads IPs from ip_blacklist.conf
-func (m *Manager) LoadBlacklist(path string) error {
+// journalOp is one line of the blacklist journal (ip_blacklist.conf.journal)
+type journalOp struct {
+	Op        string          `json:"op"`
+	Entry     *BlacklistEntry `json:"entry"`
+	IPAddress string          `json:"ip_address"`
+}
+
+// readBlacklist reads the blacklist snapshot and replays its journal.
+// Returns the resulting entries in first-seen order.
+func (m *Manager) readBlacklist(path string) ([]BlacklistEntry, error) {
+	entries := make(map[string]BlacklistEntry)
+	var order []string
+
 	file, err := os.Open(path)
-	if err != nil {
-		if os.IsNotExist(err) {
-			// File doesn't exist yet, that's okay
-			return nil
+	if err != nil && !os.IsNotExist(err) {
+		return nil, err
+	}
+	if err == nil {
+		scanner := bufio.NewScanner(file)
+		scanner.Buffer(make([]byte, 64*1024), 1024*1024)
+		for scanner.Scan() {
+			line := scanner.Text()
+			if line == "" {
+				continue
+			}
+
+			var entry BlacklistEntry
+			if err := json.Unmarshal([]byte(line), &entry); err != nil || entry.IPAddress == "" {
+				m.logger.Log("warn", "blacklist_parse_error", map[string]interface{}{
+					"line": line,
+				})
+				continue
+			}
+			if _, exists := entries[entry.IPAddress]; !exists {
+				entries[entry.IPAddress] = entry
+				order = append(order, entry.IPAddress)
+			}
+		}
+		err = scanner.Err()
+		file.Close()
+		if err != nil {
+			return nil, err
+		}
+	}
+
+	journal, err := os.Open(path + ".journal")
+	if err != nil && !os.IsNotExist(err) {
+		return nil, err
+	}
+	if err == nil {
+		scanner := bufio.NewScanner(journal)
+		scanner.Buffer(make([]byte, 64*1024), 1024*1024)
+		for scanner.Scan() {
+			line := scanner.Text()
+			if line == "" {
+				continue
+			}
+
+			var op journalOp
+			if err := json.Unmarshal([]byte(line), &op); err != nil {
+				// Torn last line from an interrupted append
+				m.logger.Log("warn", "blacklist_journal_parse_error", map[string]interface{}{
+					"line": line,
+				})
+				continue
+			}
+
+			switch op.Op {
+			case "add", "update":
+				if op.Entry == nil || op.Entry.IPAddress == "" {
+					continue
+				}
+				if _, exists := entries[op.Entry.IPAddress]; !exists {
+					order = append(order, op.Entry.IPAddress)
+				}
+				entries[op.Entry.IPAddress] = *op.Entry
+			case "remove":
+				delete(entries, op.IPAddress)
+			case "clear":
+				entries = make(map[string]BlacklistEntry)
+				order = nil
+			}
+		}
+		err = scanner.Err()
+		journal.Close()
+		if err != nil {
+			return nil, err
+		}
+	}
+
+	result := make([]BlacklistEntry, 0, len(entries))
+	for _, ip := range order {
+		if entry, ok := entries[ip]; ok {
+			result = append(result, entry)
+			// Skip duplicates in order after a remove + re-add
+			delete(entries, ip)
 		}
+	}
+	return result, nil
+}
+
+// LoadBlacklist loads IPs from ip_blacklist.conf and its journal
+func (m *Manager) LoadBlacklist(path string) error {
+	entries, err := m.readBlacklist(path)
+	if err != nil {
 		return err
 	}
-	defer file.Close()
 
-	scanner := bufio.NewScanner(file)
 	permanent := 0
 	temporary := 0
 
-	for scanner.Scan() {
-		line := scanner.Text()
-		if line == "" {
-			continue
-		}
-
-		var entry BlacklistEntry
-		if err := json.Unmarshal([]byte(line), &entry); err != nil {
-			m.logger.Log("warn", "blacklist_parse_error", map[string]interface{}{
-				"line":  line,
-				"error": err.Error(),
-			})
-			continue
-		}
+	now := time.Now().UTC()
 
+	for _, entry := range entries {
 		var setName string
+		var err error
 		if entry.LockoutPeriod == 0 {
 			setName = PermanentSetName
 			permanent++
+			err = m.AddIP(setName, entry.IPAddress)
 		} else {
+			lockout := time.Duration(entry.LockoutPeriod) * time.Minute
+			if blockedAt, perr := time.Parse(time.RFC3339, entry.Timestamp); perr == nil {
+				lockout = blockedAt.Add(lockout).Sub(now)
+			}
+			if m.timeoutSets && lockout <= 0 {
+				// Already expired; unjail drops it from the file
+				continue
+			}
 			setName = m.GetAvailableTemporarySet()
 			temporary++
+			err = m.AddTemporaryIP(setName, entry.IPAddress, lockout)
 		}
 
-		if err := m.AddIP(setName, entry.IPAddress); err != nil {
+		if err != nil {
 			m.logger.Log("error", "blacklist_add_failed", map[string]interface{}{
 				"ip":    entry.IPAddress,
 				"error": err.Error(),
@@ -192,7 +314,7 @@ func (m *Manager) LoadBlacklist(path string) error {
 		"temporary": temporary,
 	})
 
-	return scanner.Err()
+	return nil
 }
 
 // GetPermanentSetSize returns the size of the permanent blacklist
@@ -245,7 +245,13 @@ func (t *Tracker) blockIP(ip, domain string, strike *Strike) {
 	}
 
 	// Add to ipset
-	if err := t.ipsetMgr.AddIP(ipsetName, ip); err != nil {
+	var err error
+	if lockoutExpires != nil {
+		err = t.ipsetMgr.AddTemporaryIP(ipsetName, ip, lockoutExpires.Sub(now))
+	} else {
+		err = t.ipsetMgr.AddIP(ipsetName, ip)
+	}
+	if err != nil {
 		t.logger.Log("error", "ipset_add_failed", map[string]interface{}{
 			"ip":     ip,
 			"ipset":  ipsetName,
@@ -260,7 +266,7 @@ func (t *Tracker) blockIP(ip, domain string, strike *Strike) {
 		expiresSQL = lockoutExpires
 	}
 	
-	_, err := t.db.Exec(`
+	_, err = t.db.Exec(`
 		INSERT OR REPLACE INTO blocked_ips 
 		(ip, domain, blocked_at, lockout_expires, reason, ipset_name)
 		VALUES (?, ?, ?, ?, ?, ?)
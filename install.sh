@@ -755,6 +755,7 @@ install_monitor() {
     cp -v $SCRIPT_DIR/systemd/ukabu-ipset-init.service /etc/systemd/system/
     cp -v $SCRIPT_DIR/systemd/ukabu-unjail.service /etc/systemd/system/
     cp -v $SCRIPT_DIR/systemd/ukabu-unjail.timer /etc/systemd/system/
+    cp -v $SCRIPT_DIR/systemd/ukabu-unjail-scheduler.service /etc/systemd/system/
 
     # Create runtime directory
     mkdir -p $UKABU_RUN
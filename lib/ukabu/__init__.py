@@ -24,7 +24,7 @@ from .utils import (
     confirm_action,
     format_bytes
 )
-from .daemon import DaemonClient
+from .daemon import DaemonClient, AsyncDaemonClient
 from .domain import DomainManager
 from .ipmanager import IPManager
 from .nginx import NginxManager
@@ -37,6 +37,7 @@ __all__ = [
     'confirm_action',
     'format_bytes',
     'DaemonClient',
+    'AsyncDaemonClient',
     'DomainManager',
     'IPManager',
     'NginxManager',
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Shadowing and redundancy analysis for UKABU WAF IP lists
+
+Finds entries that cost nginx geo table and ipset space without changing
+what is blocked or allowed:
+
+- shadowed: blacklist entries fully covered by whitelisted networks
+  (the whitelist wins, so the block never applies)
+- redundant: entries inside another entry of the same list that is at
+  least as strong (e.g. a /32 inside a blacklisted /24)
+- mergeable: adjacent networks that collapse into a shorter prefix
+
+The whitelist, the blacklist and each domain's restricted_paths
+allowlists are converted to integer intervals once and swept in sorted
+order, O(n log n) overall.
+"""
+
+import ipaddress
+import logging
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .ipmanager import IPManager
+from .domain import DomainManager
+from .ipindex import parse_network, network_to_range
+from .utils import get_expiry_epoch
+
+# (family, start, end, order, label, strength)
+Interval = Tuple[int, int, int, int, str, float]
+
+# Strength of a permanent blacklist entry (outlives any expiry)
+PERMANENT = float('inf')
+
+
+def _intervals(items: Iterable[Tuple[str, float]]) -> Tuple[List[Interval], List[str]]:
+    """
+    Convert (ip_address, strength) pairs to intervals
+
+    Args:
+        items: IP/CIDR strings with a strength (higher covers lower)
+
+    Returns:
+        (intervals sorted parents-first, invalid entries)
+    """
+    intervals: List[Interval] = []
+    invalid: List[str] = []
+    for order, (label, strength) in enumerate(items):
+        network = parse_network(label)
+        if network is None:
+            invalid.append(label)
+            continue
+        family, start, end = network_to_range(network)
+        intervals.append((family, start, end, order, label, strength))
+    # Parents before children; among identical blocks the first entry
+    # comes first and is the one kept
+    intervals.sort(key=lambda iv: (iv[0], iv[1], -iv[2], iv[3]))
+    return intervals, invalid
+
+
+def find_redundant(intervals: List[Interval]) -> List[Tuple[Interval, str]]:
+    """
+    Find entries nested inside an at-least-as-strong entry of the same list
+
+    CIDR blocks are either disjoint or nested, so one sweep with a stack
+    of open blocks finds every enclosing block; the stack carries the
+    strongest enclosing entry. Of identical blocks the first is kept.
+
+    Args:
+        intervals: Output of _intervals()
+
+    Returns:
+        List of (redundant interval, covering label)
+    """
+    redundant = []
+    # (family, end, strongest label, strongest strength)
+    stack: List[Tuple[int, int, str, float]] = []
+    for interval in intervals:
+        family, start, end, _order, label, strength = interval
+        while stack and (stack[-1][0] != family or stack[-1][1] < start):
+            stack.pop()
+        if stack and stack[-1][3] >= strength:
+            redundant.append((interval, stack[-1][2]))
+            continue
+        stack.append((family, end, label, strength))
+    return redundant
+
+
+def _union(intervals: List[Interval]) -> Dict[int, Tuple[List[int], List[int], List[List[str]]]]:
+    """
+    Merge intervals into disjoint covered ranges per family
+
+    Returns:
+        Dict family -> (starts, ends, contributing labels)
+    """
+    union: Dict[int, Tuple[List[int], List[int], List[List[str]]]] = {
+        4: ([], [], []), 6: ([], [], [])
+    }
+    for family, start, end, _order, label, _strength in intervals:
+        starts, ends, labels = union[family]
+        if starts and start <= ends[-1] + 1:
+            if end > ends[-1]:
+                ends[-1] = end
+            labels[-1].append(label)
+        else:
+            starts.append(start)
+            ends.append(end)
+            labels.append([label])
+    return union
+
+
+def find_shadowed(covered: List[Interval], covering: List[Interval]) -> List[Dict[str, Any]]:
+    """
+    Find intervals fully inside the union of other intervals
+
+    Args:
+        covered: Candidate intervals (e.g. blacklist)
+        covering: Covering intervals (e.g. whitelist)
+
+    Returns:
+        List of {'entry', 'covered_by': [labels]}
+    """
+    union = _union(covering)
+    shadowed = []
+    for family, start, end, _order, label, _strength in covered:
+        starts, ends, labels = union[family]
+        i = bisect_right(starts, start) - 1
+        if i >= 0 and ends[i] >= end:
+            shadowed.append({'entry': label, 'covered_by': labels[i]})
+    return shadowed
+
+
+def find_mergeable(intervals: List[Interval]) -> List[Dict[str, Any]]:
+    """
+    Find groups of entries that collapse into fewer networks
+
+    Args:
+        intervals: Output of _intervals(), without redundant entries
+
+    Returns:
+        List of {'entries': [labels], 'networks': [CIDR strings]}
+    """
+    groups = []
+    for family in (4, 6):
+        members = [iv for iv in intervals if iv[0] == family]
+        if len(members) < 2:
+            continue
+        networks = [parse_network(iv[4]) for iv in members]
+        collapsed = list(ipaddress.collapse_addresses(networks))
+        if len(collapsed) == len(members):
+            continue
+
+        # Assign each member to the collapsed network containing it
+        bounds = [network_to_range(net) for net in collapsed]
+        starts = [b[1] for b in bounds]
+        assigned: Dict[int, List[str]] = {}
+        for iv in members:
+            i = bisect_right(starts, iv[1]) - 1
+            assigned.setdefault(i, []).append(iv[4])
+
+        for i, labels in sorted(assigned.items()):
+            if len(labels) > 1:
+                groups.append({'entries': labels, 'networks': [str(collapsed[i])]})
+    return groups
+
+
+def _redundancy(intervals: List[Interval]) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+    """
+    Run redundancy and merge analysis on one list
+
+    Returns:
+        (redundant [{'entry', 'covered_by'}], mergeable groups)
+    """
+    redundant = find_redundant(intervals)
+    dropped = {iv[3] for iv, _label in redundant}
+    remaining = [iv for iv in intervals if iv[3] not in dropped]
+    return (
+        [{'entry': iv[4], 'covered_by': label} for iv, label in redundant],
+        find_mergeable(remaining),
+    )
+
+
+def _apply_findings(
+    ips: List[str],
+    redundant: List[Dict[str, str]],
+    mergeable: List[Dict[str, Any]]
+) -> Tuple[List[str], List[str]]:
+    """
+    Work out removals and additions for a list
+
+    Exact duplicates are removed by value, so one copy is added back.
+
+    Returns:
+        (entries to remove, entries to add)
+    """
+    drop = {item['entry'] for item in redundant}
+    merged = set()
+    add = []
+    for group in mergeable:
+        merged.update(group['entries'])
+        add.extend(group['networks'])
+    add.extend(
+        item['entry'] for item in redundant
+        if item['entry'] == item['covered_by'] and item['entry'] not in merged
+    )
+    drop |= merged
+    return [ip for ip in dict.fromkeys(ips) if ip in drop], add
+
+
+class ListAnalyzer:
+    """Report and remove shadowed, redundant and mergeable list entries"""
+
+    def __init__(self, ip_manager: IPManager, domain_manager: Optional[DomainManager] = None):
+        """
+        Initialize analyzer
+
+        Args:
+            ip_manager: IP manager owning whitelist and blacklist
+            domain_manager: Domain manager for restricted_paths (default:
+                DomainManager with the IP manager's dry-run setting)
+        """
+        self.ip_manager = ip_manager
+        self.domain_manager = domain_manager or DomainManager(dry_run=ip_manager.dry_run)
+        self.logger = logging.getLogger('ukabu-manager.analyzer')
+
+    def _blacklist_items(self) -> List[Tuple[str, float]]:
+        """Blacklist entries with expiry as strength (permanent = inf)"""
+        items = []
+        for entry in self.ip_manager.get_blacklist():
+            if entry.get('lockout_period', 0) == 0:
+                strength = PERMANENT
+            else:
+                expiry = get_expiry_epoch(entry)
+                strength = float(expiry) if expiry is not None else 0.0
+            items.append((entry['ip_address'], strength))
+        return items
+
+    def analyze(self) -> Dict[str, Any]:
+        """
+        Analyze whitelist, blacklist and restricted_paths
+
+        Returns:
+            Report dict with 'shadowed', 'redundant' and 'mergeable' per
+            list, 'restricted_paths' per domain/path, and 'invalid'
+        """
+        whitelist, wl_invalid = _intervals((ip, PERMANENT) for ip in self.ip_manager.get_whitelist())
+        blacklist, bl_invalid = _intervals(self._blacklist_items())
+
+        shadowed = find_shadowed(blacklist, whitelist)
+        shadowed_labels = {item['entry'] for item in shadowed}
+        live_blacklist = [iv for iv in blacklist if iv[4] not in shadowed_labels]
+
+        wl_redundant, wl_mergeable = _redundancy(whitelist)
+        bl_redundant = find_redundant(live_blacklist)
+        dropped = {iv[3] for iv, _label in bl_redundant}
+        # Only permanent blacklist entries are merged: combining
+        # temporary entries would change their expiries
+        bl_mergeable = find_mergeable([
+            iv for iv in live_blacklist if iv[5] == PERMANENT and iv[3] not in dropped
+        ])
+        redundant = {
+            'whitelist': wl_redundant,
+            'blacklist': [{'entry': iv[4], 'covered_by': label} for iv, label in bl_redundant],
+        }
+        mergeable = {'whitelist': wl_mergeable, 'blacklist': bl_mergeable}
+
+        restricted: Dict[str, Dict[str, Any]] = {}
+        invalid = {'whitelist': wl_invalid, 'blacklist': bl_invalid}
+        for domain in self.domain_manager.list_domains():
+            domain_config = self.domain_manager.get_domain_config(domain) or {}
+            paths = domain_config.get('restricted_paths', {}) or {}
+            domain_report: Dict[str, Any] = {}
+            by_allowlist: Dict[Tuple[str, ...], List[str]] = {}
+            for path, ips in paths.items():
+                intervals, path_invalid = _intervals((ip, PERMANENT) for ip in ips)
+                path_redundant, path_mergeable = _redundancy(intervals)
+                if path_redundant or path_mergeable or path_invalid:
+                    domain_report[path] = {
+                        'redundant': path_redundant,
+                        'mergeable': path_mergeable,
+                        'invalid': path_invalid,
+                    }
+                canonical = tuple(sorted(str(parse_network(ip)) for ip in ips if parse_network(ip)))
+                by_allowlist.setdefault(canonical, []).append(path)
+
+            same = [group for group in by_allowlist.values() if len(group) > 1]
+            if same:
+                domain_report['_identical_allowlists'] = same
+            if domain_report:
+                restricted[domain] = domain_report
+
+        return {
+            'shadowed': shadowed,
+            'redundant': redundant,
+            'mergeable': mergeable,
+            'restricted_paths': restricted,
+            'invalid': invalid,
+        }
+
+    def cleanup(self, report: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Apply a report: drop shadowed and redundant entries, replace
+        mergeable groups by their collapsed networks
+
+        Merged blacklist entries are permanent with reason "merged".
+
+        Args:
+            report: Output of analyze() (default: run analyze())
+
+        Returns:
+            Counts: {'whitelist_removed', 'whitelist_added',
+            'blacklist_removed', 'blacklist_added', 'paths_updated'}
+        """
+        if report is None:
+            report = self.analyze()
+        stats = {
+            'whitelist_removed': 0, 'whitelist_added': 0,
+            'blacklist_removed': 0, 'blacklist_added': 0, 'paths_updated': 0,
+        }
+
+        # Whitelist
+        drop, add = _apply_findings(
+            self.ip_manager.get_whitelist(),
+            report['redundant']['whitelist'],
+            report['mergeable']['whitelist']
+        )
+        if drop or add:
+            result = self.ip_manager.bulk_remove(drop, target='whitelist')
+            stats['whitelist_removed'] = result.get('removed', 0)
+            result = self.ip_manager.bulk_add(add, target='whitelist')
+            stats['whitelist_added'] = result.get('added', 0)
+
+        # Blacklist (entries are unique by ip_address)
+        drop = [item['entry'] for item in report['shadowed']]
+        drop.extend(item['entry'] for item in report['redundant']['blacklist'])
+        add = []
+        for group in report['mergeable']['blacklist']:
+            drop.extend(group['entries'])
+            add.extend(group['networks'])
+        if drop:
+            result = self.ip_manager.bulk_remove(drop, target='blacklist')
+            stats['blacklist_removed'] = result.get('removed', 0)
+        if add:
+            result = self.ip_manager.bulk_add(add, target='blacklist', duration=0, reason='merged')
+            stats['blacklist_added'] = result.get('added', 0)
+
+        # Restricted paths
+        for domain, paths in report['restricted_paths'].items():
+            domain_config = self.domain_manager.get_domain_config(domain) or {}
+            current = domain_config.get('restricted_paths', {}) or {}
+            for path, findings in paths.items():
+                if path not in current:
+                    continue
+                drop, add = _apply_findings(current[path], findings['redundant'], findings['mergeable'])
+                if not drop and not add:
+                    continue
+                dropped_ips = set(drop)
+                ips = [ip for ip in current[path] if ip not in dropped_ips] + add
+                if self.domain_manager.add_restricted_path(domain, path, ips):
+                    stats['paths_updated'] += 1
+
+        self.logger.info(
+            f"List cleanup: whitelist -{stats['whitelist_removed']}/+{stats['whitelist_added']}, "
+            f"blacklist -{stats['blacklist_removed']}/+{stats['blacklist_added']}, "
+            f"{stats['paths_updated']} restricted paths updated"
+        )
+        return stats
@@ -6,45 +6,262 @@
 
 """
 Unix socket client for communicating with ukabu-trackerd daemon
+
+The daemon reads newline-delimited JSON commands and answers each with
+one JSON line, in order, for as long as the connection stays open. The
+client keeps one connection per DaemonClient and can pipeline several
+commands before reading their responses. AsyncDaemonClient offers the
+same methods for asyncio code, over a pool of connections.
+
+Bulk operations are sent as framed batches, one line per chunk:
+
+    {"action": "batch", "commands": [{...}, ...]}
+    -> {"status": "ok", "data": {"results": [{...}, ...]}}
+
+with one result per command, in order. Against a daemon that does not
+understand batch frames the client falls back to pipelining the commands.
+
+Large listings (strikes, blocks) are streamed in pages. A command with
+"stream": true, "limit" and an optional "cursor" is answered with one
+record per line, followed by a trailer line with a "status":
+
+    {"action": "strikes", "stream": true, "limit": 10000, "cursor": "..."}
+    -> {"ip": "192.0.2.1", "strikes": 3}
+       ...
+       {"status": "ok", "next_cursor": "..."}
+
+A null next_cursor marks the last page. Responses are read through one
+reusable receive buffer and the records of each received block are
+parsed together, so a dump uses memory for one buffer only.
+
+{"action": "subscribe"} turns a connection into a stream of events
+(strike recorded, flush, block, unblock, expire, reload), one per line,
+so a client can keep a local copy current (see mirror.DaemonMirror)
+instead of polling full listings.
 """
 
 import json
 import socket
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Any
 from pathlib import Path
 
 from .utils import DAEMON_SOCKET
 
+# Commands per batch frame
+BATCH_SIZE = 500
+
+# Records per page of a streamed listing
+STREAM_PAGE_SIZE = 10000
+
+# Initial size of the receive buffer (grows for longer lines)
+RECV_BUFFER_SIZE = 64 * 1024
+
+# Events a subscription can deliver
+EVENT_TYPES = ('strike', 'flush', 'block', 'unblock', 'expire', 'reload')
+
+# Seconds between heartbeats on an idle subscription, and heartbeats
+# missed before it counts as lost
+SUBSCRIBE_HEARTBEAT = 10.0
+HEARTBEAT_MISSES = 3
+
+
+def _chunks(commands: List[Dict[str, Any]], chunk_size: int) -> List[List[Dict[str, Any]]]:
+    """Split commands into batch frame sized chunks"""
+    return [commands[i:i + chunk_size] for i in range(0, len(commands), chunk_size)]
+
+
+def _frame_results(frame: Dict[str, Any], chunk: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """Get per-command results of a batch frame response, or None if it has none"""
+    data = frame.get('data') if frame.get('status') == 'ok' else None
+    items = data.get('results') if isinstance(data, dict) else None
+    if isinstance(items, list) and len(items) == len(chunk):
+        return items
+    return None
+
+
+def _error_map(ips: List[str], responses: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """Map each IP to None on success, or the daemon's error message"""
+    return {
+        ip: None if response.get('status') == 'ok' else response.get('message', 'Unknown daemon error')
+        for ip, response in zip(ips, responses)
+    }
+
+
+def _check_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise RuntimeError for an error response"""
+    if response.get('status') == 'error':
+        raise RuntimeError(response.get('message', 'Unknown daemon error'))
+    return response
+
+
+def _parse_lines(block: bytes) -> List[Any]:
+    """Parse newline-separated JSON records (without the last newline) in one call"""
+    # Records hold no raw newlines, so the lines join into one JSON array
+    return json.loads(b'[' + block.replace(b'\n', b',') + b']')
+
+
+async def _read_records(reader: asyncio.StreamReader, partial: bytearray, timeout: float) -> List[Any]:
+    """
+    Read the next complete lines from an asyncio stream and parse them
+    
+    Args:
+        reader: Stream to read from
+        partial: Incomplete line carried between calls (updated)
+        timeout: Seconds to wait for data
+    
+    Raises:
+        EOFError: If the daemon closed the connection
+    """
+    while True:
+        data = await asyncio.wait_for(reader.read(RECV_BUFFER_SIZE), timeout)
+        if not data:
+            raise EOFError("Daemon closed the connection")
+        newline = data.rfind(b'\n')
+        if newline < 0:
+            partial += data
+            continue
+        block = bytes(partial) + data[:newline]
+        partial[:] = data[newline + 1:]
+        return _parse_lines(block)
+
+
+def _subscribe_command(events: Optional[Iterable[str]], snapshot: bool, heartbeat: float) -> bytes:
+    """Encode a subscribe command"""
+    command: Dict[str, Any] = {"action": "subscribe", "snapshot": snapshot, "heartbeat": heartbeat}
+    if events is not None:
+        command["events"] = sorted(set(events))
+    return json.dumps(command).encode('utf-8') + b'\n'
+
+
+def _check_subscribed(response: Dict[str, Any]) -> None:
+    """Raise RuntimeError unless the response acknowledges a subscription"""
+    _check_response(response)
+    if response.get('event') != 'subscribed':
+        raise RuntimeError("Daemon does not support event subscriptions")
+
+
+def _unstreamed_records(action: str, data: Any) -> Iterator[Dict[str, Any]]:
+    """Turn a whole (non-streamed) listing response into records"""
+    if action == 'strikes' and isinstance(data, dict):
+        for ip_address, strikes in data.items():
+            yield {'ip': ip_address, 'strikes': strikes}
+    elif action == 'blocks' and isinstance(data, dict):
+        yield from data.get('blocks', [])
+
+
+class _LineReader:
+    """Read lines from a socket through one reusable buffer (recv_into)"""
+    
+    def __init__(self, sock: socket.socket, size: int = RECV_BUFFER_SIZE):
+        self.sock = sock
+        self.buffer = bytearray(size)
+        self.start = 0
+        self.end = 0
+    
+    def readline(self) -> bytes:
+        """
+        Read one line
+        
+        Returns:
+            The line including its newline; without one if the peer closed
+            the connection first
+        """
+        return self._read(single=True)
+    
+    def readlines(self) -> bytes:
+        """
+        Read all complete lines received so far (at least one)
+        
+        Returns:
+            Newline-terminated lines as one block; a partial line without
+            newline if the peer closed the connection first
+        """
+        return self._read(single=False)
+    
+    def _read(self, single: bool) -> bytes:
+        while True:
+            if single:
+                newline = self.buffer.find(b'\n', self.start, self.end)
+            else:
+                newline = self.buffer.rfind(b'\n', self.start, self.end)
+            if newline >= 0:
+                lines = bytes(self.buffer[self.start:newline + 1])
+                self.start = newline + 1
+                return lines
+            
+            # Move the partial line to the front; grow only for lines
+            # longer than the buffer
+            if self.start:
+                self.buffer[:self.end - self.start] = self.buffer[self.start:self.end]
+                self.end -= self.start
+                self.start = 0
+            if self.end == len(self.buffer):
+                self.buffer.extend(bytes(len(self.buffer)))
+            
+            with memoryview(self.buffer) as view:
+                received = self.sock.recv_into(view[self.end:])
+            if not received:
+                partial = bytes(self.buffer[self.start:self.end])
+                self.start = self.end = 0
+                return partial
+            self.end += received
+
 
 class DaemonClient:
     """Client for communicating with ukabu-trackerd via Unix socket"""
     
-    def __init__(self, socket_path: str = DAEMON_SOCKET, timeout: float = 5.0):
+    def __init__(self, socket_path: str = DAEMON_SOCKET, timeout: float = 5.0, persistent: bool = True):
         """
         Initialize daemon client
         
         Args:
             socket_path: Path to Unix socket
             timeout: Socket timeout in seconds
+            persistent: Keep the connection open between commands
+                (otherwise connect once per command)
         """
         self.socket_path = socket_path
         self.timeout = timeout
+        self.persistent = persistent
         self.logger = logging.getLogger('ukabu-manager.daemon')
+        self._sock: Optional[socket.socket] = None
+        self._reader: Optional[_LineReader] = None
+        self._lock = threading.Lock()
+        self._batch_supported = True
     
-    def _send_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
+    def __enter__(self) -> 'DaemonClient':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Close the connection (the next command reconnects)"""
+        self._reader = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+    
+    def _connect(self) -> None:
         """
-        Send command to daemon and receive response
-        
-        Args:
-            command: Command dictionary
+        Open the connection
         
-        Returns:
-            Response dictionary
+        Raises:
+            ConnectionError: If cannot connect to daemon
+        """
+        self._sock = self._open_socket()
+        self._reader = _LineReader(self._sock)
+    
+    def _open_socket(self) -> socket.socket:
+        """
+        Connect a new socket to the daemon
         
         Raises:
             ConnectionError: If cannot connect to daemon
-            RuntimeError: If daemon returns error
         """
         if not Path(self.socket_path).exists():
             raise ConnectionError(
@@ -52,45 +269,178 @@ class DaemonClient:
                 "Is ukabu-trackerd running?"
             )
         
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
         try:
-            # Connect to Unix socket
-            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            sock.settimeout(self.timeout)
             sock.connect(self.socket_path)
-            
-            # Send command
-            command_json = json.dumps(command) + '\n'
-            sock.sendall(command_json.encode('utf-8'))
-            
-            # Receive response
-            response_data = b''
-            while True:
-                chunk = sock.recv(4096)
-                if not chunk:
-                    break
-                response_data += chunk
-                if b'\n' in response_data:
-                    break
-            
+        except ConnectionRefusedError:
             sock.close()
+            raise ConnectionError("Daemon refused connection - is it running?")
+        except OSError as e:
+            sock.close()
+            raise ConnectionError(f"Cannot connect to daemon: {e}")
+        return sock
+    
+    def _exchange(self, payload: bytes, count: int, responses: List[Dict[str, Any]]) -> None:
+        """
+        Send pipelined commands and read their responses in order
+        
+        Args:
+            payload: Newline-terminated JSON commands
+            count: Number of commands in payload
+            responses: List the parsed responses are appended to
+        
+        Raises:
+            EOFError: If the daemon closed the connection early
+        """
+        self._sock.sendall(payload)
+        for _ in range(count):
+            line = self._reader.readline()
+            if not line.endswith(b'\n'):
+                raise EOFError("Daemon closed the connection")
+            responses.append(json.loads(line))
+    
+    def pipeline(self, commands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send several commands at once and read all responses
+        
+        All commands go out in one write before any response is read, so
+        a batch costs one round trip. If the connection turns out to be
+        dead (daemon restarted, connection dropped), the client reconnects
+        and resends the commands that got no response;
+        the commands are idempotent, so one that was executed but whose
+        response was lost is harmless to repeat.
+        
+        Args:
+            commands: Command dictionaries
+        
+        Returns:
+            Response dictionaries, in command order (error responses are
+            returned, not raised)
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+            RuntimeError: On invalid responses or other socket errors
+        """
+        if not commands:
+            return []
+        
+        lines = [json.dumps(command).encode('utf-8') + b'\n' for command in commands]
+        responses: List[Dict[str, Any]] = []
+        
+        with self._lock:
+            try:
+                while True:
+                    reused = self._sock is not None
+                    if not reused:
+                        self._connect()
+                    answered = len(responses)
+                    try:
+                        pending = lines[answered:]
+                        self._exchange(b''.join(pending), len(pending), responses)
+                        break
+                    except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+                        self.close()
+                        # A connection left over from earlier calls may
+                        # have gone stale, and one that answered part of
+                        # the batch was dropped mid-way; a fresh connection
+                        # that answers nothing is a real failure
+                        if not reused and len(responses) == answered:
+                            raise RuntimeError(f"Daemon communication error: {e}")
+                        self.logger.debug(f"Daemon connection lost ({e}), reconnecting")
             
-            # Parse response
-            response = json.loads(response_data.decode('utf-8'))
-            
-            # Check for errors
-            if response.get('status') == 'error':
-                raise RuntimeError(response.get('message', 'Unknown daemon error'))
-            
-            return response
+            except socket.timeout:
+                self.close()
+                raise ConnectionError("Daemon socket timeout - daemon may be unresponsive")
+            except json.JSONDecodeError as e:
+                self.close()
+                raise RuntimeError(f"Invalid JSON response from daemon: {e}")
+            except (ConnectionError, RuntimeError):
+                self.close()
+                raise
+            except Exception as e:
+                self.close()
+                raise RuntimeError(f"Daemon communication error: {e}")
+            finally:
+                if not self.persistent:
+                    self.close()
         
-        except socket.timeout:
-            raise ConnectionError("Daemon socket timeout - daemon may be unresponsive")
-        except ConnectionRefusedError:
-            raise ConnectionError("Daemon refused connection - is it running?")
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Invalid JSON response from daemon: {e}")
-        except Exception as e:
-            raise RuntimeError(f"Daemon communication error: {e}")
+        return responses
+    
+    def _send_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send command to daemon and receive response
+        
+        Args:
+            command: Command dictionary
+        
+        Returns:
+            Response dictionary
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+            RuntimeError: If daemon returns error
+        """
+        return _check_response(self.pipeline([command])[0])
+    
+    def batch(self, commands: List[Dict[str, Any]], chunk_size: int = BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        Run many commands as framed batches
+        
+        Commands are split into frames of chunk_size and all frames are
+        pipelined. A frame the daemon answers without per-command results
+        (no batch support) is retried as pipelined single commands, and
+        later calls skip the batch frames.
+        
+        Args:
+            commands: Command dictionaries
+            chunk_size: Commands per frame
+        
+        Returns:
+            One response per command, in command order (error responses
+            are returned, not raised)
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+            RuntimeError: On invalid responses or other socket errors
+        """
+        chunks = _chunks(commands, chunk_size)
+        if not self._batch_supported:
+            return [response for chunk in chunks for response in self.pipeline(chunk)]
+        
+        frames = self.pipeline([{"action": "batch", "commands": chunk} for chunk in chunks])
+        results: List[Dict[str, Any]] = []
+        for chunk, frame in zip(chunks, frames):
+            items = _frame_results(frame, chunk)
+            if items is not None:
+                results.extend(items)
+                continue
+            if self._batch_supported:
+                self.logger.debug(
+                    f"Daemon did not accept a batch frame ({frame.get('message', 'no results')}), "
+                    "pipelining commands instead"
+                )
+                self._batch_supported = False
+            # Bulk commands are idempotent, so a partly applied frame is
+            # safe to resend
+            results.extend(self.pipeline(chunk))
+        return results
+    
+    def _batch_by_ip(self, action: str, ip_addresses: Iterable[str], **fields: Any) -> Dict[str, Optional[str]]:
+        """
+        Run one action for many IPs as framed batches
+        
+        Args:
+            action: Command action
+            ip_addresses: IPs (duplicates are sent once)
+            **fields: Extra fields for every command
+        
+        Returns:
+            Dictionary of IP to None on success, or the daemon's error message
+        """
+        ips = list(dict.fromkeys(ip_addresses))
+        responses = self.batch([{"action": action, "ip": ip, **fields} for ip in ips])
+        return _error_map(ips, responses)
     
     def ping(self) -> bool:
         """
@@ -124,7 +474,8 @@ class DaemonClient:
             ip_address: Specific IP to query (None for all)
         
         Returns:
-            Dictionary of IP addresses and their strike counts
+            Dictionary of IP addresses and their strike counts (the whole
+            listing in one response; use iter_strikes() for large ones)
         """
         command = {"action": "strikes"}
         if ip_address:
@@ -133,6 +484,78 @@ class DaemonClient:
         response = self._send_command(command)
         return response.get('data', {})
     
+    def stream(self, command: Dict[str, Any], cursor: Optional[str] = None,
+               limit: int = STREAM_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the records of a listing command, page by page
+        
+        Uses a connection of its own, so other commands can be sent while
+        the records are consumed. A daemon that answers with one whole
+        response instead is read the old way.
+        
+        Args:
+            command: Listing command ({"action": "strikes"} or
+                {"action": "blocks"})
+            cursor: Cursor to resume from (default: the start)
+            limit: Records per page
+        
+        Returns:
+            Iterator of record dictionaries
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+            RuntimeError: If daemon returns error or the stream breaks
+        """
+        sock = self._open_socket()
+        reader = _LineReader(sock)
+        try:
+            while True:
+                request = dict(command, stream=True, limit=limit)
+                if cursor is not None:
+                    request['cursor'] = cursor
+                sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+                
+                trailer = None
+                while trailer is None:
+                    block = reader.readlines()
+                    if not block.endswith(b'\n'):
+                        raise RuntimeError("Daemon closed the connection mid-stream")
+                    for record in _parse_lines(block[:-1]):
+                        if 'status' in record:
+                            trailer = record
+                            break
+                        yield record
+                
+                _check_response(trailer)
+                if 'next_cursor' not in trailer:
+                    yield from _unstreamed_records(command.get('action'), trailer.get('data'))
+                    return
+                cursor = trailer['next_cursor']
+                if cursor is None:
+                    return
+        
+        except socket.timeout:
+            raise ConnectionError("Daemon socket timeout - daemon may be unresponsive")
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"Invalid JSON response from daemon: {e}")
+        except OSError as e:
+            raise RuntimeError(f"Daemon communication error: {e}")
+        finally:
+            sock.close()
+    
+    def iter_strikes(self, cursor: Optional[str] = None, page_size: int = STREAM_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Stream strike counts of all IPs
+        
+        Args:
+            cursor: Cursor to resume from (default: the start)
+            page_size: Records per page
+        
+        Returns:
+            Iterator of {'ip', 'strikes'} records
+        """
+        return self.stream({"action": "strikes"}, cursor, page_size)
+    
     def flush_strikes(self, ip_address: str) -> bool:
         """
         Flush strikes for specific IP
@@ -149,6 +572,18 @@ class DaemonClient:
         })
         return response.get('status') == 'ok'
     
+    def flush_strikes_many(self, ip_addresses: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Flush strikes for many IPs in batches
+        
+        Args:
+            ip_addresses: IP addresses to flush
+        
+        Returns:
+            Dictionary of IP to None on success, or the daemon's error message
+        """
+        return self._batch_by_ip("flush", ip_addresses)
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Get daemon statistics
@@ -164,11 +599,75 @@ class DaemonClient:
         Get list of currently blocked IPs
         
         Returns:
-            List of blocked IP records
+            List of blocked IP records (the whole listing in one response;
+            use iter_blocks() for large ones)
         """
         response = self._send_command({"action": "blocks"})
         return response.get('data', {}).get('blocks', [])
     
+    def iter_blocks(self, cursor: Optional[str] = None, page_size: int = STREAM_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Stream currently blocked IPs
+        
+        Args:
+            cursor: Cursor to resume from (default: the start)
+            page_size: Records per page
+        
+        Returns:
+            Iterator of blocked IP records
+        """
+        return self.stream({"action": "blocks"}, cursor, page_size)
+    
+    def subscribe(self, events: Optional[Iterable[str]] = None, snapshot: bool = False,
+                  heartbeat: float = SUBSCRIBE_HEARTBEAT) -> Iterator[Dict[str, Any]]:
+        """
+        Follow daemon events on a connection of its own
+        
+        The first event is 'subscribed'. With snapshot, the current blocks
+        and strikes follow as 'block' and 'strike' events marked
+        "snapshot": true, closed by 'synced'. Live events carry a "seq"
+        that grows by one per daemon event (filtered out events leave
+        gaps). The iterator only ends by raising.
+        
+        Args:
+            events: Event types to receive (default: all of EVENT_TYPES)
+            snapshot: Start with the current blocks and strikes
+            heartbeat: Seconds between heartbeats while idle; missing
+                HEARTBEAT_MISSES of them counts as a lost subscription
+        
+        Returns:
+            Iterator of event dictionaries (without heartbeats)
+        
+        Raises:
+            ConnectionError: If cannot connect, or the daemon goes silent
+            RuntimeError: If the daemon refuses or ends the subscription
+        """
+        sock = self._open_socket()
+        sock.settimeout(heartbeat * HEARTBEAT_MISSES)
+        reader = _LineReader(sock)
+        try:
+            sock.sendall(_subscribe_command(events, snapshot, heartbeat))
+            subscribed = False
+            while True:
+                block = reader.readlines()
+                if not block.endswith(b'\n'):
+                    raise RuntimeError("Daemon ended the subscription")
+                for event in _parse_lines(block[:-1]):
+                    if not subscribed:
+                        _check_subscribed(event)
+                        subscribed = True
+                    if event.get('event') != 'heartbeat':
+                        yield event
+        
+        except socket.timeout:
+            raise ConnectionError("No events or heartbeats from daemon - subscription lost")
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"Invalid JSON response from daemon: {e}")
+        except OSError as e:
+            raise RuntimeError(f"Daemon communication error: {e}")
+        finally:
+            sock.close()
+    
     def add_block(self, ip_address: str, duration: int, reason: str = "") -> bool:
         """
         Manually add IP to blocklist
@@ -205,6 +704,32 @@ class DaemonClient:
         })
         return response.get('status') == 'ok'
     
+    def add_blocks(self, ip_addresses: Iterable[str], duration: int, reason: str = "") -> Dict[str, Optional[str]]:
+        """
+        Manually add many IPs to blocklist in batches
+        
+        Args:
+            ip_addresses: IPs to block
+            duration: Lockout duration in minutes (0 for permanent)
+            reason: Block reason
+        
+        Returns:
+            Dictionary of IP to None on success, or the daemon's error message
+        """
+        return self._batch_by_ip("block", ip_addresses, duration=duration, reason=reason)
+    
+    def remove_blocks(self, ip_addresses: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Remove many IPs from blocklist in batches
+        
+        Args:
+            ip_addresses: IPs to unblock
+        
+        Returns:
+            Dictionary of IP to None on success, or the daemon's error message
+        """
+        return self._batch_by_ip("unblock", ip_addresses)
+    
     def is_running(self) -> bool:
         """
         Check if daemon is running
@@ -251,3 +776,530 @@ class DaemonClient:
             health['error'] = str(e)
         
         return health
+
+
+# Longest response line the async client accepts (block lists can be large)
+ASYNC_READ_LIMIT = 16 * 1024 * 1024
+
+
+class _AsyncConnection:
+    """One pooled connection; responses resolve in-flight requests in order"""
+    
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.in_flight: Deque[asyncio.Future] = deque()
+        self.used = False
+        self.closed = False
+        self._task = asyncio.get_running_loop().create_task(self._read_responses())
+    
+    def submit(self, payload: bytes, count: int) -> List[asyncio.Future]:
+        """
+        Write newline-terminated commands and queue their futures
+        
+        Args:
+            payload: Newline-terminated JSON commands
+            count: Number of commands in payload
+        
+        Returns:
+            One future per command, resolved with its response
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in range(count)]
+        self.in_flight.extend(futures)
+        self.writer.write(payload)
+        self.used = True
+        return futures
+    
+    async def _read_responses(self) -> None:
+        error: Exception = EOFError("Daemon closed the connection")
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line.endswith(b'\n'):
+                    break
+                if not self.in_flight:
+                    continue
+                future = self.in_flight.popleft()
+                try:
+                    response = json.loads(line)
+                except json.JSONDecodeError as e:
+                    error = RuntimeError(f"Invalid JSON response from daemon: {e}")
+                    if not future.done():
+                        future.set_exception(error)
+                    break
+                # Requests past their deadline were cancelled; their
+                # responses are dropped
+                if not future.done():
+                    future.set_result(response)
+        except (ConnectionError, ValueError) as e:
+            error = e
+        except asyncio.CancelledError:
+            error = ConnectionError("Connection closed")
+        self._fail(error)
+    
+    def _fail(self, error: Exception) -> None:
+        self.closed = True
+        while self.in_flight:
+            future = self.in_flight.popleft()
+            if not future.done():
+                future.set_exception(error)
+        self.writer.close()
+    
+    def close(self) -> None:
+        """Close the connection, failing requests still in flight"""
+        if not self.closed:
+            self._task.cancel()
+            self._fail(ConnectionError("Connection closed"))
+
+
+class AsyncDaemonClient:
+    """asyncio client for ukabu-trackerd with a connection pool
+    
+    Same methods as DaemonClient, as coroutines. Any number of requests
+    may be in flight at once: each request is pipelined on the pooled
+    connection with the fewest requests in flight (a new connection is
+    opened while the pool is not full), and each has its own deadline.
+    A request that misses its deadline leaves the connection usable.
+    """
+    
+    def __init__(self, socket_path: str = DAEMON_SOCKET, timeout: float = 5.0, pool_size: int = 4):
+        """
+        Initialize async daemon client
+        
+        Args:
+            socket_path: Path to Unix socket
+            timeout: Default deadline per request in seconds
+            pool_size: Maximum number of open connections
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.pool_size = max(1, pool_size)
+        self.logger = logging.getLogger('ukabu-manager.daemon')
+        self._connections: List[_AsyncConnection] = []
+        self._opening = 0
+        self._pool_changed: Optional[asyncio.Event] = None
+        self._batch_supported = True
+    
+    async def __aenter__(self) -> 'AsyncDaemonClient':
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    async def close(self) -> None:
+        """Close all pooled connections"""
+        connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        for connection in connections:
+            try:
+                await connection.writer.wait_closed()
+            except OSError:
+                pass
+    
+    async def _open(self) -> _AsyncConnection:
+        """
+        Open a pooled connection
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+        """
+        reader, writer = await self._open_streams()
+        return _AsyncConnection(reader, writer)
+    
+    async def _open_streams(self):
+        """
+        Connect to the daemon
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+        """
+        if not Path(self.socket_path).exists():
+            raise ConnectionError(
+                f"Daemon socket not found at {self.socket_path}. "
+                "Is ukabu-trackerd running?"
+            )
+        
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=ASYNC_READ_LIMIT)
+        except ConnectionRefusedError:
+            raise ConnectionError("Daemon refused connection - is it running?")
+        except OSError as e:
+            raise ConnectionError(f"Cannot connect to daemon: {e}")
+        return reader, writer
+    
+    async def _connection(self, timeout: float) -> _AsyncConnection:
+        """
+        Pick the least busy connection, opening one while the pool has room
+        
+        Picking an open connection does not suspend, so the caller can
+        submit before another task picks.
+        
+        Args:
+            timeout: Seconds to wait for a connection to open
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+            asyncio.TimeoutError: If no connection opened in time
+        """
+        while True:
+            self._connections = [c for c in self._connections if not c.closed]
+            pool_full = len(self._connections) + self._opening >= self.pool_size
+            least_busy = min(self._connections, key=lambda c: len(c.in_flight), default=None)
+            if least_busy is not None and (not least_busy.in_flight or pool_full):
+                return least_busy
+            if not pool_full:
+                break
+            # Every free slot is a connection still being opened
+            if self._pool_changed is None:
+                self._pool_changed = asyncio.Event()
+            await asyncio.wait_for(self._pool_changed.wait(), timeout)
+        
+        self._opening += 1
+        try:
+            connection = await asyncio.wait_for(self._open(), timeout)
+            self._connections.append(connection)
+            return connection
+        finally:
+            self._opening -= 1
+            if self._pool_changed is not None:
+                self._pool_changed.set()
+                self._pool_changed = None
+    
+    async def pipeline(self, commands: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Send several commands at once on one connection and read all responses
+        
+        If the connection turns out to be dead, the commands that got no
+        response are resent on another connection (commands are
+        idempotent), as in DaemonClient.pipeline.
+        
+        Args:
+            commands: Command dictionaries
+            timeout: Deadline in seconds for the whole call (default:
+                the client timeout)
+        
+        Returns:
+            Response dictionaries, in command order (error responses are
+            returned, not raised)
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon or the deadline passes
+            RuntimeError: On invalid responses or other socket errors
+        """
+        if not commands:
+            return []
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.timeout if timeout is None else timeout)
+        lines = [json.dumps(command).encode('utf-8') + b'\n' for command in commands]
+        responses: List[Dict[str, Any]] = []
+        
+        while True:
+            futures: List[asyncio.Future] = []
+            try:
+                connection = await self._connection(deadline - loop.time())
+                reused = connection.used
+                answered = len(responses)
+                pending = lines[answered:]
+                futures = connection.submit(b''.join(pending), len(pending))
+                await asyncio.wait_for(connection.writer.drain(), deadline - loop.time())
+                for future in futures:
+                    responses.append(await asyncio.wait_for(future, deadline - loop.time()))
+                return responses
+            
+            except asyncio.TimeoutError:
+                raise ConnectionError("Daemon socket timeout - daemon may be unresponsive")
+            except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+                connection.close()
+                # Same rule as DaemonClient.pipeline: retry on a stale or
+                # partly answered connection, fail on a fresh silent one
+                if not reused and len(responses) == answered:
+                    raise RuntimeError(f"Daemon communication error: {e}")
+                self.logger.debug(f"Daemon connection lost ({e}), reconnecting")
+            finally:
+                # Drop what this call did not consume (late responses are
+                # discarded, errors of later commands already handled)
+                for future in futures:
+                    if future.done() and not future.cancelled():
+                        future.exception()
+                    else:
+                        future.cancel()
+    
+    async def _send_command(self, command: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Send command to daemon and receive response
+        
+        Args:
+            command: Command dictionary
+            timeout: Deadline in seconds (default: the client timeout)
+        
+        Returns:
+            Response dictionary
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+            RuntimeError: If daemon returns error
+        """
+        return _check_response((await self.pipeline([command], timeout))[0])
+    
+    async def batch(self, commands: List[Dict[str, Any]], chunk_size: int = BATCH_SIZE,
+                    timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Run many commands as framed batches (see DaemonClient.batch)
+        
+        Args:
+            commands: Command dictionaries
+            chunk_size: Commands per frame
+            timeout: Deadline in seconds per pipelined call (default: the
+                client timeout)
+        
+        Returns:
+            One response per command, in command order
+        """
+        chunks = _chunks(commands, chunk_size)
+        if not self._batch_supported:
+            answered = await asyncio.gather(*(self.pipeline(chunk, timeout) for chunk in chunks))
+            return [response for responses in answered for response in responses]
+        
+        frames = await self.pipeline([{"action": "batch", "commands": chunk} for chunk in chunks], timeout)
+        results: List[Dict[str, Any]] = []
+        for chunk, frame in zip(chunks, frames):
+            items = _frame_results(frame, chunk)
+            if items is not None:
+                results.extend(items)
+                continue
+            if self._batch_supported:
+                self.logger.debug(
+                    f"Daemon did not accept a batch frame ({frame.get('message', 'no results')}), "
+                    "pipelining commands instead"
+                )
+                self._batch_supported = False
+            results.extend(await self.pipeline(chunk, timeout))
+        return results
+    
+    async def _batch_by_ip(self, action: str, ip_addresses: Iterable[str], **fields: Any) -> Dict[str, Optional[str]]:
+        ips = list(dict.fromkeys(ip_addresses))
+        responses = await self.batch([{"action": action, "ip": ip, **fields} for ip in ips])
+        return _error_map(ips, responses)
+    
+    async def ping(self) -> bool:
+        """
+        Check if daemon is responsive
+        
+        Returns:
+            True if daemon responds
+        """
+        try:
+            response = await self._send_command({"action": "ping"})
+            return response.get('status') == 'ok'
+        except Exception as e:
+            self.logger.debug(f"Daemon ping failed: {e}")
+            return False
+    
+    async def reload_config(self) -> bool:
+        """Signal daemon to reload configuration"""
+        response = await self._send_command({"action": "reload"})
+        return response.get('status') == 'ok'
+    
+    async def get_strikes(self, ip_address: Optional[str] = None) -> Dict[str, Any]:
+        """Get strike counts for IP(s) (all IPs if ip_address is None)"""
+        command = {"action": "strikes"}
+        if ip_address:
+            command["ip"] = ip_address
+        response = await self._send_command(command)
+        return response.get('data', {})
+    
+    async def stream(self, command: Dict[str, Any], cursor: Optional[str] = None,
+                     limit: int = STREAM_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the records of a listing command, page by page
+        
+        Uses a connection outside the pool; the client timeout applies
+        to each read. See DaemonClient.stream.
+        
+        Args:
+            command: Listing command ({"action": "strikes"} or
+                {"action": "blocks"})
+            cursor: Cursor to resume from (default: the start)
+            limit: Records per page
+        
+        Returns:
+            Async iterator of record dictionaries
+        
+        Raises:
+            ConnectionError: If cannot connect to daemon
+            RuntimeError: If daemon returns error or the stream breaks
+        """
+        reader, writer = await asyncio.wait_for(self._open_streams(), self.timeout)
+        partial = bytearray()
+        try:
+            while True:
+                request = dict(command, stream=True, limit=limit)
+                if cursor is not None:
+                    request['cursor'] = cursor
+                writer.write(json.dumps(request).encode('utf-8') + b'\n')
+                await asyncio.wait_for(writer.drain(), self.timeout)
+                
+                trailer = None
+                while trailer is None:
+                    for record in await _read_records(reader, partial, self.timeout):
+                        if 'status' in record:
+                            trailer = record
+                            break
+                        yield record
+                
+                _check_response(trailer)
+                if 'next_cursor' not in trailer:
+                    for record in _unstreamed_records(command.get('action'), trailer.get('data')):
+                        yield record
+                    return
+                cursor = trailer['next_cursor']
+                if cursor is None:
+                    return
+        
+        except asyncio.TimeoutError:
+            raise ConnectionError("Daemon socket timeout - daemon may be unresponsive")
+        except EOFError:
+            raise RuntimeError("Daemon closed the connection mid-stream")
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"Invalid JSON response from daemon: {e}")
+        except (ConnectionResetError, BrokenPipeError) as e:
+            raise RuntimeError(f"Daemon communication error: {e}")
+        finally:
+            writer.close()
+    
+    async def subscribe(self, events: Optional[Iterable[str]] = None, snapshot: bool = False,
+                        heartbeat: float = SUBSCRIBE_HEARTBEAT) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Follow daemon events on a connection of its own (see
+        DaemonClient.subscribe)
+        
+        Args:
+            events: Event types to receive (default: all)
+            snapshot: Start with the current blocks and strikes
+            heartbeat: Seconds between heartbeats while idle
+        
+        Returns:
+            Async iterator of event dictionaries (without heartbeats)
+        
+        Raises:
+            ConnectionError: If cannot connect, or the daemon goes silent
+            RuntimeError: If the daemon refuses or ends the subscription
+        """
+        reader, writer = await asyncio.wait_for(self._open_streams(), self.timeout)
+        partial = bytearray()
+        try:
+            writer.write(_subscribe_command(events, snapshot, heartbeat))
+            await asyncio.wait_for(writer.drain(), self.timeout)
+            subscribed = False
+            while True:
+                for event in await _read_records(reader, partial, heartbeat * HEARTBEAT_MISSES):
+                    if not subscribed:
+                        _check_subscribed(event)
+                        subscribed = True
+                    if event.get('event') != 'heartbeat':
+                        yield event
+        
+        except asyncio.TimeoutError:
+            raise ConnectionError("No events or heartbeats from daemon - subscription lost")
+        except EOFError:
+            raise RuntimeError("Daemon ended the subscription")
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"Invalid JSON response from daemon: {e}")
+        except (ConnectionResetError, BrokenPipeError) as e:
+            raise RuntimeError(f"Daemon communication error: {e}")
+        finally:
+            writer.close()
+    
+    def iter_strikes(self, cursor: Optional[str] = None, page_size: int = STREAM_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """Stream strike counts of all IPs (see DaemonClient.iter_strikes)"""
+        return self.stream({"action": "strikes"}, cursor, page_size)
+    
+    async def flush_strikes(self, ip_address: str) -> bool:
+        """Flush strikes for specific IP"""
+        response = await self._send_command({"action": "flush", "ip": ip_address})
+        return response.get('status') == 'ok'
+    
+    async def flush_strikes_many(self, ip_addresses: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Flush strikes for many IPs in batches (see DaemonClient.flush_strikes_many)"""
+        return await self._batch_by_ip("flush", ip_addresses)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get daemon statistics"""
+        response = await self._send_command({"action": "stats"})
+        return response.get('data', {})
+    
+    async def get_blocks(self) -> List[Dict[str, Any]]:
+        """Get list of currently blocked IPs"""
+        response = await self._send_command({"action": "blocks"})
+        return response.get('data', {}).get('blocks', [])
+    
+    def iter_blocks(self, cursor: Optional[str] = None, page_size: int = STREAM_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """Stream currently blocked IPs (see DaemonClient.iter_blocks)"""
+        return self.stream({"action": "blocks"}, cursor, page_size)
+    
+    async def add_block(self, ip_address: str, duration: int, reason: str = "") -> bool:
+        """Manually add IP to blocklist (duration in minutes, 0 for permanent)"""
+        response = await self._send_command({
+            "action": "block",
+            "ip": ip_address,
+            "duration": duration,
+            "reason": reason
+        })
+        return response.get('status') == 'ok'
+    
+    async def add_blocks(self, ip_addresses: Iterable[str], duration: int, reason: str = "") -> Dict[str, Optional[str]]:
+        """Manually add many IPs to blocklist in batches (see DaemonClient.add_blocks)"""
+        return await self._batch_by_ip("block", ip_addresses, duration=duration, reason=reason)
+    
+    async def remove_block(self, ip_address: str) -> bool:
+        """Remove IP from blocklist"""
+        response = await self._send_command({"action": "unblock", "ip": ip_address})
+        return response.get('status') == 'ok'
+    
+    async def remove_blocks(self, ip_addresses: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Remove many IPs from blocklist in batches (see DaemonClient.remove_blocks)"""
+        return await self._batch_by_ip("unblock", ip_addresses)
+    
+    async def is_running(self) -> bool:
+        """Check if daemon is running"""
+        return await self.ping()
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Comprehensive health check of daemon
+        
+        Returns:
+            Dictionary with health status information (see
+            DaemonClient.health_check)
+        """
+        health = {
+            'running': False,
+            'responsive': False,
+            'uptime': None,
+            'memory_mb': None,
+            'total_strikes': 0,
+            'active_blocks': 0,
+            'error': None
+        }
+        
+        try:
+            if not Path(self.socket_path).exists():
+                health['error'] = 'Socket not found'
+                return health
+            
+            health['running'] = True
+            
+            stats = await self.get_stats()
+            health['responsive'] = True
+            health['uptime'] = stats.get('uptime_seconds')
+            health['memory_mb'] = stats.get('memory_mb')
+            health['total_strikes'] = stats.get('total_strikes', 0)
+            health['active_blocks'] = stats.get('active_blocks', 0)
+        
+        except Exception as e:
+            health['error'] = str(e)
+        
+        return health
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Subnet escalation of clustered temporary blocks
+
+When more than a threshold of active temporary blocks fall inside one
+prefix (e.g. a /24 for IPv4, a /64 for IPv6), they are replaced by a
+single prefix entry. The member entries are kept inside the prefix entry
+('escalated_from'), so the escalation can be reversed.
+
+The prefix entry takes its timestamp and lockout from the member whose
+expiry makes the prefix expire exactly when no more than the threshold
+of members would still be active. At that point unjail removes the
+prefix and restores the members that have not expired yet.
+
+Strike blocks ukabu-trackerd placed in the temporary sets count towards
+the threshold too ('source': 'daemon' members). They are not blacklist
+entries: escalation never removes them and unjail does not restore them.
+The ipsets are updated for the changed entries only.
+"""
+
+import time
+import math
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ipmanager import IPManager
+from .ipindex import parse_network, network_to_range
+from .ipset import IPSetClient
+from .ipsync import IPSetSynchronizer
+from .utils import get_expiry_epoch
+
+# Per address family: (prefix length, threshold); a prefix is escalated
+# when it holds more than `threshold` active temporary blocks
+DEFAULT_POLICY: Dict[int, Tuple[int, int]] = {
+    4: (24, 16),
+    6: (64, 4),
+}
+
+# Key of the member list in an escalated prefix entry
+MEMBERS_KEY = 'escalated_from'
+
+# 'source' of members that are daemon strike blocks
+DAEMON_SOURCE = 'daemon'
+
+
+def daemon_member(member: str, expiry: int, now: int) -> Dict[str, Any]:
+    """
+    Build a member record for a daemon strike block
+
+    Args:
+        member: ipset member
+        expiry: Expiry as epoch seconds
+        now: Epoch seconds
+
+    Returns:
+        Entry-shaped record expiring at `expiry`
+    """
+    lockout = max(1, math.ceil((expiry - now) / 60))
+    return {
+        'ip_address': member,
+        'timestamp': datetime.fromtimestamp(expiry - lockout * 60, timezone.utc).isoformat(),
+        'lockout_period': lockout,
+        'reason': 'ukabu-trackerd block',
+        'source': DAEMON_SOURCE,
+    }
+
+
+def active_members(entry: Dict[str, Any], now: int) -> List[Dict[str, Any]]:
+    """
+    Get the members of an escalated entry that have not expired
+
+    Args:
+        entry: Blacklist entry (escalated or not)
+        now: Epoch seconds
+
+    Returns:
+        Member entries with an expiry after now
+    """
+    members = []
+    for member in entry.get(MEMBERS_KEY) or []:
+        expiry = get_expiry_epoch(member)
+        if expiry is not None and expiry > now:
+            members.append(member)
+    return members
+
+
+def prefix_entry(prefix: str, members: List[Dict[str, Any]], threshold: int) -> Optional[Dict[str, Any]]:
+    """
+    Build the escalated entry for a prefix
+
+    Args:
+        prefix: Network in CIDR notation
+        members: Active temporary member entries
+        threshold: Escalate only with more members than this
+
+    Returns:
+        Blacklist entry, or None if there are not enough members
+    """
+    if len(members) <= threshold:
+        return None
+
+    # Expiry of the (threshold + 1)-th latest member: after it, no more
+    # than `threshold` members are left and the prefix reverts
+    ranked = sorted(members, key=lambda member: get_expiry_epoch(member) or 0, reverse=True)
+    anchor = ranked[threshold]
+    return {
+        'ip_address': prefix,
+        'timestamp': anchor.get('timestamp'),
+        'lockout_period': anchor.get('lockout_period', 0),
+        'reason': f"Escalated: {len(members)} blocks in {prefix}",
+        MEMBERS_KEY: sorted(members, key=lambda member: member['ip_address']),
+    }
+
+
+class SubnetEscalator:
+    """Replace clusters of temporary blocks with prefix blocks"""
+
+    def __init__(
+        self,
+        ip_manager: IPManager,
+        policy: Optional[Dict[int, Tuple[int, int]]] = None,
+        ipset_client: Optional[IPSetClient] = None,
+        synchronizer: Optional[IPSetSynchronizer] = None
+    ):
+        """
+        Initialize escalator
+
+        Args:
+            ip_manager: IP manager owning the blacklist
+            policy: {family: (prefix length, threshold)} (default:
+                DEFAULT_POLICY); a threshold of 0 disables the family
+            ipset_client: ipset wrapper used to update the sets afterwards
+                (default: IPSetClient())
+            synchronizer: Updates the sets and reads the daemon's blocks
+                (default: IPSetSynchronizer over ipset_client)
+        """
+        self.ip_manager = ip_manager
+        self.policy = dict(DEFAULT_POLICY if policy is None else policy)
+        self.ipset = ipset_client or IPSetClient(dry_run=ip_manager.dry_run)
+        self.synchronizer = synchronizer or IPSetSynchronizer(ip_manager, self.ipset)
+        self.logger = logging.getLogger('ukabu-manager.escalation')
+
+    def plan(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compute escalations without changing anything
+
+        Blocks inside an existing escalated prefix are folded into it.
+        Prefixes that overlap the whitelist, or that are already covered
+        by a wider blacklist entry, are not escalated. Active daemon
+        blocks in the temporary sets that are not blacklisted count as
+        members (see daemon_member) but are never removed.
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Dict with 'remove' (IPs), 'add' (entries), 'escalated',
+            'folded' and 'reverted' counts and 'skipped' ({prefix: reason})
+        """
+        if now is None:
+            now = int(time.time())
+
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        escalated: Dict[Any, Dict[str, Any]] = {}
+        covering: List[Tuple[int, int, int]] = []
+        blacklist = self.ip_manager.get_blacklist()
+        listed = {entry['ip_address'] for entry in blacklist}
+        try:
+            daemon_blocks = self.synchronizer.temporary_blocks(now)
+        except RuntimeError as e:
+            self.logger.warning(f"Not counting daemon blocks: {e}")
+            daemon_blocks = {}
+        daemon = [
+            daemon_member(member, expiry, now) for member, expiry in sorted(daemon_blocks.items())
+            if member not in listed and f"{member}/32" not in listed
+        ]
+
+        for entry in blacklist + daemon:
+            network = parse_network(entry['ip_address'])
+            if network is None:
+                continue
+            prefixlen, threshold = self.policy.get(network.version, (0, 0))
+
+            if entry.get(MEMBERS_KEY):
+                escalated[network] = entry
+                continue
+            permanent = entry.get('lockout_period', 0) == 0
+            expiry = None if permanent else get_expiry_epoch(entry)
+            if not permanent and (expiry is None or expiry <= now):
+                continue
+            if permanent or threshold <= 0 or network.prefixlen <= prefixlen:
+                # Wide or permanent entries are never members; they may
+                # already cover a whole prefix
+                covering.append(network_to_range(network))
+                continue
+            groups.setdefault(network.supernet(new_prefix=prefixlen), []).append(entry)
+
+        whitelist = [
+            network_to_range(network)
+            for network in map(parse_network, self.ip_manager.get_whitelist())
+            if network is not None
+        ]
+
+        def overlaps(ranges: List[Tuple[int, int, int]], family: int, start: int, end: int) -> bool:
+            return any(f == family and s <= end and e >= start for f, s, e in ranges)
+
+        def covered(family: int, start: int, end: int) -> bool:
+            return any(f == family and s <= start and e >= end for f, s, e in covering)
+
+        remove: List[str] = []
+        add: List[Dict[str, Any]] = []
+        stats = {'escalated': 0, 'folded': 0, 'reverted': 0}
+        skipped: Dict[str, str] = {}
+
+        # Existing prefixes: fold in new blocks, drop expired members
+        for network, entry in escalated.items():
+            threshold = self.policy.get(network.version, (0, 0))[1]
+            kept = active_members(entry, now)
+            known = {member['ip_address'] for member in kept}
+            new_members = [
+                member for member in groups.pop(network, [])
+                if member.get('source') != DAEMON_SOURCE or member['ip_address'] not in known
+            ]
+            members = kept + new_members
+            updated = prefix_entry(entry['ip_address'], members, threshold)
+            if updated is None:
+                # Threshold raised or disabled: revert right away
+                remove.append(entry['ip_address'])
+                add.extend(member for member in kept if member.get('source') != DAEMON_SOURCE)
+                stats['reverted'] += 1
+            elif new_members:
+                remove.extend(
+                    member['ip_address'] for member in new_members
+                    if member.get('source') != DAEMON_SOURCE
+                )
+                add.append(updated)
+                stats['folded'] += len(new_members)
+
+        # New prefixes
+        for network, members in sorted(groups.items(), key=lambda item: str(item[0])):
+            threshold = self.policy[network.version][1]
+            if len(members) <= threshold:
+                continue
+            prefix = str(network)
+            family, start, end = network_to_range(network)
+            if overlaps(whitelist, family, start, end):
+                skipped[prefix] = 'whitelisted addresses inside'
+                continue
+            if covered(family, start, end):
+                skipped[prefix] = 'already covered'
+                continue
+            remove.extend(
+                member['ip_address'] for member in members
+                if member.get('source') != DAEMON_SOURCE
+            )
+            add.append(prefix_entry(prefix, members, threshold))
+            stats['escalated'] += 1
+
+        return {'remove': remove, 'add': add, 'skipped': skipped, **stats}
+
+    def escalate(self, now: Optional[int] = None, sync: bool = True) -> Dict[str, Any]:
+        """
+        Apply escalations in one blacklist write
+
+        Args:
+            now: Epoch seconds (default: current time)
+            sync: Add and delete the changed entries in the ipsets
+
+        Returns:
+            Counts: {'escalated', 'folded', 'reverted', 'replaced'} and
+            'skipped' ({prefix: reason})
+        """
+        plan = self.plan(now)
+        stats = {
+            'escalated': plan['escalated'],
+            'folded': plan['folded'],
+            'reverted': plan['reverted'],
+            'replaced': len(plan['remove']),
+            'skipped': plan['skipped'],
+        }
+        for prefix, reason in plan['skipped'].items():
+            self.logger.info(f"Not escalating {prefix}: {reason}")
+
+        if not plan['remove'] and not plan['add']:
+            return stats
+
+        self.ip_manager.replace_blacklist_entries(plan['remove'], plan['add'])
+        if sync:
+            self.synchronizer.apply_changes(plan['add'], plan['remove'], now)
+
+        self.logger.info(
+            f"Subnet escalation: {stats['escalated']} new prefixes, {stats['folded']} blocks folded "
+            f"into existing ones, {stats['reverted']} reverted"
+        )
+        return stats
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+nginx geo include and ipset restore file generation for UKABU WAF
+
+Network lists are collapsed (overlapping and adjacent CIDRs merged) and
+split per address family before rendering. Output files are only rewritten
+when their content hash changes, so unchanged inputs never touch the files
+nginx or ipset read.
+"""
+
+import os
+import hashlib
+import ipaddress
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+from .ipindex import IPNetwork, parse_network
+
+# Above this many IPv4 networks the geo block switches to "ranges" mode
+GEO_RANGES_THRESHOLD = 2048
+
+# Header line carrying the digest of the input list
+DIGEST_HEADER = "# Source digest: "
+
+
+def collapse_networks(networks: Iterable[Union[str, IPNetwork]]) -> Tuple[List[IPNetwork], List[IPNetwork]]:
+    """
+    Collapse networks per address family
+
+    Args:
+        networks: CIDR strings or network objects (invalid entries are skipped)
+
+    Returns:
+        (IPv4 networks, IPv6 networks), each collapsed and sorted
+    """
+    v4 = []
+    v6 = []
+    for item in networks:
+        network = item if isinstance(item, (ipaddress.IPv4Network, ipaddress.IPv6Network)) \
+            else parse_network(str(item))
+        if network is None:
+            continue
+        (v4 if network.version == 4 else v6).append(network)
+
+    return list(ipaddress.collapse_addresses(v4)), list(ipaddress.collapse_addresses(v6))
+
+
+def _ipv4_ranges(networks: List[ipaddress.IPv4Network]) -> List[Tuple[str, str]]:
+    """Merge collapsed IPv4 networks into contiguous start-end ranges."""
+    ranges: List[List[int]] = []
+    for network in networks:
+        start = int(network.network_address)
+        end = int(network.broadcast_address)
+        if ranges and ranges[-1][1] + 1 == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return [
+        (str(ipaddress.IPv4Address(start)), str(ipaddress.IPv4Address(end)))
+        for start, end in ranges
+    ]
+
+
+def render_geo(variable: str, networks: Iterable[Union[str, IPNetwork]],
+               title: str = "", ranges_threshold: int = GEO_RANGES_THRESHOLD,
+               digest: str = "") -> str:
+    """
+    Render a complete nginx geo definition setting $variable to 1 on match
+
+    Small lists produce one geo block in CIDR mode. Once the IPv4 list is
+    larger than ranges_threshold, IPv4 goes into a "ranges" geo block
+    (nginx only supports IPv4 ranges), IPv6 into a separate CIDR block,
+    and a map combines both into $variable.
+
+    Args:
+        variable: Variable name without the leading '$'
+        networks: CIDR strings or network objects
+        title: Comment line for the file header
+        ranges_threshold: IPv4 network count above which ranges mode is used
+        digest: Optional source digest (see source_digest()) recorded in
+            the header
+
+    Returns:
+        File content to include at http{} level
+    """
+    v4, v6 = collapse_networks(networks)
+
+    lines = [
+        "# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.",
+        f"# {title or variable}",
+        "# Generated automatically - do not edit manually",
+        f"# IPv4 networks: {len(v4)}, IPv6 networks: {len(v6)}",
+    ]
+    if digest:
+        lines.append(f"{DIGEST_HEADER}{digest}")
+    lines.append("")
+
+    if len(v4) <= ranges_threshold:
+        lines.append(f"geo ${variable} {{")
+        lines.append("    default 0;")
+        for network in v4 + v6:
+            lines.append(f"    {network} 1;")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    lines.append(f"geo ${variable}_v4 {{")
+    lines.append("    ranges;")
+    lines.append("    default 0;")
+    for start, end in _ipv4_ranges(v4):
+        lines.append(f"    {start}-{end} 1;")
+    lines.append("}")
+    lines.append("")
+    lines.append(f"geo ${variable}_v6 {{")
+    lines.append("    default 0;")
+    for network in v6:
+        lines.append(f"    {network} 1;")
+    lines.append("}")
+    lines.append("")
+    lines.append(f"map ${variable}_v4${variable}_v6 ${variable} {{")
+    lines.append("    default 1;")
+    lines.append("    00 0;")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def render_ipset_restore(set_name: str, networks: Iterable[Union[str, IPNetwork]],
+                         maxelem: int = 50000) -> str:
+    """
+    Render an `ipset restore` script that atomically replaces set contents
+
+    Each family is filled into a scratch set and swapped into place, so
+    the live set is never observed empty. IPv6 networks go into
+    "<set_name>-v6".
+
+    Args:
+        set_name: Name of the IPv4 set
+        networks: CIDR strings or network objects
+        maxelem: maxelem of the live sets (matches ukabu-trackerd); the
+            scratch sets are enlarged if the list is bigger
+
+    Returns:
+        Restore script; load with `ipset restore -exist < file`
+    """
+    v4, v6 = collapse_networks(networks)
+
+    lines = [
+        "# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.",
+        f"# ipset restore script for {set_name}",
+        "# Generated automatically - do not edit manually",
+        "# Load with: ipset restore -exist < this-file",
+    ]
+
+    for name, family, members in ((set_name, 'inet', v4), (f"{set_name}-v6", 'inet6', v6)):
+        size = max(maxelem, len(members))
+        scratch = f"{name}-tmp"
+        lines.append(f"create {name} hash:net family {family} maxelem {maxelem}")
+        lines.append(f"create {scratch} hash:net family {family} maxelem {size}")
+        lines.append(f"flush {scratch}")
+        for network in members:
+            lines.append(f"add {scratch} {network}")
+        lines.append(f"swap {scratch} {name}")
+        lines.append(f"destroy {scratch}")
+
+    return "\n".join(lines) + "\n"
+
+
+def source_digest(entries: Iterable[str], *params: Any) -> str:
+    """
+    Digest of an unordered input list plus rendering parameters
+
+    Args:
+        entries: Input IP / CIDR strings
+        params: Extra values that affect the output (e.g. threshold)
+
+    Returns:
+        Hex digest, independent of entry order and duplicates
+    """
+    h = hashlib.sha256(repr(params).encode('utf-8'))
+    for entry in sorted(set(entries)):
+        h.update(entry.encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+def read_source_digest(filepath: Path) -> Optional[str]:
+    """
+    Read the source digest recorded by render_geo()
+
+    Args:
+        filepath: Generated include file
+
+    Returns:
+        Digest, or None if the file is missing or has none
+    """
+    try:
+        with open(filepath, 'r') as f:
+            for _ in range(10):
+                line = f.readline()
+                if not line:
+                    break
+                if line.startswith(DIGEST_HEADER):
+                    return line[len(DIGEST_HEADER):].strip()
+    except OSError:
+        return None
+    return None
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of text content"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def write_if_changed(filepath: Path, content: str, dry_run: bool = False) -> bool:
+    """
+    Atomically write file unless it already has identical content
+
+    Args:
+        filepath: Output path
+        content: New file content
+        dry_run: If True, only report whether a write would happen
+
+    Returns:
+        True if the file was (or would be) written
+    """
+    filepath = Path(filepath)
+
+    if filepath.exists():
+        with open(filepath, 'rb') as f:
+            if hashlib.sha256(f.read()).hexdigest() == content_hash(content):
+                return False
+
+    if dry_run:
+        return True
+
+    filepath.parent.mkdir(parents=True, exist_ok=True, mode=0o755)
+    temp_path = filepath.with_suffix(filepath.suffix + '.tmp')
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        temp_path.replace(filepath)
+        os.chmod(filepath, 0o644)
+    except Exception as e:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise RuntimeError(f"Failed to save {filepath}: {e}")
+
+    return True
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Compact column-oriented blacklist representation
+
+Holds the blacklist as parallel typed arrays (address, prefix length,
+epoch timestamp, lockout, interned reason) instead of one dict per entry,
+so million-entry lists fit in tens of MB. Filters such as permanent vs
+temporary or expiring-before are evaluated over whole columns, with
+NumPy when it is installed and plain array loops otherwise.
+"""
+
+import os
+import sys
+import json
+import socket
+from array import array
+from datetime import timezone
+from itertools import compress
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .utils import parse_iso_timestamp
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Timestamp column value for entries without a parseable timestamp
+NO_TIMESTAMP = -1
+
+# Expiry column value for permanent entries (and unknown expiries)
+NO_EXPIRY = -1
+
+_MASK64 = (1 << 64) - 1
+
+# Column arrays in on-disk order (see dump())
+_COLUMNS = (
+    'family', 'addr_hi', 'addr_lo', 'prefixlen', 'timestamp',
+    'lockout', 'expiry', 'reason_id', '_ip_offsets'
+)
+CACHE_FORMAT_VERSION = 1
+
+
+def _pack_address(ip_address: str):
+    """
+    Convert IP address or CIDR to (family, high, low, prefixlen)
+
+    Returns:
+        Tuple of integers, or None if the value is not an address
+    """
+    address, _, prefix = ip_address.strip().partition('/')
+    try:
+        family, packed = 4, socket.inet_pton(socket.AF_INET, address)
+    except OSError:
+        try:
+            family, packed = 6, socket.inet_pton(socket.AF_INET6, address.split('%', 1)[0])
+        except OSError:
+            return None
+
+    max_prefix = 32 if family == 4 else 128
+    try:
+        prefixlen = int(prefix) if prefix else max_prefix
+    except ValueError:
+        return None
+    if not 0 <= prefixlen <= max_prefix:
+        return None
+
+    value = int.from_bytes(packed, 'big')
+    return family, value >> 64, value & _MASK64, prefixlen
+
+
+class BlacklistColumns:
+    """Blacklist stored as parallel arrays"""
+
+    def __init__(self):
+        self.family = array('B')
+        self.addr_hi = array('Q')
+        self.addr_lo = array('Q')
+        self.prefixlen = array('B')
+        self.timestamp = array('q')
+        self.lockout = array('q')
+        self.expiry = array('q')
+        self.reason_id = array('L')
+        self.reasons: List[str] = []
+        self._reason_ids: Dict[str, int] = {}
+        # ip_address strings, newline-terminated and concatenated; row i
+        # is _ip_blob[_ip_offsets[i]:_ip_offsets[i + 1] - 1]
+        self._ip_blob = bytearray()
+        self._ip_offsets = array('Q', [0])
+        self.invalid = 0
+        self._last_timestamp: Tuple[Any, int] = (None, NO_TIMESTAMP)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]) -> 'BlacklistColumns':
+        """
+        Build columns from blacklist entries
+
+        Entries are consumed one at a time, so a streaming source never
+        needs the whole list as dicts.
+
+        Args:
+            entries: Blacklist entry dictionaries
+
+        Returns:
+            BlacklistColumns instance
+        """
+        columns = cls()
+        columns.extend(entries)
+        return columns
+
+    def append(self, entry: Dict[str, Any]) -> bool:
+        """
+        Append one blacklist entry
+
+        Args:
+            entry: Blacklist entry dictionary
+
+        Returns:
+            True if appended, False if its ip_address is not valid
+        """
+        return self.extend((entry,)) == 1
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append blacklist entries
+
+        Entries with an invalid ip_address are counted in `invalid` and
+        skipped.
+
+        Args:
+            entries: Blacklist entry dictionaries
+
+        Returns:
+            Number of entries appended
+        """
+        # Hot loop for million-entry loads: bind everything locally
+        family_append = self.family.append
+        hi_append = self.addr_hi.append
+        lo_append = self.addr_lo.append
+        prefix_append = self.prefixlen.append
+        timestamp_append = self.timestamp.append
+        lockout_append = self.lockout.append
+        expiry_append = self.expiry.append
+        reason_append = self.reason_id.append
+        offset_append = self._ip_offsets.append
+        blob = self._ip_blob
+        reason_ids = self._reason_ids
+        parse_timestamp = self._parse_timestamp
+
+        appended = 0
+        for entry in entries:
+            ip_address = entry.get('ip_address')
+            packed = _pack_address(ip_address) if isinstance(ip_address, str) else None
+            if packed is None:
+                self.invalid += 1
+                continue
+
+            try:
+                lockout = int(entry.get('lockout_period', 0) or 0)
+            except (TypeError, ValueError):
+                lockout = 0
+
+            timestamp = parse_timestamp(entry.get('timestamp'))
+            if lockout > 0 and timestamp != NO_TIMESTAMP:
+                expiry = timestamp + lockout * 60
+            else:
+                expiry = NO_EXPIRY
+
+            reason = entry.get('reason') or ''
+            if not isinstance(reason, str):
+                reason = str(reason)
+            reason_id = reason_ids.get(reason)
+            if reason_id is None:
+                reason_id = reason_ids[reason] = len(self.reasons)
+                self.reasons.append(reason)
+
+            family, hi, lo, prefixlen = packed
+            family_append(family)
+            hi_append(hi)
+            lo_append(lo)
+            prefix_append(prefixlen)
+            timestamp_append(timestamp)
+            lockout_append(lockout)
+            expiry_append(expiry)
+            reason_append(reason_id)
+            blob += ip_address.encode('ascii', 'replace') + b'\n'
+            offset_append(len(blob))
+            appended += 1
+        return appended
+
+    def __len__(self) -> int:
+        return len(self.family)
+
+    def _parse_timestamp(self, value: Any) -> int:
+        """
+        Convert ISO timestamp to epoch seconds
+
+        Consecutive entries often share a timestamp (bulk imports), so the
+        last result is reused.
+
+        Returns:
+            Epoch seconds, or NO_TIMESTAMP if missing or unparseable
+        """
+        if value == self._last_timestamp[0]:
+            return self._last_timestamp[1]
+        try:
+            parsed = parse_iso_timestamp(str(value))
+        except (TypeError, ValueError):
+            epoch = NO_TIMESTAMP
+        else:
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            epoch = int(parsed.timestamp())
+        self._last_timestamp = (value, epoch)
+        return epoch
+
+    def nbytes(self) -> int:
+        """
+        Get approximate memory used by the columns
+
+        Returns:
+            Bytes used by the arrays and the address blob
+        """
+        arrays = [getattr(self, name) for name in _COLUMNS]
+        return sum(a.itemsize * len(a) for a in arrays) + len(self._ip_blob)
+
+    def select(self, rows: Iterable[int]) -> 'BlacklistColumns':
+        """
+        Copy selected rows into new columns
+
+        Consecutive rows are copied as slices, so keeping all but a few
+        rows costs a handful of array copies.
+
+        Args:
+            rows: Ascending row numbers
+
+        Returns:
+            BlacklistColumns holding only those rows
+        """
+        result = BlacklistColumns()
+        result.reasons = list(self.reasons)
+        result._reason_ids = dict(self._reason_ids)
+
+        runs: List[List[int]] = []
+        for row in rows:
+            if runs and runs[-1][1] == row:
+                runs[-1][1] = row + 1
+            else:
+                runs.append([row, row + 1])
+
+        offsets = self._ip_offsets
+        for start, end in runs:
+            for name in _COLUMNS[:-1]:
+                getattr(result, name).extend(getattr(self, name)[start:end])
+            shift = offsets[start] - len(result._ip_blob)
+            result._ip_blob += self._ip_blob[offsets[start]:offsets[end]]
+            result._ip_offsets.extend(offset - shift for offset in offsets[start + 1:end + 1])
+        return result
+
+    # Binary cache
+
+    def dump(self, path: Path, key: Any) -> None:
+        """
+        Write columns to a binary cache file
+
+        The file is a JSON header line followed by the raw column arrays
+        and the address blob, so loading it skips JSON parsing of every
+        entry.
+
+        Args:
+            path: Cache file path (written atomically)
+            key: JSON-serializable validation key of the source
+        """
+        header = {
+            'version': CACHE_FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'key': key,
+            'rows': len(self),
+            'invalid': self.invalid,
+            'reasons': self.reasons,
+            'typecodes': [getattr(self, name).typecode for name in _COLUMNS],
+        }
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for name in _COLUMNS:
+                getattr(self, name).tofile(f)
+            f.write(self._ip_blob)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, key: Any) -> Optional['BlacklistColumns']:
+        """
+        Read columns from a binary cache file
+
+        Args:
+            path: Cache file path
+            key: Expected validation key
+
+        Returns:
+            BlacklistColumns, or None if the file is missing, stale or
+            was written in another format
+        """
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if (header.get('version') != CACHE_FORMAT_VERSION
+                        or header.get('byteorder') != sys.byteorder
+                        or header.get('key') != key):
+                    return None
+                columns = cls()
+                rows = header['rows']
+                for name, typecode in zip(_COLUMNS, header['typecodes']):
+                    column = array(typecode)
+                    column.fromfile(f, rows + 1 if name == '_ip_offsets' else rows)
+                    if column.itemsize != getattr(columns, name).itemsize:
+                        return None
+                    setattr(columns, name, column)
+                columns._ip_blob = bytearray(f.read())
+        except (OSError, EOFError, ValueError, KeyError, TypeError):
+            return None
+
+        if len(columns._ip_blob) != columns._ip_offsets[-1]:
+            return None
+        columns.invalid = header.get('invalid', 0)
+        columns.reasons = list(header['reasons'])
+        columns._reason_ids = {reason: i for i, reason in enumerate(columns.reasons)}
+        return columns
+
+    # Row access
+
+    def ip_address(self, row: int) -> str:
+        """Get ip_address string of a row"""
+        offsets = self._ip_offsets
+        return self._ip_blob[offsets[row]:offsets[row + 1] - 1].decode('ascii')
+
+    def ip_addresses(self, rows: Optional[Iterable[int]] = None) -> List[str]:
+        """
+        Get ip_address strings of rows
+
+        Args:
+            rows: Row numbers (default: all rows)
+
+        Returns:
+            List of IP addresses / CIDR ranges
+        """
+        if rows is None:
+            return self._ip_blob.decode('ascii').split('\n')[:-1]
+        return [self.ip_address(row) for row in rows]
+
+    def reason(self, row: int) -> str:
+        """Get reason of a row"""
+        return self.reasons[self.reason_id[row]]
+
+    # Filters
+
+    def _np(self, column: array):
+        """View a column as a NumPy array without copying"""
+        return np.frombuffer(column, dtype=column.typecode) if len(column) else np.zeros(0, dtype=column.typecode)
+
+    def where(
+        self,
+        permanent: Optional[bool] = None,
+        expiring_before: Optional[int] = None,
+        expiring_after: Optional[int] = None,
+        reason: Optional[str] = None,
+        family: Optional[int] = None
+    ) -> Sequence[int]:
+        """
+        Select rows matching all given conditions
+
+        Args:
+            permanent: True for lockout_period 0, False for temporary
+            expiring_before: Temporary entries expiring at or before this
+                epoch time
+            expiring_after: Temporary entries expiring after this epoch time
+            reason: Exact reason
+            family: 4 or 6
+
+        Returns:
+            Ascending row numbers (NumPy array if NumPy is installed)
+        """
+        if reason is not None and reason not in self._reason_ids:
+            return np.zeros(0, dtype=np.int64) if np is not None else []
+        reason_id = self._reason_ids.get(reason)
+
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            if permanent is not None:
+                lockout = self._np(self.lockout)
+                mask &= (lockout == 0) if permanent else (lockout > 0)
+            if expiring_before is not None or expiring_after is not None:
+                expiry = self._np(self.expiry)
+                mask &= expiry != NO_EXPIRY
+                if expiring_before is not None:
+                    mask &= expiry <= expiring_before
+                if expiring_after is not None:
+                    mask &= expiry > expiring_after
+            if reason is not None:
+                mask &= self._np(self.reason_id) == reason_id
+            if family is not None:
+                mask &= self._np(self.family) == family
+            return np.flatnonzero(mask)
+
+        selectors: Iterable[bool] = [True] * len(self)
+        if permanent is not None:
+            selectors = (
+                s and ((lockout == 0) == permanent)
+                for s, lockout in zip(selectors, self.lockout)
+            )
+        if expiring_before is not None or expiring_after is not None:
+            before = expiring_before
+            after = expiring_after
+            selectors = (
+                s and expiry != NO_EXPIRY
+                and (before is None or expiry <= before)
+                and (after is None or expiry > after)
+                for s, expiry in zip(selectors, self.expiry)
+            )
+        if reason is not None:
+            selectors = (s and rid == reason_id for s, rid in zip(selectors, self.reason_id))
+        if family is not None:
+            selectors = (s and fam == family for s, fam in zip(selectors, self.family))
+        return list(compress(range(len(self)), selectors))
+
+    def count(self, **conditions: Any) -> int:
+        """
+        Count rows matching conditions (see where())
+
+        Returns:
+            Number of matching rows
+        """
+        if not conditions:
+            return len(self)
+        return len(self.where(**conditions))
+
+    def reason_counts(self) -> Dict[str, int]:
+        """
+        Count rows per reason
+
+        Returns:
+            Dict of reason -> number of entries
+        """
+        if np is not None:
+            counts = np.bincount(self._np(self.reason_id).astype(np.intp), minlength=len(self.reasons))
+            return {reason: int(counts[i]) for i, reason in enumerate(self.reasons)}
+        counts = [0] * len(self.reasons)
+        for rid in self.reason_id:
+            counts[rid] += 1
+        return dict(zip(self.reasons, counts))
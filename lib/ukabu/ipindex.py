@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Sorted integer-interval index for IP address / CIDR lookups
+
+Networks are converted once into integer [start, end] intervals per address
+family and flattened into disjoint segments, each labelled with the most
+specific (longest prefix) network covering it. Lookups are a single bisect.
+"""
+
+import socket
+import ipaddress
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_network(value: str) -> Optional[IPNetwork]:
+    """
+    Parse IP address or CIDR string into a network
+
+    Args:
+        value: IP address or CIDR notation
+
+    Returns:
+        Network object, or None if the value is not a valid address
+    """
+    try:
+        return ipaddress.ip_network(value.strip(), strict=False)
+    except ValueError:
+        return None
+
+
+def network_to_range(network: IPNetwork) -> Tuple[int, int, int]:
+    """
+    Convert network into an integer interval
+
+    Args:
+        network: IPv4 or IPv6 network
+
+    Returns:
+        (family, first address, last address) where family is 4 or 6
+    """
+    start = int(network.network_address)
+    return network.version, start, start + network.num_addresses - 1
+
+
+def address_to_int(ip: str) -> Optional[Tuple[int, int]]:
+    """
+    Convert IP address string to integer
+
+    Uses inet_pton rather than the ipaddress module, which is several
+    times faster for hot lookup paths.
+
+    Args:
+        ip: IPv4 or IPv6 address string
+
+    Returns:
+        (family, integer address) or None if the string is not an address
+    """
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError):
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip.split('%', 1)[0]), 'big')
+    except (OSError, TypeError):
+        return None
+
+
+class IPIntervalIndex:
+    """Longest-prefix-match index over IPv4 and IPv6 networks"""
+
+    def __init__(self, networks: Optional[Iterable[Any]] = None):
+        """
+        Build index
+
+        Args:
+            networks: Iterable of CIDR strings, or (CIDR, value) pairs.
+                When only a string is given, the string itself is the value.
+                Invalid entries are skipped.
+        """
+        self._starts: Dict[int, List[int]] = {4: [], 6: []}
+        self._ends: Dict[int, List[int]] = {4: [], 6: []}
+        self._values: Dict[int, List[Any]] = {4: [], 6: []}
+        self.count = 0
+        self.skipped = 0
+
+        if networks is not None:
+            self.build(networks)
+
+    def build(self, networks: Iterable[Any]) -> None:
+        """
+        (Re)build index from networks
+
+        Args:
+            networks: Iterable of CIDR strings or (CIDR, value) pairs
+        """
+        intervals: Dict[int, List[Tuple[int, int, int, Any]]] = {4: [], 6: []}
+        self.count = 0
+        self.skipped = 0
+
+        for order, item in enumerate(networks):
+            if isinstance(item, tuple):
+                cidr, value = item
+            else:
+                cidr, value = item, item
+
+            network = cidr if isinstance(cidr, (ipaddress.IPv4Network, ipaddress.IPv6Network)) \
+                else parse_network(str(cidr))
+            if network is None:
+                self.skipped += 1
+                continue
+
+            family, start, end = network_to_range(network)
+            intervals[family].append((start, -end, order, value))
+            self.count += 1
+
+        for family in (4, 6):
+            self._flatten(family, intervals[family])
+
+    def _flatten(self, family: int, intervals: List[Tuple[int, int, int, Any]]) -> None:
+        """
+        Flatten nested CIDR intervals into disjoint labelled segments
+
+        CIDR blocks are either disjoint or nested, so a single sweep with a
+        stack of open intervals yields segments owned by the innermost block.
+        Sorting by (start, -end) puts parents before children; on identical
+        blocks the later entry wins.
+        """
+        starts: List[int] = []
+        ends: List[int] = []
+        values: List[Any] = []
+
+        def emit(lo: int, hi: int, value: Any) -> None:
+            if lo > hi:
+                return
+            if starts and ends[-1] + 1 == lo and values[-1] is value:
+                ends[-1] = hi
+                return
+            starts.append(lo)
+            ends.append(hi)
+            values.append(value)
+
+        intervals.sort(key=lambda item: (item[0], item[1], item[2]))
+
+        stack: List[Tuple[int, Any]] = []
+        cursor = 0
+        for start, neg_end, _order, value in intervals:
+            end = -neg_end
+            while stack and stack[-1][0] < start:
+                top_end, top_value = stack.pop()
+                emit(cursor, top_end, top_value)
+                cursor = top_end + 1
+            if stack:
+                emit(cursor, start - 1, stack[-1][1])
+            stack.append((end, value))
+            cursor = start
+
+        while stack:
+            top_end, top_value = stack.pop()
+            emit(cursor, top_end, top_value)
+            cursor = top_end + 1
+
+        self._starts[family] = starts
+        self._ends[family] = ends
+        self._values[family] = values
+
+    def __len__(self) -> int:
+        return self.count
+
+    def lookup_int(self, family: int, address: int) -> Optional[Any]:
+        """
+        Find most specific network covering an integer address
+
+        Args:
+            family: 4 or 6
+            address: Address as integer
+
+        Returns:
+            Value of the covering network, or None
+        """
+        starts = self._starts[family]
+        i = bisect_right(starts, address) - 1
+        if i >= 0 and address <= self._ends[family][i]:
+            return self._values[family][i]
+        return None
+
+    def lookup(self, ip: str) -> Optional[Any]:
+        """
+        Find most specific network covering an IP address
+
+        Args:
+            ip: IP address string
+
+        Returns:
+            Value of the covering network, or None (also for invalid input)
+        """
+        parsed = address_to_int(ip)
+        if parsed is None:
+            return None
+        return self.lookup_int(*parsed)
+
+    def lookup_many(self, ips: Iterable[str]) -> List[Optional[Any]]:
+        """
+        Find covering networks for many IP addresses
+
+        Same result as calling lookup() per address, with the per-call
+        overhead hoisted out of the loop for batch jobs.
+
+        Args:
+            ips: IP address strings
+
+        Returns:
+            List of covering network values (None where not covered)
+        """
+        inet_pton = socket.inet_pton
+        from_bytes = int.from_bytes
+        af_inet, af_inet6 = socket.AF_INET, socket.AF_INET6
+        starts4, ends4, values4 = self._starts[4], self._ends[4], self._values[4]
+        starts6, ends6, values6 = self._starts[6], self._ends[6], self._values[6]
+
+        results: List[Optional[Any]] = []
+        append = results.append
+        for ip in ips:
+            try:
+                address = from_bytes(inet_pton(af_inet, ip), 'big')
+                starts, ends, values = starts4, ends4, values4
+            except (OSError, TypeError):
+                parsed = address_to_int(ip)
+                if parsed is None or parsed[0] != 6:
+                    append(None)
+                    continue
+                address = parsed[1]
+                starts, ends, values = starts6, ends6, values6
+            i = bisect_right(starts, address) - 1
+            append(values[i] if i >= 0 and address <= ends[i] else None)
+        return results
+
+    def __contains__(self, ip: str) -> bool:
+        return self.lookup(ip) is not None
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Streaming import/export of IP lists for UKABU WAF
+
+Supported formats:
+    plain / cidr  One IP or CIDR per line; '#' and ';' start comments
+                  (threat feeds, netset files, ip_whitelist.conf)
+    csv           First column (or an ip/ip_address/cidr/network column
+                  when a header is present); optional lockout_period or
+                  duration, reason and timestamp columns
+    jsonl         One blacklist entry per line, as in ip_blacklist.conf
+"""
+
+import csv
+import json
+import itertools
+import ipaddress
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+IMPORT_FORMATS = ('auto', 'plain', 'cidr', 'csv', 'jsonl')
+EXPORT_FORMATS = ('plain', 'csv', 'jsonl')
+
+CSV_IP_COLUMNS = ('ip_address', 'ip', 'cidr', 'network', 'address')
+CSV_FIELDS = ('ip_address', 'lockout_period', 'reason', 'timestamp')
+
+
+def normalize_ip(value: str) -> Optional[str]:
+    """
+    Validate and canonicalize IP address or CIDR range
+
+    Single addresses stay in address form; ranges are reduced to their
+    network address (e.g. 10.0.0.5/24 -> 10.0.0.0/24).
+
+    Args:
+        value: IP address or CIDR notation
+
+    Returns:
+        Canonical string, or None if invalid
+    """
+    value = value.strip()
+    try:
+        if '/' in value:
+            return str(ipaddress.ip_network(value, strict=False))
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return None
+
+
+def detect_format(line: str) -> str:
+    """
+    Guess import format from the first data line
+
+    Args:
+        line: First non-empty, non-comment line
+
+    Returns:
+        'jsonl', 'csv' or 'plain'
+    """
+    stripped = line.lstrip()
+    if stripped.startswith('{'):
+        return 'jsonl'
+    if ',' in stripped:
+        return 'csv'
+    return 'plain'
+
+
+def _data_lines(stream: TextIO) -> Iterator[str]:
+    """Yield non-empty, non-comment lines."""
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith(('#', ';')):
+            yield line
+
+
+def _iter_plain(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        # Allow trailing comments / extra columns ("1.2.3.4 ; SBL123")
+        token = line.split('#', 1)[0].split(';', 1)[0].split()
+        if token:
+            yield {'ip_address': token[0]}
+
+
+def _iter_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield {'ip_address': None, 'raw': line}
+            continue
+        if isinstance(record, dict):
+            yield record
+        else:
+            yield {'ip_address': None, 'raw': line}
+
+
+def _iter_csv(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    rows = csv.reader(lines)
+    header = None
+    for row in rows:
+        if not row:
+            continue
+        cells = [cell.strip() for cell in row]
+
+        if header is None:
+            lowered = [cell.lower() for cell in cells]
+            if normalize_ip(cells[0]) is None and any(c in lowered for c in CSV_IP_COLUMNS):
+                header = lowered
+                continue
+            header = []
+
+        if not header:
+            yield {'ip_address': cells[0]}
+            continue
+
+        record = dict(zip(header, cells))
+        ip_value = next((record[c] for c in CSV_IP_COLUMNS if record.get(c)), None)
+        out: Dict[str, Any] = {'ip_address': ip_value}
+        lockout = record.get('lockout_period') or record.get('duration')
+        if lockout:
+            out['lockout_period'] = lockout
+        if record.get('reason'):
+            out['reason'] = record['reason']
+        if record.get('timestamp'):
+            out['timestamp'] = record['timestamp']
+        yield out
+
+
+def iter_ip_records(stream: TextIO, fmt: str = 'auto') -> Iterator[Dict[str, Any]]:
+    """
+    Stream raw records from an IP list
+
+    Records are not validated; 'ip_address' may be missing or invalid and
+    optional fields are passed through as read.
+
+    Args:
+        stream: Text stream (file or stdin)
+        fmt: One of IMPORT_FORMATS
+
+    Returns:
+        Iterator of record dictionaries
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+    lines = _data_lines(stream)
+
+    if fmt == 'auto':
+        first = next(lines, None)
+        if first is None:
+            return
+        fmt = detect_format(first)
+        lines = itertools.chain([first], lines)
+
+    if fmt == 'jsonl':
+        yield from _iter_jsonl(lines)
+    elif fmt == 'csv':
+        yield from _iter_csv(lines)
+    else:
+        yield from _iter_plain(lines)
+
+
+def write_ip_records(stream: TextIO, entries: Iterable[Any], fmt: str = 'plain') -> int:
+    """
+    Write IP list entries to a stream
+
+    Args:
+        stream: Output text stream
+        entries: Blacklist entry dictionaries or plain IP strings
+        fmt: One of EXPORT_FORMATS
+
+    Returns:
+        Number of entries written
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    writer = csv.writer(stream) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(CSV_FIELDS)
+
+    count = 0
+    for entry in entries:
+        record = entry if isinstance(entry, dict) else {'ip_address': entry}
+        if fmt == 'jsonl':
+            stream.write(json.dumps(record) + '\n')
+        elif writer:
+            writer.writerow([record.get(field, '') for field in CSV_FIELDS])
+        else:
+            stream.write(f"{record['ip_address']}\n")
+        count += 1
+
+    return count
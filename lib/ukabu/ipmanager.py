@@ -8,32 +8,196 @@
 IP whitelist and blacklist management for UKABU WAF
 """
 
+import os
 import json
 import logging
-from typing import List, Dict, Optional, Any
+import heapq
+import threading
+from collections import deque
+from datetime import timezone
+from itertools import islice
+from contextlib import nullcontext
+from typing import (
+    List, Dict, Optional, Any, Tuple, Union, Iterable, Iterator, Callable, ContextManager, Set, Deque
+)
 from pathlib import Path
 
 from .utils import (
-    IP_WHITELIST, IP_BLACKLIST,
-    validate_ip, get_timestamp_iso,
-    load_line_file, save_line_file
+    IP_WHITELIST, IP_BLACKLIST, IP_LISTS_DB, IP_BLACKLIST_COLUMNS, IP_WHITELIST_GEO, IP_BLACKLIST_GEO,
+    validate_ip, get_timestamp_iso, parse_iso_timestamp, get_expiry_epoch,
+    load_line_file, save_line_file, file_lock
+)
+from .ipio import normalize_ip
+from .ipindex import IPIntervalIndex, parse_network, network_to_range
+from .ipstore import SQLiteIPStore, blacklist_where
+from .ipcolumns import BlacklistColumns
+from .geoinclude import (
+    GEO_RANGES_THRESHOLD, render_geo, source_digest, read_source_digest, write_if_changed
 )
 
+# Blacklist journal length that triggers a background compaction
+JOURNAL_MAX_OPS = 5000
+
+# Journal operations kept for get_blacklist_changes()
+CHANGE_LOG_MAX_OPS = 50000
+
+# Storage backends for the IP lists
+STORAGE_BACKENDS = ('file', 'sqlite')
+
+# Sort orders of IPManager.iter_blacklist() (None keeps storage order)
+BLACKLIST_SORT_KEYS = ('expiry', 'timestamp')
+
+# Sort key of entries without an expiry (permanent) or timestamp
+_SORT_LAST = 2 ** 62
+_SORT_FIRST = -1
+
 
 class IPManager:
     """Manager for IP whitelist and blacklist"""
     
-    def __init__(self, dry_run: bool = False):
+    def __init__(self, dry_run: bool = False, storage: str = 'file', db_path: Optional[Path] = None):
         """
         Initialize IP manager
         
         Args:
             dry_run: If True, don't actually modify files
+            storage: 'file' (flat files + journal) or 'sqlite'
+            db_path: SQLite database path (sqlite storage only)
         """
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {storage}")
+        
         self.dry_run = dry_run
         self.logger = logging.getLogger('ukabu-manager.ip')
         self.whitelist_path = IP_WHITELIST
         self.blacklist_path = IP_BLACKLIST
+        self.storage = storage
+        self.db_path = Path(db_path) if db_path else IP_LISTS_DB
+        self._store: Optional[SQLiteIPStore] = None
+        self._store_version: Optional[Tuple[int, int]] = None
+        
+        # Parsed blacklist indexed by ip_address, valid while the file's
+        # (mtime, size, inode) matches _blacklist_cache_key
+        self._blacklist_cache: Optional[Dict[str, Dict[str, Any]]] = None
+        self._blacklist_cache_key: Optional[Tuple[int, int, int]] = None
+        
+        # Journal replay position: file identity, bytes and ops consumed
+        self._journal_id: Optional[Tuple[int, int]] = None
+        self._journal_offset = 0
+        self._journal_ops = 0
+        self.journal_max_ops = JOURNAL_MAX_OPS
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._blacklist_lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        
+        # Bumped whenever the cached blacklist changes
+        self._blacklist_version = 0
+        
+        # Journal operations replayed into the cache, as (version, ops)
+        # per replay; complete for every version from the floor on
+        self._blacklist_changes: Deque[Tuple[int, List[Dict[str, Any]]]] = deque()
+        self._blacklist_changes_ops = 0
+        self._blacklist_changes_floor = 0
+        
+        # CIDR containment indexes, rebuilt when their source changes
+        self._blacklist_net_index: Optional[IPIntervalIndex] = None
+        self._blacklist_net_index_version = -1
+        self._whitelist_net_index: Optional[IPIntervalIndex] = None
+        self._whitelist_net_index_key: Optional[Tuple[Any, ...]] = None
+        
+        # Column form of the blacklist for bulk queries, built without
+        # the per-entry dict cache when that is not loaded
+        self._blacklist_columns: Optional[BlacklistColumns] = None
+        self._blacklist_columns_key: Optional[Tuple[Any, ...]] = None
+        self.columns_cache_path = IP_BLACKLIST_COLUMNS
+    
+    # Storage backend
+    
+    @property
+    def store(self) -> Optional[SQLiteIPStore]:
+        """
+        SQLite store, opened on first use (None with file storage)
+        
+        A new database is seeded from the existing flat files.
+        """
+        if self.storage != 'sqlite':
+            return None
+        if self._store is None:
+            is_new = not self.db_path.exists()
+            self._store = SQLiteIPStore(self.db_path)
+            if is_new:
+                self._seed_store()
+        return self._store
+    
+    def _seed_store(self) -> None:
+        """Copy flat-file whitelist and blacklist into a new database"""
+        whitelist = load_line_file(self.whitelist_path)
+        blacklist = list(self._load_file_blacklist_index().values())
+        self._store.replace_whitelist(whitelist)
+        self._store.apply_blacklist_ops({'op': 'add', 'entry': entry} for entry in blacklist)
+        if whitelist or blacklist:
+            self.logger.info(
+                f"Initialized {self.db_path} from flat files "
+                f"({len(whitelist)} whitelist, {len(blacklist)} blacklist entries)"
+            )
+    
+    def import_flat_files(self) -> Dict[str, int]:
+        """
+        Replace database contents with the flat-file lists
+        
+        Returns:
+            Counts: {'whitelist', 'blacklist'}
+        """
+        if self.store is None:
+            raise ValueError("Import requires sqlite storage")
+        
+        whitelist = load_line_file(self.whitelist_path)
+        blacklist = list(self._load_file_blacklist_index().values())
+        
+        if self.dry_run:
+            self.logger.info(
+                f"[DRY-RUN] Would import {len(whitelist)} whitelist and "
+                f"{len(blacklist)} blacklist entries into {self.db_path}"
+            )
+        else:
+            self.store.replace_whitelist(whitelist)
+            ops: List[Dict[str, Any]] = [{'op': 'clear'}]
+            ops.extend({'op': 'add', 'entry': entry} for entry in blacklist)
+            self.store.apply_blacklist_ops(ops)
+            self.logger.info(f"Imported flat files into {self.db_path}")
+        
+        return {'whitelist': len(whitelist), 'blacklist': len(blacklist)}
+    
+    def export_flat_files(self) -> Dict[str, int]:
+        """
+        Write ip_whitelist.conf and ip_blacklist.conf for nginx and the daemon
+        
+        With sqlite storage the files are generated from the database;
+        with file storage the blacklist journal is compacted.
+        
+        Returns:
+            Counts: {'whitelist', 'blacklist'}
+        """
+        if self.store is None:
+            self.compact_blacklist()
+            return {'whitelist': len(self.get_whitelist()), 'blacklist': self.blacklist_count()}
+        
+        if self.dry_run:
+            self.logger.info(f"[DRY-RUN] Would export IP lists from {self.db_path}")
+            return {'whitelist': len(self.get_whitelist()), 'blacklist': self.blacklist_count()}
+        
+        counts = {
+            'whitelist': self.store.export_whitelist(self.whitelist_path),
+            'blacklist': self.store.export_blacklist(self.blacklist_path),
+        }
+        # The exported file is the complete list; drop any stale journal
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self.logger.info(
+            f"Exported {counts['whitelist']} whitelist and {counts['blacklist']} "
+            f"blacklist entries from {self.db_path}"
+        )
+        return counts
     
     # Whitelist management
     
@@ -44,8 +208,33 @@ class IPManager:
         Returns:
             List of IP addresses/ranges
         """
+        if self.store is not None:
+            return self.store.get_whitelist()
         return load_line_file(self.whitelist_path)
     
+    def _whitelist_writer(self) -> ContextManager:
+        """
+        Serialize whitelist read-modify-write cycles across processes
+        
+        Returns:
+            Context manager holding the whitelist lock (no-op in dry-run)
+        """
+        if self.dry_run:
+            return nullcontext()
+        return file_lock(self.whitelist_path.with_suffix(self.whitelist_path.suffix + '.lock'))
+    
+    def _save_whitelist(self, entries: List[str]) -> None:
+        """
+        Save whitelist entries
+        
+        Args:
+            entries: IP addresses/ranges
+        """
+        if self.store is not None:
+            self.store.replace_whitelist(entries)
+        else:
+            save_line_file(self.whitelist_path, entries, backup=True)
+    
     def add_to_whitelist(self, ip_address: str) -> bool:
         """
         Add IP to whitelist (idempotent)
@@ -61,19 +250,22 @@ class IPManager:
         if not is_valid:
             raise ValueError(f"Invalid IP address: {error}")
         
-        # Load current whitelist
-        whitelist = self.get_whitelist()
-        
-        # Check if already whitelisted (idempotent)
-        if ip_address in whitelist:
-            self.logger.info(f"IP {ip_address} already whitelisted, no changes made")
-            return False
-        
-        # Add to whitelist
-        whitelist.append(ip_address)
+        with self._whitelist_writer():
+            # Load current whitelist
+            whitelist = self.get_whitelist()
+            
+            # Check if already whitelisted (idempotent)
+            if ip_address in whitelist:
+                self.logger.info(f"IP {ip_address} already whitelisted, no changes made")
+                return False
+            
+            # Add to whitelist
+            whitelist.append(ip_address)
+            
+            if not self.dry_run:
+                self._save_whitelist(whitelist)
         
         if not self.dry_run:
-            save_line_file(self.whitelist_path, whitelist, backup=True)
             self.logger.info(f"Added {ip_address} to whitelist")
         else:
             self.logger.info(f"[DRY-RUN] Would add {ip_address} to whitelist")
@@ -90,16 +282,19 @@ class IPManager:
         Returns:
             True if IP was removed, False if not found
         """
-        whitelist = self.get_whitelist()
-        
-        if ip_address not in whitelist:
-            self.logger.info(f"IP {ip_address} not in whitelist, no changes made")
-            return False
-        
-        whitelist.remove(ip_address)
+        with self._whitelist_writer():
+            whitelist = self.get_whitelist()
+            
+            if ip_address not in whitelist:
+                self.logger.info(f"IP {ip_address} not in whitelist, no changes made")
+                return False
+            
+            whitelist.remove(ip_address)
+            
+            if not self.dry_run:
+                self._save_whitelist(whitelist)
         
         if not self.dry_run:
-            save_line_file(self.whitelist_path, whitelist, backup=True)
             self.logger.info(f"Removed {ip_address} from whitelist")
         else:
             self.logger.info(f"[DRY-RUN] Would remove {ip_address} from whitelist")
@@ -124,26 +319,139 @@ class IPManager:
             return 0
         
         if not self.dry_run:
-            save_line_file(self.whitelist_path, [], backup=True)
+            self._save_whitelist([])
             self.logger.info(f"Flushed {count} IPs from whitelist")
         else:
             self.logger.info(f"[DRY-RUN] Would flush {count} IPs from whitelist")
         
         return count
     
+    def _whitelist_index(self) -> IPIntervalIndex:
+        """
+        Get CIDR containment index over the whitelist
+        
+        Returns:
+            Index mapping addresses to the covering whitelist entry
+        """
+        if self.store is not None:
+            key = self.store.version()
+        else:
+            try:
+                st = self.whitelist_path.stat()
+                key = (st.st_mtime_ns, st.st_size, st.st_ino)
+            except FileNotFoundError:
+                key = None
+        
+        if self._whitelist_net_index is None or key != self._whitelist_net_index_key:
+            self._whitelist_net_index = IPIntervalIndex(self.get_whitelist())
+            self._whitelist_net_index_key = key
+        return self._whitelist_net_index
+    
+    def find_whitelist_match(self, ip_address: str) -> Optional[str]:
+        """
+        Find whitelist entry covering an IP address
+        
+        Args:
+            ip_address: IP address to check
+        
+        Returns:
+            Most specific whitelist entry (IP or CIDR) containing the
+            address, or None
+        """
+        if self.store is not None:
+            return self.store.find_whitelist_covering(ip_address)
+        return self._whitelist_index().lookup(ip_address)
+    
+    def is_whitelisted(self, ip_address: str) -> bool:
+        """
+        Check if IP is covered by any whitelist entry (CIDR-aware)
+        
+        Args:
+            ip_address: IP address to check
+        
+        Returns:
+            True if an entry contains the address
+        """
+        return self.find_whitelist_match(ip_address) is not None
+    
     # Blacklist management
+    #
+    # The blacklist is stored as a JSONL snapshot (ip_blacklist.conf) plus
+    # an append-only journal (ip_blacklist.conf.journal) of operations:
+    #
+    #   {"op": "add", "entry": {...}}       insert/replace entry
+    #   {"op": "update", "entry": {...}}    replace entry (full entry)
+    #   {"op": "remove", "ip_address": ...} delete entry
+    #   {"op": "clear"}                     delete all entries
+    #
+    # Every op sets or deletes whole entries, so replaying a journal over
+    # a snapshot that already contains some of its ops gives the same
+    # result. Compaction relies on this: the new snapshot is put in place
+    # before the journal is truncated, and a reader in between still sees
+    # the correct list.
+    #
+    # Writers in all processes take an fcntl lock (ip_blacklist.conf.lock)
+    # to decide and append their ops, so a decision is always made against
+    # every op appended before it, and compaction cannot drop an op that
+    # lands while it swaps files. The fsync happens after the lock is
+    # released, as a group commit under a second lock
+    # (ip_blacklist.conf.journal.sync): the first writer to get it syncs
+    # the journal for everyone who appended so far and records the synced
+    # size there, and the writers queued behind it return without syncing.
     
-    def _load_blacklist(self) -> List[Dict[str, Any]]:
+    @property
+    def journal_path(self) -> Path:
+        """Path of the blacklist journal"""
+        return self.blacklist_path.with_suffix(self.blacklist_path.suffix + '.journal')
+    
+    @property
+    def blacklist_lock_path(self) -> Path:
+        """Lock file serializing blacklist writers across processes"""
+        if self.storage == 'sqlite':
+            return self.db_path.with_suffix(self.db_path.suffix + '.lock')
+        return self.blacklist_path.with_suffix(self.blacklist_path.suffix + '.lock')
+    
+    @property
+    def journal_sync_path(self) -> Path:
+        """Group commit lock file, holding the last synced journal size"""
+        return self.journal_path.with_suffix(self.journal_path.suffix + '.sync')
+    
+    def _blacklist_file_key(self) -> Optional[Tuple[int, int, int]]:
         """
-        Load blacklist entries from file
+        Get cache validation key for the blacklist snapshot
         
         Returns:
-            List of blacklist entry dictionaries
+            (mtime_ns, size, inode), or None if the file does not exist
+        """
+        try:
+            st = self.blacklist_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _journal_file_id(self) -> Optional[Tuple[int, int]]:
+        """
+        Get identity of the current journal file
+        
+        Returns:
+            (device, inode), or None if there is no journal
+        """
+        try:
+            st = self.journal_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_dev, st.st_ino)
+    
+    def _iter_blacklist_snapshot(self) -> Iterator[Dict[str, Any]]:
+        """
+        Parse blacklist snapshot one entry at a time
+        
+        Returns:
+            Iterator of entry dictionaries in file order
         """
         if not self.blacklist_path.exists():
-            return []
+            return
         
-        entries = []
         try:
             with open(self.blacklist_path, 'r') as f:
                 for line in f:
@@ -151,45 +459,615 @@ class IPManager:
                     if line and not line.startswith('#'):
                         try:
                             entry = json.loads(line)
-                            entries.append(entry)
                         except json.JSONDecodeError:
                             self.logger.warning(f"Skipping invalid JSON in blacklist: {line}")
+                            continue
+                        ip_address = entry.get('ip_address') if isinstance(entry, dict) else None
+                        if not ip_address:
+                            self.logger.warning(f"Skipping blacklist entry without ip_address: {line}")
+                            continue
+                        yield entry
         except PermissionError:
             raise PermissionError(f"Cannot read {self.blacklist_path} - insufficient permissions")
+    
+    def _read_blacklist_file(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Parse blacklist snapshot into a dict keyed by ip_address
         
-        return entries
+        Returns:
+            Blacklist entries indexed by IP (first entry wins on duplicates)
+        """
+        index: Dict[str, Dict[str, Any]] = {}
+        for entry in self._iter_blacklist_snapshot():
+            index.setdefault(entry['ip_address'], entry)
+        return index
     
-    def _save_blacklist(self, entries: List[Dict[str, Any]]) -> None:
+    def _read_journal_overlay(self) -> Tuple[Dict[str, Optional[Dict[str, Any]]], bool]:
         """
-        Save blacklist entries to file
+        Fold the whole journal into per-IP final states
+        
+        Returns:
+            (overlay, cleared): overlay maps ip_address to its entry, or
+            None if removed; cleared is True if the journal drops every
+            snapshot entry
+        """
+        overlay: Dict[str, Optional[Dict[str, Any]]] = {}
+        cleared = False
+        try:
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return overlay, cleared
+        except PermissionError:
+            raise PermissionError(f"Cannot read {self.journal_path} - insufficient permissions")
+        
+        for line in data[:data.rfind(b'\n') + 1].splitlines():
+            if not line.strip():
+                continue
+            try:
+                op = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if not isinstance(op, dict):
+                continue
+            kind = op.get('op')
+            if kind in ('add', 'update'):
+                entry = op.get('entry')
+                if isinstance(entry, dict) and entry.get('ip_address'):
+                    overlay[entry['ip_address']] = entry
+            elif kind == 'remove':
+                overlay[op.get('ip_address')] = None
+            elif kind == 'clear':
+                overlay.clear()
+                cleared = True
+        return overlay, cleared
+    
+    def _file_blacklist_columns(self) -> BlacklistColumns:
+        """
+        Build blacklist columns from snapshot and journal
+        
+        The snapshot part is read from the binary column cache when it
+        matches the snapshot file, otherwise parsed (one entry at a time)
+        and cached. Journal operations are then applied on top.
+        Compaction writes one line per IP, so the snapshot is not
+        de-duplicated here.
+        
+        Returns:
+            BlacklistColumns instance
+        """
+        key = self._blacklist_file_key()
+        cache_key = [str(self.blacklist_path)] + list(key) if key else None
+        columns = BlacklistColumns.load(self.columns_cache_path, cache_key)
+        if columns is None:
+            columns = BlacklistColumns.from_entries(self._iter_blacklist_snapshot())
+            if key is not None and not self.dry_run:
+                try:
+                    columns.dump(self.columns_cache_path, cache_key)
+                except OSError as e:
+                    self.logger.debug(f"Could not write blacklist column cache: {e}")
+        
+        overlay, cleared = self._read_journal_overlay()
+        if cleared:
+            columns = BlacklistColumns()
+        elif overlay:
+            columns = columns.select(
+                row for row, ip_address in enumerate(columns.ip_addresses())
+                if ip_address not in overlay
+            )
+        columns.extend(entry for entry in overlay.values() if entry is not None)
+        return columns
+    
+    def _apply_journal_op(self, index: Dict[str, Dict[str, Any]], op: Dict[str, Any]) -> None:
+        """
+        Apply one journal operation to a blacklist index
         
         Args:
-            entries: List of blacklist entry dictionaries
+            index: Blacklist entries indexed by IP (modified in place)
+            op: Journal operation
         """
-        if self.dry_run:
-            self.logger.info(f"[DRY-RUN] Would save {len(entries)} entries to blacklist")
+        kind = op.get('op')
+        if kind in ('add', 'update'):
+            entry = op.get('entry')
+            if isinstance(entry, dict) and entry.get('ip_address'):
+                index[entry['ip_address']] = entry
+        elif kind == 'remove':
+            index.pop(op.get('ip_address'), None)
+        elif kind == 'clear':
+            index.clear()
+        else:
+            self.logger.warning(f"Skipping unknown blacklist journal op: {kind}")
+    
+    def _replay_journal(self) -> None:
+        """
+        Apply journal operations appended since the last replay
+        
+        Only complete lines are consumed; a torn final line (crash
+        during append) is left for the next replay.
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
             return
+        except PermissionError:
+            raise PermissionError(f"Cannot read {self.journal_path} - insufficient permissions")
         
-        # Create parent directory if needed
-        self.blacklist_path.parent.mkdir(parents=True, exist_ok=True, mode=0o755)
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
         
-        # Backup existing file
-        if self.blacklist_path.exists():
-            backup_path = self.blacklist_path.with_suffix(self.blacklist_path.suffix + '.bak')
-            self.blacklist_path.rename(backup_path)
+        applied = []
+        for line in data[:end].splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                op = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                self.logger.warning(f"Skipping invalid JSON in blacklist journal: {line[:200]!r}")
+                continue
+            if isinstance(op, dict):
+                self._apply_journal_op(self._blacklist_cache, op)
+                self._journal_ops += 1
+                applied.append(op)
+        
+        self._journal_offset += end
+        self._blacklist_version += 1
+        self._record_blacklist_changes(applied)
+    
+    def _record_blacklist_changes(self, ops: List[Dict[str, Any]]) -> None:
+        """
+        Remember operations applied to the cache for get_blacklist_changes()
+        
+        Args:
+            ops: Operations that produced the current version
+        """
+        if not ops:
+            return
+        changes = self._blacklist_changes
+        changes.append((self._blacklist_version, ops))
+        self._blacklist_changes_ops += len(ops)
+        while self._blacklist_changes_ops > CHANGE_LOG_MAX_OPS and len(changes) > 1:
+            version, dropped = changes.popleft()
+            self._blacklist_changes_ops -= len(dropped)
+            self._blacklist_changes_floor = version
+    
+    def _restart_blacklist_changes(self) -> None:
+        """Forget recorded operations after the cache was rebuilt from scratch"""
+        self._blacklist_changes.clear()
+        self._blacklist_changes_ops = 0
+        self._blacklist_changes_floor = self._blacklist_version
+    
+    def _load_blacklist_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get blacklist indexed by ip_address from the storage backend
+        
+        The returned dict is a cache and must not be modified; changes go
+        through _commit_blacklist_ops().
+        
+        Returns:
+            Blacklist entries indexed by IP
+        """
+        if self.store is None:
+            return self._load_file_blacklist_index()
+        
+        with self._blacklist_lock:
+            version = self.store.version()
+            if self._blacklist_cache is None or version != self._store_version:
+                self._blacklist_cache = {
+                    entry['ip_address']: entry for entry in self.store.iter_blacklist()
+                }
+                self._store_version = version
+                self._blacklist_version += 1
+                self._restart_blacklist_changes()
+            return self._blacklist_cache
+    
+    def _load_file_blacklist_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get parsed blacklist (snapshot + journal) indexed by ip_address
+        
+        The snapshot is only re-parsed when it or the journal file was
+        replaced; otherwise just the journal tail is replayed. The
+        returned dict is the cache itself and must not be modified;
+        changes go through _commit_blacklist_ops().
+        
+        Returns:
+            Blacklist entries indexed by IP
+        """
+        with self._blacklist_lock:
+            key = self._blacklist_file_key()
+            journal_id = self._journal_file_id()
+            
+            if (self._blacklist_cache is None
+                    or key != self._blacklist_cache_key
+                    or journal_id != self._journal_id):
+                self._blacklist_cache = self._read_blacklist_file()
+                self._blacklist_cache_key = key
+                self._journal_id = journal_id
+                self._journal_offset = 0
+                self._journal_ops = 0
+                self._blacklist_version += 1
+                self._restart_blacklist_changes()
+            
+            self._replay_journal()
+            return self._blacklist_cache
+    
+    def blacklist_columns(self) -> BlacklistColumns:
+        """
+        Get blacklist in column form for bulk queries
+        
+        Cached until the backing files or database change. Built from
+        the entry cache when it is already loaded, otherwise streamed
+        from storage (or the snapshot's column cache) so no per-entry
+        dicts are kept.
+        
+        Returns:
+            BlacklistColumns instance (must not be modified)
+        """
+        with self._blacklist_lock:
+            if self.store is not None:
+                key: Tuple[Any, ...] = ('sqlite', self.store.version())
+            else:
+                try:
+                    journal_size = self.journal_path.stat().st_size
+                except FileNotFoundError:
+                    journal_size = 0
+                key = ('file', self._blacklist_file_key(), self._journal_file_id(), journal_size)
+            
+            if self._blacklist_columns is None or key != self._blacklist_columns_key:
+                if self._blacklist_cache is not None:
+                    self._blacklist_columns = BlacklistColumns.from_entries(
+                        self._load_blacklist_index().values()
+                    )
+                elif self.store is not None:
+                    self._blacklist_columns = BlacklistColumns.from_entries(self.store.iter_blacklist())
+                else:
+                    self._blacklist_columns = self._file_blacklist_columns()
+                self._blacklist_columns_key = key
+            return self._blacklist_columns
+    
+    def get_blacklist_version(self) -> int:
+        """
+        Get blacklist change counter
+        
+        Returns:
+            Number that changes whenever the loaded blacklist changes
+            (in this or another process)
+        """
+        with self._blacklist_lock:
+            self._load_blacklist_index()
+            return self._blacklist_version
+    
+    def get_blacklist_changes(self, since: int) -> Tuple[int, Optional[List[Dict[str, Any]]]]:
+        """
+        Get journal operations applied after a blacklist version
+        
+        Lets long-running readers follow the blacklist without rescanning
+        it. Changes cannot be followed across a full reload (snapshot
+        replaced by another process, sqlite storage) or once they were
+        dropped from the bounded change log; callers then rescan.
+        
+        Args:
+            since: Version returned by an earlier call or by
+                get_blacklist_version()
+        
+        Returns:
+            (version, ops): current version and the 'add', 'update',
+            'remove' and 'clear' operations after `since` in order, or
+            None instead of ops if they are not known
+        """
+        with self._blacklist_lock:
+            self._load_blacklist_index()
+            version = self._blacklist_version
+            if since < self._blacklist_changes_floor or since > version:
+                return version, None
+            
+            groups = []
+            for changed, ops in reversed(self._blacklist_changes):
+                if changed <= since:
+                    break
+                groups.append(ops)
+            return version, [op for ops in reversed(groups) for op in ops]
+    
+    def _load_blacklist(self) -> List[Dict[str, Any]]:
+        """
+        Load blacklist entries from file
+        
+        Returns:
+            List of blacklist entry dictionaries
+        """
+        return list(self._load_blacklist_index().values())
+    
+    def _commit_blacklist_ops(self, ops: List[Dict[str, Any]]) -> None:
+        """
+        Append operations to the blacklist journal
+        
+        Args:
+            ops: Journal operations (see module comment above)
+        """
+        if ops:
+            self._update_blacklist(lambda blacklist: ops)
+    
+    def _update_blacklist(
+        self,
+        build: Callable[[Dict[str, Dict[str, Any]]], List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Decide and commit blacklist operations as one writer
+        
+        build() is called with the current blacklist index while the
+        writer lock is held, so checks such as "already blacklisted" see
+        the ops of every other process. All returned operations are
+        written with a single append; durability is then provided by a
+        group commit (see module comment above). Starts a background
+        compaction when the journal grows past journal_max_ops.
+        
+        Args:
+            build: Returns the journal operations to commit
+        
+        Returns:
+            Operations committed (empty if build() returned none)
+        """
+        if self.dry_run:
+            ops = build(self._load_blacklist_index())
+            if ops:
+                self.logger.info(f"[DRY-RUN] Would append {len(ops)} operations to blacklist journal")
+            return ops
+        
+        # Full parse (if any) happens before queueing for the lock; under
+        # it only the journal tail written by other writers is replayed
+        self._load_blacklist_index()
+        
+        if self.store is not None:
+            with file_lock(self.blacklist_lock_path), self._blacklist_lock:
+                ops = build(self._load_blacklist_index())
+                if ops:
+                    self.store.apply_blacklist_ops(ops)
+            return ops
+        
+        with file_lock(self.blacklist_lock_path), self._blacklist_lock:
+            ops = build(self._load_blacklist_index())
+            if not ops:
+                return ops
+            
+            data = ''.join(json.dumps(op) + '\n' for op in ops).encode('utf-8')
+            self.blacklist_path.parent.mkdir(parents=True, exist_ok=True, mode=0o755)
+            try:
+                fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            except OSError as e:
+                raise RuntimeError(f"Failed to write blacklist journal: {e}")
+            try:
+                if os.fstat(fd).st_size > self._journal_offset:
+                    # Unterminated line left by a crashed writer
+                    data = b'\n' + data
+                view = memoryview(data)
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+                end = os.fstat(fd).st_size
+            except OSError as e:
+                os.close(fd)
+                raise RuntimeError(f"Failed to write blacklist journal: {e}")
+            
+            if self._journal_id is None:
+                self._journal_id = self._journal_file_id()
+            self._replay_journal()
+            compact = self._journal_ops >= self.journal_max_ops
+        
+        try:
+            self._sync_journal(fd, end)
+        except OSError as e:
+            raise RuntimeError(f"Failed to sync blacklist journal: {e}")
+        finally:
+            os.close(fd)
+        
+        if compact:
+            self._start_background_compaction()
+        return ops
+    
+    def _sync_journal(self, fd: int, end: int) -> bool:
+        """
+        Make journal data up to an offset durable (group commit)
+        
+        Args:
+            fd: Open descriptor of the journal that was appended to
+            end: Journal size right after our append
+        
+        Returns:
+            True if this call synced, False if an earlier sync covered it
+        """
+        st = os.fstat(fd)
+        with file_lock(self.journal_sync_path) as lock_fd:
+            synced = os.pread(lock_fd, 64, 0).decode('ascii', 'replace').split()
+            if (len(synced) == 3 and synced[:2] == [str(st.st_dev), str(st.st_ino)]
+                    and synced[2].isdigit() and int(synced[2]) >= end):
+                return False
+            
+            # Everything appended before the fsync starts is covered by it
+            size = os.fstat(fd).st_size
+            os.fsync(fd)
+            os.ftruncate(lock_fd, 0)
+            os.pwrite(lock_fd, f"{st.st_dev} {st.st_ino} {size}\n".encode('ascii'), 0)
+            return True
+    
+    def _write_snapshot(self, path: Path, entries: List[Dict[str, Any]]) -> None:
+        """
+        Atomically write blacklist entries as JSONL
+        
+        Args:
+            path: Destination file
+            entries: Blacklist entry dictionaries
+        """
+        temp_path = path.with_suffix(path.suffix + '.tmp')
+        try:
+            with open(temp_path, 'w') as f:
+                f.writelines(json.dumps(entry) + '\n' for entry in entries)
+                f.flush()
+                os.fsync(f.fileno())
+            temp_path.chmod(0o644)
+            temp_path.replace(path)
+        except Exception:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+    
+    def compact_blacklist(self) -> int:
+        """
+        Fold the journal into a new blacklist snapshot
+        
+        The snapshot is written without holding the lock; operations
+        appended meanwhile are carried over into the new journal.
+        
+        Returns:
+            Number of journal operations folded into the snapshot
+        """
+        if self.dry_run:
+            self.logger.info("[DRY-RUN] Would compact blacklist journal")
+            return 0
+        
+        if self.store is not None:
+            self.store.checkpoint()
+            return 0
+        
+        return self._compact_blacklist()
+    
+    def _compact_blacklist(self, min_ops: int = 1) -> int:
+        """
+        Compaction body, run by one thread of one process at a time
+        
+        Args:
+            min_ops: Skip unless the journal holds at least this many
+                operations once the lock is acquired
+        
+        Returns:
+            Number of journal operations folded into the snapshot
+        """
+        compaction_lock = self.blacklist_path.with_suffix(self.blacklist_path.suffix + '.compact.lock')
+        with self._compaction_lock, file_lock(compaction_lock):
+            return self._compact_blacklist_locked(min_ops)
+    
+    def _compact_blacklist_locked(self, min_ops: int) -> int:
+        """Compaction body; caller holds the compaction locks"""
+        with self._blacklist_lock:
+            entries = list(self._load_blacklist_index().values())
+            offset = self._journal_offset
+            folded = self._journal_ops
+            source = (self._blacklist_cache_key, self._journal_id)
         
-        # Write entries as JSONL (JSON Lines)
+        if folded == 0 or folded < min_ops:
+            return 0
+        
+        self.blacklist_path.parent.mkdir(parents=True, exist_ok=True, mode=0o755)
+        snapshot_tmp = self.blacklist_path.with_suffix(self.blacklist_path.suffix + '.compact')
+        journal_tmp = self.journal_path.with_suffix(self.journal_path.suffix + '.tmp')
         try:
-            with open(self.blacklist_path, 'w') as f:
-                for entry in entries:
-                    json.dump(entry, f)
-                    f.write('\n')
+            self._write_snapshot(snapshot_tmp, entries)
             
-            # Set permissions
-            self.blacklist_path.chmod(0o644)
-            self.logger.info(f"Saved {len(entries)} entries to blacklist")
+            # The writer lock keeps other processes from appending between
+            # copying the journal tail and replacing the journal
+            with file_lock(self.blacklist_lock_path), self._blacklist_lock:
+                self._load_blacklist_index()
+                if (self._blacklist_cache_key, self._journal_id) != source:
+                    # Snapshot or journal was replaced meanwhile (another
+                    # compaction); our snapshot is stale
+                    snapshot_tmp.unlink()
+                    return 0
+                
+                tail = b''
+                if self._journal_id is not None:
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read(self._journal_offset - offset)
+                
+                with open(journal_tmp, 'wb') as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                journal_tmp.chmod(0o644)
+                
+                # Snapshot first: snapshot + old journal replays to the
+                # same state, snapshot + new journal is the final state
+                snapshot_tmp.replace(self.blacklist_path)
+                journal_tmp.replace(self.journal_path)
+                
+                self._blacklist_cache_key = self._blacklist_file_key()
+                self._journal_id = self._journal_file_id()
+                self._journal_offset = len(tail)
+                self._journal_ops -= folded
         except Exception as e:
-            raise RuntimeError(f"Failed to save blacklist: {e}")
+            for temp_path in (snapshot_tmp, journal_tmp):
+                if temp_path.exists():
+                    temp_path.unlink()
+            raise RuntimeError(f"Failed to compact blacklist: {e}")
+        
+        self.logger.info(f"Compacted blacklist: {len(entries)} entries, {folded} journal operations folded")
+        return folded
+    
+    def _start_background_compaction(self) -> None:
+        """Run compact_blacklist() in a background thread unless one is running"""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        
+        def run():
+            try:
+                # Another process may have compacted while we waited
+                self._compact_blacklist(min_ops=self.journal_max_ops)
+            except Exception as e:
+                self.logger.warning(f"Background blacklist compaction failed: {e}")
+        
+        # Not a daemon thread: a short-lived CLI process waits for it on exit
+        self._compaction_thread = threading.Thread(
+            target=run, name='ukabu-blacklist-compact', daemon=False
+        )
+        self._compaction_thread.start()
+    
+    def journal_size(self) -> int:
+        """
+        Get number of operations in the blacklist journal
+        
+        Returns:
+            Operations not yet folded into the snapshot
+        """
+        if self.store is not None:
+            return 0
+        
+        with self._blacklist_lock:
+            self._load_blacklist_index()
+            return self._journal_ops
+    
+    def _save_blacklist(self, entries: Union[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]) -> None:
+        """
+        Replace the whole blacklist
+        
+        Recorded as a clear + add journal batch and compacted right
+        away. The previous list is saved to ip_blacklist.conf.bak.
+        
+        Args:
+            entries: List of blacklist entry dictionaries, or dict of
+                entries indexed by IP
+        """
+        if isinstance(entries, dict):
+            entries = list(entries.values())
+        
+        if self.dry_run:
+            self.logger.info(f"[DRY-RUN] Would save {len(entries)} entries to blacklist")
+            return
+        
+        # Backup existing list (snapshot + journal folded)
+        current = self._load_blacklist()
+        if current or self.blacklist_path.exists():
+            backup_path = self.blacklist_path.with_suffix(self.blacklist_path.suffix + '.bak')
+            try:
+                self._write_snapshot(backup_path, current)
+            except Exception as e:
+                raise RuntimeError(f"Failed to back up blacklist: {e}")
+        
+        ops: List[Dict[str, Any]] = [{'op': 'clear'}]
+        ops.extend({'op': 'add', 'entry': entry} for entry in entries)
+        self._commit_blacklist_ops(ops)
+        self.compact_blacklist()
+        self.logger.info(f"Saved {len(entries)} entries to blacklist")
     
     def get_blacklist(self) -> List[Dict[str, Any]]:
         """
@@ -200,6 +1078,164 @@ class IPManager:
         """
         return self._load_blacklist()
     
+    def _iter_blacklist_entries(self, where: str = "", params: Tuple[Any, ...] = ()) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate blacklist entries lazily from the storage backend
+        
+        Args:
+            where: SQL condition (sqlite storage only; other backends
+                return everything and leave filtering to the caller)
+            params: Parameters for the condition
+        
+        Returns:
+            Iterator of entry dictionaries
+        """
+        if self.store is not None:
+            yield from self.store.iter_blacklist(where, params)
+            return
+        
+        with self._blacklist_lock:
+            cached = list(self._blacklist_cache.values()) if self._blacklist_cache is not None else None
+        if cached is not None:
+            yield from cached
+            return
+        
+        overlay, cleared = self._read_journal_overlay()
+        if not cleared:
+            for entry in self._iter_blacklist_snapshot():
+                if entry['ip_address'] not in overlay:
+                    yield entry
+        for entry in overlay.values():
+            if entry is not None:
+                yield entry
+    
+    @staticmethod
+    def blacklist_sort_key(entry: Dict[str, Any], sort: str) -> int:
+        """
+        Get the sort key of an entry for iter_blacklist()
+        
+        Args:
+            entry: Blacklist entry
+            sort: 'expiry' (permanent entries last) or 'timestamp'
+        
+        Returns:
+            Integer key (epoch seconds)
+        """
+        if sort == 'expiry':
+            expiry = get_expiry_epoch(entry)
+            return expiry if expiry is not None else _SORT_LAST
+        try:
+            blocked = parse_iso_timestamp(str(entry.get('timestamp', '')))
+        except ValueError:
+            return _SORT_FIRST
+        if blocked.tzinfo is None:
+            blocked = blocked.replace(tzinfo=timezone.utc)
+        return int(blocked.timestamp())
+    
+    @classmethod
+    def blacklist_cursor(cls, entry: Dict[str, Any], sort: Optional[str], position: int) -> str:
+        """
+        Build the cursor that continues iter_blacklist() after an entry
+        
+        Args:
+            entry: Last entry returned
+            sort: Sort order used
+            position: Number of entries returned so far including this
+                one (storage order only)
+        
+        Returns:
+            Opaque cursor string
+        """
+        if sort is None:
+            return str(position)
+        return f"{cls.blacklist_sort_key(entry, sort)},{entry['ip_address']}"
+    
+    def iter_blacklist(
+        self,
+        permanent: Optional[bool] = None,
+        reason: Optional[str] = None,
+        network: Optional[str] = None,
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate blacklist entries lazily with filters and pagination
+        
+        In storage order entries are streamed and reading stops at the
+        limit. Sorted output keeps only `limit` candidates in memory
+        (heap selection); the cursor for sorted output is the (key, IP)
+        of the last entry, so pages stay stable while the list changes.
+        
+        Args:
+            permanent: True for permanent, False for temporary entries
+            reason: Case-insensitive substring of the reason
+            network: Only entries overlapping this IP/CIDR
+            sort: None (storage order), 'expiry' or 'timestamp'
+            cursor: Value from blacklist_cursor() of the previous page
+            limit: Maximum number of entries
+        
+        Returns:
+            Iterator of entry dictionaries
+        
+        Raises:
+            ValueError: On invalid sort, network or cursor
+        """
+        if sort is not None and sort not in BLACKLIST_SORT_KEYS:
+            raise ValueError(f"Unknown sort order: {sort}")
+        
+        bounds = None
+        if network is not None:
+            parsed = parse_network(network)
+            if parsed is None:
+                raise ValueError(f"Invalid network: {network}")
+            bounds = network_to_range(parsed)
+        reason_lower = reason.lower() if reason else None
+        
+        def matches(entry: Dict[str, Any]) -> bool:
+            if permanent is not None and (entry.get('lockout_period', 0) == 0) != permanent:
+                return False
+            if reason_lower and reason_lower not in str(entry.get('reason', '')).lower():
+                return False
+            if bounds is not None:
+                entry_net = parse_network(entry['ip_address'])
+                if entry_net is None:
+                    return False
+                family, start, end = network_to_range(entry_net)
+                if family != bounds[0] or start > bounds[2] or end < bounds[1]:
+                    return False
+            return True
+        
+        where, params = blacklist_where(permanent, reason, network) if self.store is not None else ("", ())
+        entries = (entry for entry in self._iter_blacklist_entries(where, params) if matches(entry))
+        
+        if sort is None:
+            skip = 0
+            if cursor:
+                try:
+                    skip = int(cursor)
+                except ValueError:
+                    raise ValueError(f"Invalid cursor: {cursor}")
+            stop = skip + limit if limit is not None else None
+            yield from islice(entries, skip, stop)
+            return
+        
+        def key(entry: Dict[str, Any]) -> Tuple[int, str]:
+            return self.blacklist_sort_key(entry, sort), entry['ip_address']
+        
+        if cursor:
+            sort_value, _, cursor_ip = cursor.partition(',')
+            try:
+                after = (int(sort_value), cursor_ip)
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            entries = (entry for entry in entries if key(entry) > after)
+        
+        if limit is not None:
+            yield from heapq.nsmallest(limit, entries, key=key)
+        else:
+            yield from sorted(entries, key=key)
+    
     def is_blacklisted(self, ip_address: str) -> bool:
         """
         Check if IP is blacklisted
@@ -210,8 +1246,93 @@ class IPManager:
         Returns:
             True if IP is blacklisted
         """
-        blacklist = self._load_blacklist()
-        return any(entry['ip_address'] == ip_address for entry in blacklist)
+        if self.store is not None:
+            return self.store.get_blacklist_entry(ip_address) is not None
+        return ip_address in self._load_blacklist_index()
+    
+    def get_blacklist_entry(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Get blacklist entry for IP
+        
+        Args:
+            ip_address: IP address or CIDR range (exact match)
+        
+        Returns:
+            Entry dictionary, or None if not blacklisted
+        """
+        if self.store is not None:
+            return self.store.get_blacklist_entry(ip_address)
+        return self._load_blacklist_index().get(ip_address)
+    
+    def _blacklist_index(self) -> IPIntervalIndex:
+        """
+        Get CIDR containment index over the blacklist
+        
+        Returns:
+            Index mapping addresses to the covering entry's ip_address
+        """
+        with self._blacklist_lock:
+            blacklist = self._load_blacklist_index()
+            if self._blacklist_net_index_version != self._blacklist_version:
+                self._blacklist_net_index = IPIntervalIndex(blacklist.keys())
+                self._blacklist_net_index_version = self._blacklist_version
+            return self._blacklist_net_index
+    
+    def find_blacklist_match(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Find blacklist entry covering an IP address
+        
+        Unlike is_blacklisted(), this matches addresses inside blacklisted
+        CIDR ranges (e.g. 203.0.113.7 is covered by 203.0.113.0/24).
+        
+        Args:
+            ip_address: IP address to check
+        
+        Returns:
+            Most specific covering blacklist entry, or None
+        """
+        if self.store is not None:
+            return self.store.find_blacklist_covering(ip_address)
+        
+        match = self._blacklist_index().lookup(ip_address)
+        if match is None:
+            return None
+        return self._load_blacklist_index().get(match)
+    
+    def match_many(self, ip_addresses: Iterable[str], target: str = 'blacklist') -> Dict[str, Optional[str]]:
+        """
+        Batch CIDR containment lookup
+        
+        Args:
+            ip_addresses: IP addresses to check
+            target: 'whitelist' or 'blacklist'
+        
+        Returns:
+            Dict mapping each address to the covering entry (IP/CIDR
+            string) or None
+        """
+        if target == 'whitelist':
+            index = self._whitelist_index()
+        elif target == 'blacklist':
+            index = self._blacklist_index()
+        else:
+            raise ValueError(f"Unknown list: {target}")
+        
+        ip_addresses = list(ip_addresses)
+        return dict(zip(ip_addresses, index.lookup_many(ip_addresses)))
+    
+    def blacklist_count(self) -> int:
+        """
+        Get number of blacklist entries
+        
+        Returns:
+            Entry count
+        """
+        if self.store is not None:
+            return self.store.blacklist_count()
+        if self._blacklist_cache is not None:
+            return len(self._load_blacklist_index())
+        return len(self.blacklist_columns())
     
     def add_to_blacklist(
         self,
@@ -235,14 +1356,6 @@ class IPManager:
         if not is_valid:
             raise ValueError(f"Invalid IP address: {error}")
         
-        # Load current blacklist
-        blacklist = self._load_blacklist()
-        
-        # Check if already blacklisted (idempotent)
-        if self.is_blacklisted(ip_address):
-            self.logger.info(f"IP {ip_address} already blacklisted, no changes made")
-            return False
-        
         # Create blacklist entry
         entry = {
             'ip_address': ip_address,
@@ -251,8 +1364,15 @@ class IPManager:
             'reason': reason
         }
         
-        blacklist.append(entry)
-        self._save_blacklist(blacklist)
+        def build(blacklist):
+            # Check if already blacklisted (idempotent)
+            if ip_address in blacklist:
+                return []
+            return [{'op': 'add', 'entry': entry}]
+        
+        if not self._update_blacklist(build):
+            self.logger.info(f"IP {ip_address} already blacklisted, no changes made")
+            return False
         
         if duration == 0:
             self.logger.info(f"Added {ip_address} to permanent blacklist")
@@ -271,18 +1391,15 @@ class IPManager:
         Returns:
             True if IP was removed, False if not found
         """
-        blacklist = self._load_blacklist()
+        def build(blacklist):
+            if ip_address not in blacklist:
+                return []
+            return [{'op': 'remove', 'ip_address': ip_address}]
         
-        # Find matching entry
-        matching_entries = [e for e in blacklist if e['ip_address'] == ip_address]
-        if not matching_entries:
+        if not self._update_blacklist(build):
             self.logger.info(f"IP {ip_address} not in blacklist, no changes made")
             return False
         
-        # Remove all matching entries
-        blacklist = [e for e in blacklist if e['ip_address'] != ip_address]
-        self._save_blacklist(blacklist)
-        
         self.logger.info(f"Removed {ip_address} from blacklist")
         return True
     
@@ -303,27 +1420,20 @@ class IPManager:
         Returns:
             True if entry was updated
         """
-        blacklist = self._load_blacklist()
+        def build(blacklist):
+            if ip_address not in blacklist:
+                raise ValueError(f"IP {ip_address} not found in blacklist")
+            
+            # Update a copy; the cached entry changes when the op is replayed
+            entry = dict(blacklist[ip_address])
+            if duration is not None:
+                entry['lockout_period'] = duration
+            if reason is not None:
+                entry['reason'] = reason
+            entry['updated_at'] = get_timestamp_iso()
+            return [{'op': 'update', 'entry': entry}]
         
-        # Find matching entry
-        entry_index = None
-        for i, entry in enumerate(blacklist):
-            if entry['ip_address'] == ip_address:
-                entry_index = i
-                break
-        
-        if entry_index is None:
-            raise ValueError(f"IP {ip_address} not found in blacklist")
-        
-        # Update entry
-        entry = blacklist[entry_index]
-        if duration is not None:
-            entry['lockout_period'] = duration
-        if reason is not None:
-            entry['reason'] = reason
-        entry['updated_at'] = get_timestamp_iso()
-        
-        self._save_blacklist(blacklist)
+        self._update_blacklist(build)
         self.logger.info(f"Updated blacklist entry for {ip_address}")
         return True
     
@@ -337,8 +1447,7 @@ class IPManager:
         Returns:
             Number of IPs removed
         """
-        blacklist = self._load_blacklist()
-        count = len(blacklist)
+        count = self.blacklist_count()
         
         if count == 0:
             self.logger.info("Blacklist is already empty, no changes made")
@@ -348,6 +1457,203 @@ class IPManager:
         self.logger.info(f"Flushed {count} IPs from blacklist")
         return count
     
+    # Bulk operations
+    
+    def bulk_add(
+        self,
+        records: Iterable[Any],
+        target: str = 'blacklist',
+        duration: int = 0,
+        reason: str = ""
+    ) -> Dict[str, int]:
+        """
+        Add many IPs to the whitelist or blacklist in one atomic write
+        
+        Records are validated, canonicalized and deduplicated against the
+        current list (and each other) with a set/dict lookup, then written
+        once (a single journal append for the blacklist).
+        
+        Args:
+            records: IP strings or record dicts (see ipio.iter_ip_records);
+                blacklist records may carry lockout_period, reason and
+                timestamp, which override duration/reason
+            target: 'whitelist' or 'blacklist'
+            duration: Default lockout duration in minutes (blacklist only)
+            reason: Default reason (blacklist only)
+        
+        Returns:
+            Counts: {'added', 'duplicates', 'invalid'}
+        """
+        if target not in ('whitelist', 'blacklist'):
+            raise ValueError(f"Unknown list: {target}")
+        
+        stats = {'added': 0, 'duplicates': 0, 'invalid': 0}
+        
+        if target == 'whitelist':
+            records = list(records)
+            with self._whitelist_writer():
+                whitelist = self.get_whitelist()
+                existing = set(whitelist)
+                for record in records:
+                    raw = record.get('ip_address') if isinstance(record, dict) else record
+                    ip_address = normalize_ip(str(raw)) if raw else None
+                    if ip_address is None:
+                        stats['invalid'] += 1
+                    elif ip_address in existing or raw in existing:
+                        stats['duplicates'] += 1
+                    else:
+                        existing.add(ip_address)
+                        whitelist.append(ip_address)
+                        stats['added'] += 1
+                
+                if stats['added'] and not self.dry_run:
+                    self._save_whitelist(whitelist)
+            
+            if stats['added']:
+                if not self.dry_run:
+                    self.logger.info(f"Bulk added {stats['added']} IPs to whitelist")
+                else:
+                    self.logger.info(f"[DRY-RUN] Would bulk add {stats['added']} IPs to whitelist")
+            return stats
+        
+        candidates: Dict[str, Dict[str, Any]] = {}
+        raw_values: Dict[str, Any] = {}
+        now = get_timestamp_iso()
+        
+        for record in records:
+            if not isinstance(record, dict):
+                record = {'ip_address': record}
+            raw = record.get('ip_address')
+            ip_address = normalize_ip(str(raw)) if raw else None
+            if ip_address is None:
+                stats['invalid'] += 1
+                continue
+            if ip_address in candidates:
+                stats['duplicates'] += 1
+                continue
+            try:
+                lockout = int(record.get('lockout_period', duration) or 0)
+            except (TypeError, ValueError):
+                stats['invalid'] += 1
+                continue
+            
+            candidates[ip_address] = {
+                'ip_address': ip_address,
+                'timestamp': record.get('timestamp') or now,
+                'lockout_period': lockout,
+                'reason': record.get('reason', reason) or ""
+            }
+            raw_values[ip_address] = raw
+        
+        def build(blacklist):
+            return [
+                {'op': 'add', 'entry': entry} for ip_address, entry in candidates.items()
+                if ip_address not in blacklist and raw_values[ip_address] not in blacklist
+            ]
+        
+        stats['added'] = len(self._update_blacklist(build)) if candidates else 0
+        stats['duplicates'] += len(candidates) - stats['added']
+        if stats['added']:
+            self.logger.info(f"Bulk added {stats['added']} IPs to blacklist")
+        
+        return stats
+    
+    def bulk_remove(self, ip_addresses: Iterable[Any], target: str = 'blacklist') -> Dict[str, int]:
+        """
+        Remove many IPs from the whitelist or blacklist in one atomic write
+        
+        Args:
+            ip_addresses: IP strings or record dicts with 'ip_address'
+            target: 'whitelist' or 'blacklist'
+        
+        Returns:
+            Counts: {'removed', 'missing', 'invalid'}
+        """
+        if target not in ('whitelist', 'blacklist'):
+            raise ValueError(f"Unknown list: {target}")
+        
+        stats = {'removed': 0, 'missing': 0, 'invalid': 0}
+        
+        requested: List[Tuple[str, str]] = []
+        for item in ip_addresses:
+            raw = item.get('ip_address') if isinstance(item, dict) else item
+            raw = str(raw).strip() if raw else ''
+            ip_address = normalize_ip(raw) if raw else None
+            if ip_address is None:
+                stats['invalid'] += 1
+            else:
+                requested.append((raw, ip_address))
+        
+        def select(present) -> Set[str]:
+            to_remove = set()
+            for raw, ip_address in requested:
+                if raw in present:
+                    to_remove.add(raw)
+                elif ip_address in present:
+                    to_remove.add(ip_address)
+                else:
+                    stats['missing'] += 1
+            return to_remove
+        
+        if target == 'whitelist':
+            with self._whitelist_writer():
+                current = self.get_whitelist()
+                to_remove = select(set(current))
+                if to_remove and not self.dry_run:
+                    self._save_whitelist([ip for ip in current if ip not in to_remove])
+            if to_remove:
+                if not self.dry_run:
+                    self.logger.info(f"Bulk removed {len(to_remove)} IPs from whitelist")
+                else:
+                    self.logger.info(f"[DRY-RUN] Would bulk remove {len(to_remove)} IPs from whitelist")
+        else:
+            def build(blacklist):
+                stats['missing'] = 0
+                return [{'op': 'remove', 'ip_address': ip_address} for ip_address in sorted(select(blacklist))]
+            
+            to_remove = self._update_blacklist(build) if requested else []
+            if to_remove:
+                self.logger.info(f"Bulk removed {len(to_remove)} IPs from blacklist")
+        
+        stats['removed'] = len(to_remove)
+        return stats
+    
+    def replace_blacklist_entries(
+        self,
+        remove: Iterable[str],
+        add: Iterable[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """
+        Remove and add blacklist entries in one atomic write
+        
+        Readers never see the list between the two halves, e.g. members
+        removed but the prefix replacing them not yet added.
+        
+        Args:
+            remove: IP addresses/ranges to remove (missing ones are ignored)
+            add: Complete entries to add (replacing entries with the same IP)
+        
+        Returns:
+            Counts: {'removed', 'added'}
+        """
+        remove = list(dict.fromkeys(remove))
+        add = list(add)
+        for entry in add:
+            if normalize_ip(str(entry.get('ip_address', ''))) is None:
+                raise ValueError(f"Invalid IP address: {entry.get('ip_address')}")
+        
+        stats = {'removed': 0, 'added': len(add)}
+        
+        def build(blacklist):
+            ops = [{'op': 'remove', 'ip_address': ip_address} for ip_address in remove if ip_address in blacklist]
+            stats['removed'] = len(ops)
+            ops.extend({'op': 'add', 'entry': entry} for entry in add)
+            return ops
+        
+        self._update_blacklist(build)
+        self.logger.info(f"Replaced {stats['removed']} blacklist entries with {stats['added']}")
+        return stats
+    
     def get_permanent_blocks(self) -> List[str]:
         """
         Get list of permanently blacklisted IPs
@@ -355,12 +1661,32 @@ class IPManager:
         Returns:
             List of IP addresses with lockout_period=0
         """
-        blacklist = self._load_blacklist()
-        return [
-            entry['ip_address']
-            for entry in blacklist
-            if entry.get('lockout_period', 0) == 0
-        ]
+        columns = self.blacklist_columns()
+        return columns.ip_addresses(columns.where(permanent=True))
+    
+    def count_blocks(self) -> Dict[str, int]:
+        """
+        Count blacklist entries by kind
+        
+        Returns:
+            Counts: {'total', 'permanent', 'temporary'}
+        """
+        columns = self.blacklist_columns()
+        permanent = columns.count(permanent=True)
+        return {'total': len(columns), 'permanent': permanent, 'temporary': len(columns) - permanent}
+    
+    def get_expiring_blocks(self, before: int) -> List[str]:
+        """
+        Get temporary blocks whose lockout ends by a given time
+        
+        Args:
+            before: Epoch seconds
+        
+        Returns:
+            List of IP addresses expiring at or before that time
+        """
+        columns = self.blacklist_columns()
+        return columns.ip_addresses(columns.where(expiring_before=before))
     
     def get_temporary_blocks(self) -> List[Dict[str, Any]]:
         """
@@ -375,3 +1701,52 @@ class IPManager:
             for entry in blacklist
             if entry.get('lockout_period', 0) > 0
         ]
+    
+    # nginx geo includes
+    
+    def compile_geo_includes(
+        self,
+        whitelist_geo: Optional[Path] = None,
+        blacklist_geo: Optional[Path] = None,
+        ranges_threshold: int = GEO_RANGES_THRESHOLD
+    ) -> Dict[str, bool]:
+        """
+        Compile whitelist and blacklist into nginx geo include files
+        
+        Defines $is_ip_whitelisted and $is_ip_blacklisted. Networks are
+        collapsed and split per family; large IPv4 lists use geo ranges
+        mode. A digest of the input list is stored in each file, so an
+        unchanged list is detected without rendering.
+        
+        Args:
+            whitelist_geo: Output path (default: ip_whitelist_generated.conf)
+            blacklist_geo: Output path (default: ip_blacklist_generated.conf)
+            ranges_threshold: IPv4 network count above which ranges mode is used
+        
+        Returns:
+            Dict with 'whitelist' and 'blacklist' set to True if that file
+            changed (or would change in dry-run mode)
+        """
+        targets = (
+            ('whitelist', 'is_ip_whitelisted', whitelist_geo or IP_WHITELIST_GEO,
+             "IP whitelist (bypasses PoW challenges)", self.get_whitelist),
+            ('blacklist', 'is_ip_blacklisted', blacklist_geo or IP_BLACKLIST_GEO,
+             "IP blacklist", lambda: list(self._load_blacklist_index().keys())),
+        )
+        
+        changed = {}
+        for name, variable, path, title, source in targets:
+            entries = source()
+            digest = source_digest(entries, variable, ranges_threshold)
+            if read_source_digest(path) == digest:
+                changed[name] = False
+                continue
+            
+            content = render_geo(variable, entries, title=title,
+                                 ranges_threshold=ranges_threshold, digest=digest)
+            changed[name] = write_if_changed(path, content, dry_run=self.dry_run)
+            if changed[name]:
+                prefix = "[DRY-RUN] Would write" if self.dry_run else "Wrote"
+                self.logger.info(f"{prefix} {path} ({len(entries)} {name} entries)")
+        
+        return changed
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+ipset command wrapper for UKABU WAF
+
+Reads set contents with one `ipset save` and applies changes as one
+`ipset restore` transaction instead of a fork per address.
+"""
+
+import os
+import logging
+import subprocess
+from typing import Any, Dict, Iterable, List, Optional
+
+from .ipio import normalize_ip
+
+# Set names used by ukabu-trackerd (go-daemon/pkg/ipset/manager.go)
+PERMANENT_SET_NAME = "ukabu-permanent"
+WHITELIST_SET_NAME = "ukabu-whitelist"
+SEARCH_ENGINES_SET_NAME = "ukabu-search-engines"
+TEMPORARY_SET_PREFIX = "ukabu-temporary_"
+DEFAULT_MAXELEM = 50000
+TEMPORARY_MAXELEM = 20000
+
+# Largest per-element timeout ipset accepts (seconds, ~24.8 days)
+MAX_TIMEOUT = 2147483
+
+# ipset binary, overridable for testing and non-standard installs
+IPSET_BINARY = os.environ.get('UKABU_IPSET', 'ipset')
+
+
+def ipset_member(ip_address: str) -> Optional[str]:
+    """
+    Convert IP address or CIDR to the form ipset prints
+
+    ipset lists host entries without a /32 or /128 suffix.
+
+    Args:
+        ip_address: IP address or CIDR notation
+
+    Returns:
+        Member string, or None if invalid
+    """
+    normalized = normalize_ip(ip_address)
+    if normalized is None:
+        return None
+    if normalized.endswith('/32') and ':' not in normalized:
+        return normalized[:-3]
+    if normalized.endswith('/128'):
+        return normalized[:-4]
+    return normalized
+
+
+class IPSetClient:
+    """Thin wrapper around the ipset command"""
+
+    def __init__(self, binary: str = IPSET_BINARY, dry_run: bool = False):
+        """
+        Initialize ipset client
+
+        Args:
+            binary: ipset executable
+            dry_run: If True, don't apply restore scripts
+        """
+        self.binary = binary
+        self.dry_run = dry_run
+        self.logger = logging.getLogger('ukabu-manager.ipset')
+
+    def _run(self, args: List[str], input_text: Optional[str] = None) -> str:
+        """
+        Run ipset command
+
+        Args:
+            args: Command arguments
+            input_text: Data for stdin
+
+        Returns:
+            Command stdout
+
+        Raises:
+            RuntimeError: If the command is missing or fails
+        """
+        try:
+            result = subprocess.run(
+                [self.binary] + args,
+                input=input_text,
+                capture_output=True,
+                text=True,
+                check=False
+            )
+        except FileNotFoundError:
+            raise RuntimeError(f"{self.binary} command not found - is ipset installed?")
+
+        if result.returncode != 0:
+            error_msg = (result.stderr or result.stdout).strip()
+            raise RuntimeError(f"ipset {args[0]} failed: {error_msg}")
+        return result.stdout
+
+    def list_sets(self, prefix: str = "") -> List[str]:
+        """
+        List set names
+
+        Args:
+            prefix: Only return sets starting with this prefix
+
+        Returns:
+            Set names
+        """
+        names = self._run(['list', '-n']).split()
+        return [name for name in names if name.startswith(prefix)]
+
+    def timeout_sets(self, prefix: str = "") -> List[str]:
+        """
+        List sets created with timeout support
+
+        Reads only the set headers (`ipset list -t`), not the members.
+
+        Args:
+            prefix: Only return sets starting with this prefix
+
+        Returns:
+            Set names
+        """
+        names = []
+        name = None
+        for line in self._run(['list', '-t']).splitlines():
+            if line.startswith('Name:'):
+                name = line.split(':', 1)[1].strip()
+            elif line.startswith('Header:') and name and name.startswith(prefix):
+                if 'timeout' in line.split():
+                    names.append(name)
+        return names
+
+    def save(self, set_names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Read set definitions and members
+
+        Args:
+            set_names: Sets to read (all sets if None)
+
+        Returns:
+            Dict of set name -> {'type', 'options', 'maxelem', 'timeout',
+            'members', 'timeouts'}; options is the raw option list of the
+            create line, timeout tells whether the set supports element
+            timeouts, members is a set of member strings and timeouts maps
+            members to their remaining timeout in seconds (timeout sets only)
+        """
+        if set_names is None:
+            outputs = [self._run(['save'])]
+        else:
+            outputs = [self._run(['save', name]) for name in set_names]
+
+        sets: Dict[str, Dict[str, Any]] = {}
+        for output in outputs:
+            for line in output.splitlines():
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                if parts[0] == 'create':
+                    options = parts[3:]
+                    maxelem = DEFAULT_MAXELEM
+                    if 'maxelem' in options:
+                        i = options.index('maxelem')
+                        if i + 1 < len(options) and options[i + 1].isdigit():
+                            maxelem = int(options[i + 1])
+                    sets[parts[1]] = {
+                        'type': parts[2],
+                        'options': options,
+                        'maxelem': maxelem,
+                        'timeout': 'timeout' in options,
+                        'members': set(),
+                        'timeouts': {},
+                    }
+                elif parts[0] == 'add' and parts[1] in sets:
+                    sets[parts[1]]['members'].add(parts[2])
+                    if 'timeout' in parts[3:-1]:
+                        value = parts[parts.index('timeout', 3) + 1]
+                        if value.isdigit():
+                            sets[parts[1]]['timeouts'][parts[2]] = int(value)
+        return sets
+
+    def restore(self, lines: Iterable[str]) -> int:
+        """
+        Apply commands (add/del/create/...) in one `ipset restore -exist`
+
+        Args:
+            lines: Restore commands without trailing newline
+
+        Returns:
+            Number of commands applied
+        """
+        script = [line for line in lines if line]
+        if not script:
+            return 0
+
+        if self.dry_run:
+            self.logger.info(f"[DRY-RUN] Would apply {len(script)} ipset commands")
+            return len(script)
+
+        self._run(['restore', '-exist'], input_text="\n".join(script) + "\nCOMMIT\n")
+        return len(script)
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+SQLite storage backend for the UKABU WAF IP whitelist and blacklist
+
+Entries are stored with their network as integer bounds (family, start,
+end) so range queries are index range scans. IPv4 bounds are plain
+INTEGERs; IPv6 bounds do not fit SQLite's 64-bit integers and are stored
+as 16-byte big-endian BLOBs, which compare in numeric order.
+
+A containment lookup (the most specific entry holding an address) cannot
+be answered by one range condition on (start, end) without scanning every
+row below the address. Instead the address is masked to each prefix
+length present in the table, longest first, and each candidate network is
+an exact (family, start, end) index probe: at most 33 (IPv4) or 129
+(IPv6) probes, usually a handful.
+
+The flat files (ip_blacklist.conf, ip_whitelist.conf) remain the format
+nginx and ukabu-trackerd read; they are written from the database on
+demand with export_blacklist()/export_whitelist().
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .ipindex import parse_network, network_to_range, address_to_int
+from .utils import get_expiry_epoch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blacklist (
+    ip_address     TEXT PRIMARY KEY,
+    family         INTEGER NOT NULL,
+    range_start    NOT NULL,
+    range_end      NOT NULL,
+    prefixlen      INTEGER NOT NULL,
+    timestamp      TEXT,
+    lockout_period INTEGER NOT NULL DEFAULT 0,
+    expires_at     INTEGER,
+    reason         TEXT NOT NULL DEFAULT '',
+    entry          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blacklist_range ON blacklist(family, range_start, range_end);
+CREATE INDEX IF NOT EXISTS idx_blacklist_prefix ON blacklist(family, prefixlen);
+CREATE INDEX IF NOT EXISTS idx_blacklist_expires ON blacklist(expires_at);
+CREATE INDEX IF NOT EXISTS idx_blacklist_reason ON blacklist(reason);
+
+CREATE TABLE IF NOT EXISTS whitelist (
+    ip_address     TEXT PRIMARY KEY,
+    family         INTEGER NOT NULL,
+    range_start    NOT NULL,
+    range_end      NOT NULL,
+    prefixlen      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_whitelist_range ON whitelist(family, range_start, range_end);
+CREATE INDEX IF NOT EXISTS idx_whitelist_prefix ON whitelist(family, prefixlen);
+"""
+
+# Rows fetched per query by iter_blacklist()
+ITER_BATCH_SIZE = 1000
+
+# Address width per family
+FAMILY_BITS = {4: 32, 6: 128}
+
+
+def encode_address(family: int, address: int) -> Union[int, bytes]:
+    """
+    Encode integer address for storage
+
+    Args:
+        family: 4 or 6
+        address: Address as integer
+
+    Returns:
+        INTEGER value for IPv4, 16-byte big-endian BLOB for IPv6
+    """
+    if family == 4:
+        return address
+    return address.to_bytes(16, 'big')
+
+
+def _network_columns(ip_address: str) -> Optional[Tuple[int, Union[int, bytes], Union[int, bytes], int]]:
+    """Get (family, start, end, prefixlen) for an IP/CIDR string, or None"""
+    network = parse_network(ip_address)
+    if network is None:
+        return None
+    family, start, end = network_to_range(network)
+    return family, encode_address(family, start), encode_address(family, end), network.prefixlen
+
+
+def blacklist_where(
+    permanent: Optional[bool] = None,
+    reason: Optional[str] = None,
+    network: Optional[str] = None
+) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Build an iter_blacklist() condition from list filters
+
+    Args:
+        permanent: True for lockout_period 0, False for temporary entries
+        reason: Case-insensitive substring of the reason
+        network: Only entries overlapping this IP/CIDR
+
+    Returns:
+        (SQL condition, parameters); empty condition if no filter
+    """
+    conditions: List[str] = []
+    params: List[Any] = []
+    if permanent is not None:
+        conditions.append("lockout_period = 0" if permanent else "lockout_period > 0")
+    if reason:
+        conditions.append("instr(lower(reason), lower(?)) > 0")
+        params.append(reason)
+    if network is not None:
+        columns = _network_columns(network)
+        if columns is None:
+            raise ValueError(f"Invalid network: {network}")
+        family, start, end, _prefixlen = columns
+        conditions.append("family = ? AND range_start <= ? AND range_end >= ?")
+        params.extend((family, end, start))
+    return " AND ".join(conditions), tuple(params)
+
+
+class SQLiteIPStore:
+    """SQLite (WAL mode) store for whitelist and blacklist entries"""
+
+    def __init__(self, db_path: Path):
+        """
+        Open (and create if needed) the database
+
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.logger = logging.getLogger('ukabu-manager.ipstore')
+        self._lock = threading.RLock()
+        self._changes = 0
+        # (table, family) -> (version, prefix lengths longest first)
+        self._prefixlens: Dict[Tuple[str, int], Tuple[Tuple[int, int], List[int]]] = {}
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True, mode=0o755)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self.conn.close()
+
+    def version(self) -> Tuple[int, int]:
+        """
+        Get change marker for cache validation
+
+        Returns:
+            Tuple that changes whenever this or another connection
+            commits a change
+        """
+        with self._lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            return (data_version, self._changes)
+
+    def checkpoint(self) -> None:
+        """Fold the WAL into the main database file"""
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # Blacklist
+
+    def _blacklist_row(self, entry: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        """Build a blacklist row from an entry, or None if the IP is invalid"""
+        ip_address = entry.get('ip_address')
+        columns = _network_columns(str(ip_address)) if ip_address else None
+        if columns is None:
+            return None
+        try:
+            lockout = int(entry.get('lockout_period', 0) or 0)
+        except (TypeError, ValueError):
+            lockout = 0
+        return (
+            ip_address, *columns,
+            entry.get('timestamp'), lockout, get_expiry_epoch(entry),
+            entry.get('reason') or '', json.dumps(entry)
+        )
+
+    def apply_blacklist_ops(self, ops: Iterable[Dict[str, Any]]) -> int:
+        """
+        Apply blacklist journal operations in one transaction
+
+        Uses the same op format as the flat-file journal
+        (add/update/remove/clear).
+
+        Args:
+            ops: Journal operations
+
+        Returns:
+            Number of operations applied
+        """
+        applied = 0
+        with self._lock, self.conn:
+            for op in ops:
+                kind = op.get('op')
+                if kind in ('add', 'update'):
+                    row = self._blacklist_row(op.get('entry') or {})
+                    if row is None:
+                        self.logger.warning(f"Skipping invalid blacklist entry: {op.get('entry')}")
+                        continue
+                    self.conn.execute(
+                        "INSERT INTO blacklist (ip_address, family, range_start, range_end, prefixlen, "
+                        "timestamp, lockout_period, expires_at, reason, entry) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(ip_address) DO UPDATE SET "
+                        "timestamp=excluded.timestamp, lockout_period=excluded.lockout_period, "
+                        "expires_at=excluded.expires_at, reason=excluded.reason, entry=excluded.entry",
+                        row
+                    )
+                elif kind == 'remove':
+                    self.conn.execute("DELETE FROM blacklist WHERE ip_address = ?", (op.get('ip_address'),))
+                elif kind == 'clear':
+                    self.conn.execute("DELETE FROM blacklist")
+                else:
+                    self.logger.warning(f"Skipping unknown blacklist op: {kind}")
+                    continue
+                applied += 1
+            self._changes += 1
+        return applied
+
+    def iter_blacklist(self, where: str = "", params: Tuple[Any, ...] = ()) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate blacklist entries in insertion order
+
+        Rows are fetched in batches keyed on rowid, so a consumer that
+        stops early never reads the rest and the lock is not held while
+        entries are consumed.
+
+        Args:
+            where: Optional SQL condition on blacklist columns
+            params: Parameters for the condition
+
+        Returns:
+            Iterator of entry dictionaries
+        """
+        sql = "SELECT rowid, entry FROM blacklist WHERE rowid > ?"
+        if where:
+            sql += f" AND ({where})"
+        sql += f" ORDER BY rowid LIMIT {ITER_BATCH_SIZE}"
+        last = -1
+        while True:
+            with self._lock:
+                rows = self.conn.execute(sql, (last,) + tuple(params)).fetchall()
+            for rowid, entry in rows:
+                yield json.loads(entry)
+            if len(rows) < ITER_BATCH_SIZE:
+                return
+            last = rows[-1][0]
+
+    def get_blacklist_entry(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Get blacklist entry by exact IP/CIDR
+
+        Args:
+            ip_address: IP address or CIDR range
+
+        Returns:
+            Entry dictionary or None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT entry FROM blacklist WHERE ip_address = ?", (ip_address,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def blacklist_count(self) -> int:
+        """Get number of blacklist entries"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM blacklist").fetchone()[0]
+
+    def _prefix_lengths(self, table: str, family: int) -> List[int]:
+        """Get the prefix lengths present in table, longest first (lock held)"""
+        version = self.version()
+        cached = self._prefixlens.get((table, family))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        # Walk idx_*_prefix: one probe per distinct length
+        lengths: List[int] = []
+        current = FAMILY_BITS[family] + 1
+        while True:
+            row = self.conn.execute(
+                f"SELECT MAX(prefixlen) FROM {table} WHERE family = ? AND prefixlen < ?",
+                (family, current)
+            ).fetchone()
+            if row[0] is None:
+                break
+            current = row[0]
+            lengths.append(current)
+        self._prefixlens[(table, family)] = (version, lengths)
+        return lengths
+
+    def _covering(self, table: str, ip_address: str) -> Optional[Tuple[Any, ...]]:
+        """Find the most specific row in table whose network contains the address"""
+        parsed = address_to_int(ip_address)
+        if parsed is None:
+            return None
+        family, address = parsed
+        bits = FAMILY_BITS[family]
+        column = "entry" if table == 'blacklist' else "ip_address"
+        with self._lock:
+            for prefixlen in self._prefix_lengths(table, family):
+                host_mask = (1 << (bits - prefixlen)) - 1
+                start = address & ~host_mask
+                row = self.conn.execute(
+                    f"SELECT {column} FROM {table} WHERE family = ? AND range_start = ? AND range_end = ? LIMIT 1",
+                    (family, encode_address(family, start), encode_address(family, start | host_mask))
+                ).fetchone()
+                if row is not None:
+                    return row
+        return None
+
+    def find_blacklist_covering(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Find most specific blacklist entry containing an address
+
+        Args:
+            ip_address: IP address
+
+        Returns:
+            Entry dictionary or None
+        """
+        row = self._covering('blacklist', ip_address)
+        return json.loads(row[0]) if row else None
+
+    def blacklist_in_range(self, network: str) -> List[Dict[str, Any]]:
+        """
+        Get blacklist entries inside a network
+
+        Args:
+            network: IP address or CIDR range
+
+        Returns:
+            Entries whose network lies within the given one
+        """
+        columns = _network_columns(network)
+        if columns is None:
+            raise ValueError(f"Invalid network: {network}")
+        family, start, end, _prefixlen = columns
+        return list(self.iter_blacklist(
+            "family = ? AND range_start >= ? AND range_end <= ?", (family, start, end)
+        ))
+
+    def expired_blacklist(self, now: int) -> List[Dict[str, Any]]:
+        """
+        Get temporary blacklist entries expired at a given time
+
+        Args:
+            now: Epoch seconds
+
+        Returns:
+            Entries with expires_at <= now
+        """
+        return list(self.iter_blacklist("expires_at IS NOT NULL AND expires_at <= ?", (now,)))
+
+    def blacklist_by_reason(self, reason: str) -> List[Dict[str, Any]]:
+        """
+        Get blacklist entries with a given reason
+
+        Args:
+            reason: Exact reason string
+
+        Returns:
+            Matching entries
+        """
+        return list(self.iter_blacklist("reason = ?", (reason,)))
+
+    # Whitelist
+
+    def get_whitelist(self) -> List[str]:
+        """Get whitelist entries in insertion order"""
+        with self._lock:
+            rows = self.conn.execute("SELECT ip_address FROM whitelist ORDER BY rowid").fetchall()
+        return [row[0] for row in rows]
+
+    def replace_whitelist(self, entries: List[str]) -> None:
+        """
+        Make the whitelist equal to entries
+
+        Only the difference is written: missing entries are inserted and
+        entries no longer listed are deleted.
+
+        Args:
+            entries: IP addresses / CIDR ranges
+        """
+        with self._lock, self.conn:
+            current = {row[0] for row in self.conn.execute("SELECT ip_address FROM whitelist")}
+            wanted = dict.fromkeys(entries)
+
+            removed = [(ip,) for ip in current if ip not in wanted]
+            self.conn.executemany("DELETE FROM whitelist WHERE ip_address = ?", removed)
+
+            rows = []
+            for ip_address in wanted:
+                if ip_address in current:
+                    continue
+                columns = _network_columns(ip_address)
+                if columns is None:
+                    self.logger.warning(f"Skipping invalid whitelist entry: {ip_address}")
+                    continue
+                rows.append((ip_address, *columns))
+            self.conn.executemany(
+                "INSERT INTO whitelist (ip_address, family, range_start, range_end, prefixlen) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._changes += 1
+
+    def find_whitelist_covering(self, ip_address: str) -> Optional[str]:
+        """
+        Find most specific whitelist entry containing an address
+
+        Args:
+            ip_address: IP address
+
+        Returns:
+            Whitelist entry (IP or CIDR) or None
+        """
+        row = self._covering('whitelist', ip_address)
+        return row[0] if row else None
+
+    # Flat file export
+
+    def _write_lines(self, path: Path, lines: Iterable[str]) -> int:
+        """Atomically write lines to path; returns line count"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True, mode=0o755)
+        temp_path = path.with_suffix(path.suffix + '.tmp')
+        count = 0
+        try:
+            with open(temp_path, 'w') as f:
+                for line in lines:
+                    f.write(line + '\n')
+                    count += 1
+            temp_path.chmod(0o644)
+            temp_path.replace(path)
+        except Exception as e:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise RuntimeError(f"Failed to export {path}: {e}")
+        return count
+
+    def export_blacklist(self, path: Path) -> int:
+        """
+        Write blacklist as JSONL (ip_blacklist.conf format)
+
+        Args:
+            path: Output file
+
+        Returns:
+            Number of entries written
+        """
+        return self._write_lines(path, (json.dumps(entry) for entry in self.iter_blacklist()))
+
+    def export_whitelist(self, path: Path) -> int:
+        """
+        Write whitelist as one entry per line (ip_whitelist.conf format)
+
+        Args:
+            path: Output file
+
+        Returns:
+            Number of entries written
+        """
+        return self._write_lines(path, self.get_whitelist())
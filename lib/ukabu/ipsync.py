@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Diff-based synchronization of kernel ipsets with the blacklist
+
+Reads the current members of ukabu-permanent and the ukabu-temporary_N
+sets with one `ipset save`, compares them with the blacklist and applies
+only the differences in a single `ipset restore` batch.
+
+The blacklist is not the only writer of these sets: ukabu-trackerd adds
+its strike blocks there too (and records them in its own database, not
+in ip_blacklist.conf). A sync therefore only deletes members it placed
+itself, kept in a record of owned members (ipset_sync.json), and never
+deletes a member the daemon's database lists as an active block.
+
+Temporary sets may be created with timeout support, in which case each
+member is added with its remaining lockout as the element timeout and
+the kernel expires it without the unjail run.
+"""
+
+import time
+import sqlite3
+import logging
+from datetime import timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .ipmanager import IPManager
+from .ipset import (
+    IPSetClient, ipset_member,
+    PERMANENT_SET_NAME, TEMPORARY_SET_PREFIX, DEFAULT_MAXELEM, TEMPORARY_MAXELEM, MAX_TIMEOUT
+)
+from .utils import (
+    IPSET_SYNC_STATE, DAEMON_DB,
+    get_expiry_epoch, parse_iso_timestamp, load_json_file, save_json_file
+)
+
+# Kinds of sets in the owned-members record
+SET_KINDS = ('permanent', 'temporary')
+
+
+def _later(a: Optional[int], b: Optional[int]) -> bool:
+    """Compare expiries where None means no known end"""
+    if a is None:
+        return True
+    return b is not None and a > b
+
+
+def remaining_timeout(expiry: Optional[int], now: int) -> int:
+    """
+    Convert expiry to an ipset element timeout
+
+    Args:
+        expiry: Expiry as epoch seconds (None if unknown)
+        now: Epoch seconds
+
+    Returns:
+        Seconds, capped at MAX_TIMEOUT; 0 (no timeout) if expiry is unknown
+    """
+    if expiry is None:
+        return 0
+    return max(1, min(expiry - now, MAX_TIMEOUT))
+
+
+def read_daemon_blocks(db_path: Path) -> Dict[str, Optional[int]]:
+    """
+    Read the blocks ukabu-trackerd recorded in its database
+
+    The daemon writes every strike block to the blocked_ips table next to
+    the ipset entry. The database is opened read-only; a missing or
+    unreadable database gives no blocks.
+
+    Args:
+        db_path: Daemon database
+
+    Returns:
+        ipset member -> lockout expiry as epoch seconds (None for
+        permanent blocks)
+    """
+    if not db_path.exists():
+        return {}
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+        try:
+            rows = conn.execute("SELECT ip, lockout_expires FROM blocked_ips").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.getLogger('ukabu-manager.ipsync').warning(f"Cannot read daemon blocks from {db_path}: {e}")
+        return {}
+
+    blocks: Dict[str, Optional[int]] = {}
+    for ip_address, expires in rows:
+        member = ipset_member(str(ip_address))
+        if member is None:
+            continue
+        if expires is None:
+            blocks[member] = None
+        elif isinstance(expires, (int, float)):
+            blocks[member] = int(expires)
+        else:
+            try:
+                stamp = parse_iso_timestamp(str(expires))
+            except ValueError:
+                continue
+            if stamp.tzinfo is None:
+                stamp = stamp.replace(tzinfo=timezone.utc)
+            blocks[member] = int(stamp.timestamp())
+    return blocks
+
+
+class IPSetSynchronizer:
+    """Bring blacklist ipsets in line with the blacklist"""
+
+    def __init__(
+        self,
+        ip_manager: IPManager,
+        ipset_client: Optional[IPSetClient] = None,
+        use_timeouts: Optional[bool] = None,
+        state_path: Path = IPSET_SYNC_STATE,
+        daemon_db: Path = DAEMON_DB
+    ):
+        """
+        Initialize synchronizer
+
+        Args:
+            ip_manager: IP manager owning the blacklist
+            ipset_client: ipset wrapper (default: IPSetClient())
+            use_timeouts: Create new temporary sets with timeout support
+                (default: only if the existing temporary sets have it)
+            state_path: Record of the members placed by syncs
+            daemon_db: ukabu-trackerd database (see read_daemon_blocks)
+        """
+        self.ip_manager = ip_manager
+        self.ipset = ipset_client or IPSetClient(dry_run=ip_manager.dry_run)
+        self.use_timeouts = use_timeouts
+        self.state_path = Path(state_path)
+        self.daemon_db = Path(daemon_db)
+        self.logger = logging.getLogger('ukabu-manager.ipsync')
+
+    def load_owned(self) -> Dict[str, Set[str]]:
+        """
+        Get the members earlier syncs placed in the sets
+
+        Returns:
+            {'permanent': members, 'temporary': members}
+        """
+        state = load_json_file(self.state_path, default={})
+        return {kind: set(state.get(kind, [])) for kind in SET_KINDS}
+
+    def save_owned(self, owned: Dict[str, Set[str]]) -> None:
+        """
+        Record the members placed by syncs
+
+        Args:
+            owned: {'permanent': members, 'temporary': members}
+        """
+        if self.ipset.dry_run:
+            return
+        save_json_file(self.state_path, {kind: sorted(owned[kind]) for kind in SET_KINDS}, backup=False)
+
+    def daemon_held(self, now: int) -> Set[str]:
+        """
+        Get members the daemon holds as active blocks
+
+        Args:
+            now: Epoch seconds
+
+        Returns:
+            ipset members
+        """
+        return {
+            member for member, expiry in read_daemon_blocks(self.daemon_db).items()
+            if expiry is None or expiry > now
+        }
+
+    def desired_state(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compute which members belong in the permanent and temporary sets
+
+        Expired temporary entries are left out (unjail removes them from
+        the blacklist). The sets are IPv4 (family inet), so IPv6 entries
+        are counted but not placed.
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Dict with 'permanent' (member set), 'temporary' (member ->
+            expiry epoch, or None if unknown) and 'skipped' count
+        """
+        if now is None:
+            now = int(time.time())
+
+        permanent: Set[str] = set()
+        temporary: Dict[str, Optional[int]] = {}
+        skipped = 0
+        for entry in self.ip_manager.get_blacklist():
+            member = ipset_member(entry['ip_address'])
+            if member is None or ':' in member:
+                skipped += 1
+                continue
+            if entry.get('lockout_period', 0) == 0:
+                permanent.add(member)
+                continue
+            expiry = get_expiry_epoch(entry)
+            if expiry is not None and expiry <= now:
+                continue
+            if member not in temporary or _later(expiry, temporary[member]):
+                temporary[member] = expiry
+
+        # An IP blocked permanently does not also need a temporary slot
+        temporary = {m: exp for m, exp in temporary.items() if m not in permanent}
+        return {'permanent': permanent, 'temporary': temporary, 'skipped': skipped}
+
+    def plan(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compute the restore script that syncs the sets
+
+        Missing members are added. A member is only deleted if an earlier
+        sync placed it (see load_owned), the blacklist no longer wants it
+        and the daemon does not hold it; members added by anyone else
+        (ukabu-trackerd strike blocks) stay and take up capacity.
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Dict with 'lines' (restore commands), 'owned' (the record to
+            save once they are applied) and counts 'added', 'removed',
+            'created_sets', 'overflow', 'skipped'
+        """
+        if now is None:
+            now = int(time.time())
+        desired = self.desired_state(now)
+        owned = self.load_owned()
+        held = self.daemon_held(now)
+
+        # One `ipset save` for everything, then keep only our sets
+        current = {
+            name: info for name, info in self.ipset.save().items()
+            if name == PERMANENT_SET_NAME or name.startswith(TEMPORARY_SET_PREFIX)
+        }
+
+        creates: List[str] = []
+        deletes: List[str] = []
+        adds: List[str] = []
+        overflow = 0
+        present: Dict[str, Set[str]] = {kind: set() for kind in SET_KINDS}
+        added: Dict[str, Set[str]] = {kind: set() for kind in SET_KINDS}
+
+        # Permanent set
+        perm = current.get(PERMANENT_SET_NAME)
+        if perm is None:
+            perm = {'maxelem': DEFAULT_MAXELEM, 'members': set()}
+            creates.append(f"create {PERMANENT_SET_NAME} hash:net maxelem {DEFAULT_MAXELEM}")
+        released = (perm['members'] & owned['permanent']) - desired['permanent'] - held
+        for member in sorted(released):
+            deletes.append(f"del {PERMANENT_SET_NAME} {member}")
+        present['permanent'] = perm['members'] - released
+        free = perm['maxelem'] - len(present['permanent'])
+        for member in sorted(desired['permanent'] - perm['members']):
+            if free <= 0:
+                overflow += 1
+                continue
+            adds.append(f"add {PERMANENT_SET_NAME} {member}")
+            added['permanent'].add(member)
+            free -= 1
+
+        # Temporary sets: drop our members that are no longer wanted,
+        # then fill free capacity
+        temp_sets = sorted(
+            (name for name in current if name.startswith(TEMPORARY_SET_PREFIX)),
+            key=lambda name: (len(name), name)
+        )
+        capacity: Dict[str, int] = {}
+        for name in temp_sets:
+            info = current[name]
+            kept = 0
+            for member in sorted(info['members']):
+                if (member in owned['temporary'] and member not in desired['temporary']
+                        and member not in held):
+                    deletes.append(f"del {name} {member}")
+                else:
+                    present['temporary'].add(member)
+                    kept += 1
+            capacity[name] = info['maxelem'] - kept
+        placed = present['temporary'] & set(desired['temporary'])
+
+        create_options = f"maxelem {TEMPORARY_MAXELEM}"
+        use_timeouts = self.use_timeouts
+        if use_timeouts is None:
+            use_timeouts = any(current[name]['timeout'] for name in temp_sets)
+        if use_timeouts:
+            create_options += " timeout 0"
+
+        created = 0
+        pending = sorted(set(desired['temporary']) - placed)
+        queue = list(temp_sets)
+        suffixes = [name[len(TEMPORARY_SET_PREFIX):] for name in temp_sets]
+        index = max((int(s) + 1 for s in suffixes if s.isdigit()), default=0)
+        while pending:
+            if not queue:
+                name = f"{TEMPORARY_SET_PREFIX}{index}"
+                index += 1
+                creates.append(f"create {name} hash:net {create_options}")
+                capacity[name] = TEMPORARY_MAXELEM
+                current[name] = {'timeout': use_timeouts}
+                queue.append(name)
+                created += 1
+            name = queue[0]
+            take = min(capacity[name], len(pending))
+            timeout = current[name]['timeout']
+            for member in pending[:take]:
+                if timeout:
+                    ttl = remaining_timeout(desired['temporary'][member], now)
+                    adds.append(f"add {name} {member} timeout {ttl}")
+                else:
+                    adds.append(f"add {name} {member}")
+                added['temporary'].add(member)
+            pending = pending[take:]
+            capacity[name] -= take
+            if capacity[name] <= 0:
+                queue.pop(0)
+
+        # Still ours: owned members that stay, members we just added and
+        # wanted members already present that the daemon does not hold
+        desired_members = {'permanent': desired['permanent'], 'temporary': set(desired['temporary'])}
+        new_owned = {
+            kind: (present[kind] & (owned[kind] | (desired_members[kind] - held))) | added[kind]
+            for kind in SET_KINDS
+        }
+
+        return {
+            'lines': creates + deletes + adds,
+            'owned': new_owned,
+            'added': len(adds),
+            'removed': len(deletes),
+            'created_sets': created,
+            'overflow': overflow,
+            'skipped': desired['skipped'],
+        }
+
+    def sync(self, now: Optional[int] = None) -> Dict[str, int]:
+        """
+        Apply the differences in one `ipset restore`
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Counts: {'added', 'removed', 'created_sets', 'overflow', 'skipped'}
+        """
+        plan = self.plan(now)
+        self.ipset.restore(plan['lines'])
+        self.save_owned(plan['owned'])
+
+        if plan['overflow']:
+            self.logger.warning(f"{PERMANENT_SET_NAME} is full; {plan['overflow']} permanent blocks not added")
+        if plan['created_sets']:
+            self.logger.warning(
+                f"Created {plan['created_sets']} temporary sets; ukabu-trackerd installs "
+                f"their firewall rules on reload"
+            )
+        self.logger.info(f"Synced ipsets: {plan['added']} added, {plan['removed']} removed")
+
+        return {key: value for key, value in plan.items() if key not in ('lines', 'owned')}
+
+    def temporary_blocks(self, now: Optional[int] = None) -> Dict[str, int]:
+        """
+        Get the members of the temporary sets whose expiry is known
+
+        The expiry comes from the daemon database, else from the element
+        timeout. Members of non-timeout sets the daemon does not know
+        about are left out.
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            ipset member -> expiry as epoch seconds (active members only)
+        """
+        if now is None:
+            now = int(time.time())
+        daemon_blocks = read_daemon_blocks(self.daemon_db)
+        blocks: Dict[str, int] = {}
+        for name, info in self.ipset.save().items():
+            if not name.startswith(TEMPORARY_SET_PREFIX):
+                continue
+            for member in info['members']:
+                if member in daemon_blocks:
+                    expiry = daemon_blocks[member]
+                elif info['timeouts'].get(member):
+                    expiry = now + info['timeouts'][member]
+                else:
+                    continue
+                if expiry is not None and expiry > now and (member not in blocks or expiry > blocks[member]):
+                    blocks[member] = expiry
+        return blocks
+
+    def apply_changes(
+        self,
+        add: List[Dict[str, Any]],
+        remove: List[str],
+        now: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Add and delete only the given entries in one `ipset restore`
+
+        For callers that changed a few blacklist entries and know which
+        (escalation, unjail); the rest of the sets is not looked at.
+        Additions come first so addresses stay blocked throughout. Like
+        sync(), only members a sync placed and the daemon does not hold
+        are deleted. Temporary entries go into the first temporary set
+        with room; if none has any they are counted as overflow and left
+        to `blacklist sync`, which creates sets.
+
+        Args:
+            add: Blacklist entries to place
+            remove: IP addresses / CIDR ranges to delete
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Counts: {'added', 'removed', 'overflow'}
+        """
+        if now is None:
+            now = int(time.time())
+        owned = self.load_owned()
+        held = self.daemon_held(now)
+        current = {
+            name: info for name, info in self.ipset.save().items()
+            if name == PERMANENT_SET_NAME or name.startswith(TEMPORARY_SET_PREFIX)
+        }
+        temp_sets = sorted(
+            (name for name in current if name.startswith(TEMPORARY_SET_PREFIX)),
+            key=lambda name: (len(name), name)
+        )
+        free = {name: info['maxelem'] - len(info['members']) for name, info in current.items()}
+
+        adds: List[str] = []
+        deletes: List[str] = []
+        overflow = 0
+        for entry in add:
+            member = ipset_member(entry['ip_address'])
+            if member is None or ':' in member:
+                continue
+            if entry.get('lockout_period', 0) == 0:
+                names = [PERMANENT_SET_NAME] if PERMANENT_SET_NAME in current else []
+                kind = 'permanent'
+            else:
+                names = temp_sets
+                kind = 'temporary'
+            if any(member in current[name]['members'] for name in names):
+                if member not in held:
+                    owned[kind].add(member)
+                continue
+            target = next((name for name in names if free[name] > 0), None)
+            if target is None:
+                overflow += 1
+                continue
+            if current[target]['timeout']:
+                ttl = remaining_timeout(get_expiry_epoch(entry), now)
+                adds.append(f"add {target} {member} timeout {ttl}")
+            else:
+                adds.append(f"add {target} {member}")
+            current[target]['members'].add(member)
+            free[target] -= 1
+            owned[kind].add(member)
+
+        for ip_address in remove:
+            member = ipset_member(ip_address)
+            if member is None or member in held:
+                continue
+            for kind, names in (('permanent', [PERMANENT_SET_NAME]), ('temporary', temp_sets)):
+                if member not in owned[kind]:
+                    continue
+                for name in names:
+                    if name in current and member in current[name]['members']:
+                        deletes.append(f"del {name} {member}")
+                owned[kind].discard(member)
+
+        self.ipset.restore(adds + deletes)
+        self.save_owned(owned)
+        if overflow:
+            self.logger.warning(f"No room in the ipsets for {overflow} blocks; run 'blacklist sync'")
+        return {'added': len(adds), 'removed': len(deletes), 'overflow': overflow}
+
+    def migrate_timeouts(self, now: Optional[int] = None, default_lockout: int = 10080) -> Dict[str, int]:
+        """
+        Convert temporary sets to timeout-enabled sets
+
+        Each temporary set without timeout support is rebuilt as a
+        timeout set holding its current members and swapped in under the
+        same name so firewall rules keep matching. A member's timeout is
+        the remaining lockout of its blacklist entry, else of the daemon's
+        block (see read_daemon_blocks). Members permanently blacklisted or
+        blocked keep timeout 0 (`blacklist sync` moves our own to the
+        permanent set); members neither source knows (blocks from an older
+        daemon database, manual adds) get default_lockout. Only members
+        known to be expired are dropped. All sets are migrated in one
+        `ipset restore` transaction.
+
+        Lockouts longer than MAX_TIMEOUT are capped; `blacklist sync`
+        adds them back once the kernel expires them.
+
+        Args:
+            now: Epoch seconds (default: current time)
+            default_lockout: Lockout in minutes for members of unknown origin
+
+        Returns:
+            Counts: {'sets', 'migrated', 'dropped', 'capped', 'defaulted'}
+        """
+        if now is None:
+            now = int(time.time())
+        desired = self.desired_state(now)
+        daemon_blocks = read_daemon_blocks(self.daemon_db)
+        expired = {
+            ipset_member(entry['ip_address']) for entry in self.ip_manager.get_blacklist()
+            if entry.get('lockout_period', 0) != 0
+        } - set(desired['temporary']) - desired['permanent']
+        sets = {
+            name: info for name, info in self.ipset.save().items()
+            if name.startswith(TEMPORARY_SET_PREFIX)
+        }
+        stats = {'sets': 0, 'migrated': 0, 'dropped': 0, 'capped': 0, 'defaulted': 0}
+        lines: List[str] = []
+        for name, info in sorted(sets.items()):
+            if info['timeout']:
+                continue
+            staging = f"{name}-tmp"
+            lines.append(f"create {staging} hash:net maxelem {info['maxelem']} timeout 0")
+            for member in sorted(info['members']):
+                if member in desired['temporary']:
+                    expiry = desired['temporary'][member]
+                elif member in daemon_blocks:
+                    expiry = daemon_blocks[member]
+                elif member in desired['permanent']:
+                    expiry = None
+                elif member in expired:
+                    stats['dropped'] += 1
+                    continue
+                else:
+                    expiry = now + default_lockout * 60
+                    stats['defaulted'] += 1
+                if expiry is not None and expiry <= now:
+                    stats['dropped'] += 1
+                    continue
+                if expiry is not None and expiry - now > MAX_TIMEOUT:
+                    stats['capped'] += 1
+                lines.append(f"add {staging} {member} timeout {remaining_timeout(expiry, now)}")
+                stats['migrated'] += 1
+            lines.append(f"swap {name} {staging}")
+            lines.append(f"destroy {staging}")
+            stats['sets'] += 1
+
+        self.ipset.restore(lines)
+        self.logger.info(
+            f"Migrated {stats['sets']} temporary sets to timeouts "
+            f"({stats['migrated']} members, {stats['defaulted']} with the default lockout, "
+            f"{stats['dropped']} expired dropped)"
+        )
+        return stats
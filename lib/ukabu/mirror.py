@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Local mirror of the daemon's blocks and strikes
+
+A DaemonMirror subscribes with a snapshot and applies each event, so
+dashboards read current blocks, strikes and counts locally instead of
+polling get_blocks()/get_stats(). When the subscription drops, or an
+event is missed (a gap in "seq"), the mirror resubscribes and starts
+again from a fresh snapshot.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+
+from .daemon import DaemonClient, AsyncDaemonClient, SUBSCRIBE_HEARTBEAT
+
+# Event fields that are not part of a block record
+_EVENT_FIELDS = ('event', 'seq', 'snapshot', 'ip')
+
+
+class DaemonMirror:
+    """Blocks and strikes kept current from daemon events"""
+
+    def __init__(
+        self,
+        client: Union[DaemonClient, AsyncDaemonClient, None] = None,
+        heartbeat: float = SUBSCRIBE_HEARTBEAT
+    ):
+        """
+        Initialize mirror
+
+        Args:
+            client: DaemonClient for follow(), AsyncDaemonClient for
+                follow_async() (default: DaemonClient())
+            heartbeat: Heartbeat interval asked of the daemon
+        """
+        self.client = client or DaemonClient()
+        self.heartbeat = heartbeat
+        self.logger = logging.getLogger('ukabu-manager.mirror')
+        self.synced = False
+        self.seq: Optional[int] = None
+        self.reloads = 0
+        self._blocks: Dict[str, Dict[str, Any]] = {}
+        self._strikes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Apply one subscription event
+
+        Args:
+            event: Event dictionary
+
+        Raises:
+            RuntimeError: If events were missed (the mirror must resync)
+        """
+        kind = event.get('event')
+        with self._lock:
+            if kind == 'subscribed':
+                self._blocks.clear()
+                self._strikes.clear()
+                self.synced = False
+                self.seq = event.get('seq')
+                return
+            if kind == 'synced':
+                self.synced = True
+                return
+
+            seq = event.get('seq')
+            if seq is not None:
+                if self.seq is not None and seq != self.seq + 1:
+                    self.synced = False
+                    raise RuntimeError(f"Missed daemon events (seq {self.seq} -> {seq})")
+                self.seq = seq
+
+            ip_address = event.get('ip')
+            if kind in ('strike', 'flush'):
+                strikes = event.get('strikes', 0)
+                if strikes:
+                    self._strikes[ip_address] = strikes
+                else:
+                    self._strikes.pop(ip_address, None)
+            elif kind == 'block':
+                self._blocks[ip_address] = {
+                    key: value for key, value in event.items() if key not in _EVENT_FIELDS
+                }
+            elif kind in ('unblock', 'expire'):
+                self._blocks.pop(ip_address, None)
+            elif kind == 'reload':
+                self.reloads += 1
+
+    def follow(self, reconnect_delay: float = 1.0) -> Iterator[Dict[str, Any]]:
+        """
+        Keep the mirror current, yielding each event after applying it
+
+        Never ends; run it in its own thread (or stop iterating).
+
+        Args:
+            reconnect_delay: Seconds to wait before resubscribing
+
+        Returns:
+            Iterator of applied events
+        """
+        while True:
+            events = self.client.subscribe(snapshot=True, heartbeat=self.heartbeat)
+            try:
+                for event in events:
+                    self.apply(event)
+                    yield event
+            except (ConnectionError, RuntimeError) as e:
+                self.synced = False
+                self.logger.warning(f"Daemon subscription lost ({e}), resyncing in {reconnect_delay}s")
+                time.sleep(reconnect_delay)
+            finally:
+                events.close()
+
+    async def follow_async(self, reconnect_delay: float = 1.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Keep the mirror current from an AsyncDaemonClient (see follow())
+
+        Args:
+            reconnect_delay: Seconds to wait before resubscribing
+
+        Returns:
+            Async iterator of applied events
+        """
+        while True:
+            events = self.client.subscribe(snapshot=True, heartbeat=self.heartbeat)
+            try:
+                async for event in events:
+                    self.apply(event)
+                    yield event
+            except (ConnectionError, RuntimeError) as e:
+                self.synced = False
+                self.logger.warning(f"Daemon subscription lost ({e}), resyncing in {reconnect_delay}s")
+                await asyncio.sleep(reconnect_delay)
+            finally:
+                await events.aclose()
+
+    def get_blocks(self) -> List[Dict[str, Any]]:
+        """
+        Get currently blocked IPs, like DaemonClient.get_blocks()
+
+        Returns:
+            List of blocked IP records
+        """
+        with self._lock:
+            return [{'ip': ip_address, **info} for ip_address, info in self._blocks.items()]
+
+    def get_strikes(self, ip_address: Optional[str] = None) -> Dict[str, int]:
+        """
+        Get strike counts, like DaemonClient.get_strikes()
+
+        Args:
+            ip_address: Specific IP to query (None for all)
+
+        Returns:
+            Dictionary of IP addresses and their strike counts
+        """
+        with self._lock:
+            if ip_address:
+                return {ip_address: self._strikes.get(ip_address, 0)}
+            return dict(self._strikes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get counts derived from the mirror
+
+        Returns:
+            {'active_blocks', 'total_strikes', 'tracked_ips', 'reloads',
+            'synced', 'seq'}
+        """
+        with self._lock:
+            return {
+                'active_blocks': len(self._blocks),
+                'total_strikes': sum(self._strikes.values()),
+                'tracked_ips': len(self._strikes),
+                'reloads': self.reloads,
+                'synced': self.synced,
+                'seq': self.seq,
+            }
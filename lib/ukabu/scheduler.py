@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Expiry-ordered scheduler for releasing temporary blocks
+
+Long-running alternative to the ukabu-unjail.timer poll. Temporary
+blacklist entries are kept in a min-heap keyed on expiry (timestamp +
+lockout_period), so each IP is released when its lockout ends instead of
+at the next timer run. Blacklist changes are applied from the journal
+operations since the last check; the list is only rescanned at start-up
+and when the changes cannot be followed (see
+IPManager.get_blacklist_changes).
+"""
+
+import heapq
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .unjail import UnjailEngine
+from .utils import get_expiry_epoch
+
+
+class ExpiryScheduler:
+    """Release temporary blocks at their expiry time"""
+
+    def __init__(
+        self,
+        engine: UnjailEngine,
+        batch_window: float = 1.0,
+        poll_interval: float = 5.0,
+        export_interval: float = 60.0,
+        escalate_interval: float = 60.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            engine: Unjail engine used to release IPs
+            batch_window: Minimum seconds between releases; expiries
+                falling inside one window are released together
+            poll_interval: Maximum seconds between blacklist change checks
+            export_interval: Minimum seconds between flat-file and geo
+                include rewrites
+            escalate_interval: Minimum seconds between subnet escalation
+                passes (only if the engine has an escalator)
+            clock: Time source (epoch seconds)
+        """
+        self.engine = engine
+        self.ip_manager = engine.ip_manager
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.export_interval = export_interval
+        self.escalate_interval = escalate_interval
+        self.clock = clock
+        self.logger = logging.getLogger('ukabu-manager.scheduler')
+
+        # Heap of (expiry, ip_address); entries whose expiry no longer
+        # matches _expiries are stale and skipped when popped
+        self._heap: List[Tuple[int, str]] = []
+        self._expiries: Dict[str, int] = {}
+        self._version: Optional[int] = None
+        self._last_release = 0.0
+        self._last_export = 0.0
+        self._export_pending = False
+        self._last_escalation = 0.0
+        self._escalated_version: Optional[int] = None
+        self.released_total = 0
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def reload(self, force: bool = False) -> int:
+        """
+        Sync heap with the blacklist if it changed
+        
+        Only the journal operations since the last reload are applied:
+        added or updated temporary entries are pushed, removed ones are
+        dropped from the expiry map (their heap items become stale). The
+        whole list is rescanned only when forced or when the operations
+        are not available.
+        
+        Args:
+            force: Rescan even if the blacklist version is unchanged
+        
+        Returns:
+            Number of entries pushed
+        """
+        changes = None
+        if force or self._version is None:
+            version = self.ip_manager.get_blacklist_version()
+        else:
+            version, changes = self.ip_manager.get_blacklist_changes(self._version)
+            if version == self._version:
+                return 0
+        self._version = version
+        
+        if changes is None:
+            pushed = self._rescan()
+        else:
+            pushed = 0
+            for op in changes:
+                kind = op.get('op')
+                if kind in ('add', 'update'):
+                    entry = op.get('entry')
+                    if isinstance(entry, dict) and entry.get('ip_address'):
+                        pushed += self._schedule(entry)
+                elif kind == 'remove':
+                    self._expiries.pop(op.get('ip_address'), None)
+                elif kind == 'clear':
+                    self._expiries.clear()
+        
+        # Drop stale items once they dominate the heap
+        if len(self._heap) > 2 * len(self._expiries) + 1024:
+            self._heap = [(exp, ip) for ip, exp in self._expiries.items()]
+            heapq.heapify(self._heap)
+        
+        if pushed:
+            self.logger.debug(f"Scheduled {pushed} expiries ({len(self._expiries)} pending)")
+        return pushed
+    
+    def _schedule(self, entry: Dict[str, Any]) -> int:
+        """
+        Track the expiry of one added or updated entry
+        
+        Args:
+            entry: Blacklist entry
+        
+        Returns:
+            1 if a heap item was pushed, else 0
+        """
+        ip_address = entry['ip_address']
+        expiry = get_expiry_epoch(entry)
+        if expiry is None:
+            # Permanent now (or no usable timestamp): nothing to release
+            self._expiries.pop(ip_address, None)
+            return 0
+        if self._expiries.get(ip_address) == expiry:
+            return 0
+        self._expiries[ip_address] = expiry
+        heapq.heappush(self._heap, (expiry, ip_address))
+        return 1
+    
+    def _rescan(self) -> int:
+        """
+        Rebuild the expiry map from the whole list of temporary blocks
+        
+        Returns:
+            Number of entries pushed
+        """
+        previous = self._expiries
+        self._expiries = {}
+        pushed = 0
+        for entry in self.ip_manager.get_temporary_blocks():
+            expiry = get_expiry_epoch(entry)
+            if expiry is None:
+                continue
+            ip_address = entry['ip_address']
+            self._expiries[ip_address] = expiry
+            if previous.get(ip_address) != expiry:
+                heapq.heappush(self._heap, (expiry, ip_address))
+                pushed += 1
+        return pushed
+    
+    def next_expiry(self) -> Optional[int]:
+        """
+        Get earliest pending expiry
+
+        Returns:
+            Epoch seconds, or None if nothing is scheduled
+        """
+        heap = self._heap
+        while heap and self._expiries.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: float) -> List[str]:
+        """
+        Remove and return all IPs whose expiry has passed
+
+        Args:
+            now: Epoch seconds
+
+        Returns:
+            IP addresses due for release
+        """
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expiry, ip_address = heapq.heappop(heap)
+            if self._expiries.get(ip_address) == expiry:
+                del self._expiries[ip_address]
+                due.append(ip_address)
+        return due
+
+    def tick(self) -> int:
+        """
+        Reload if needed and release everything that is due
+
+        Returns:
+            Number of IPs released
+        """
+        self.reload()
+        now = self.clock()
+
+        released = 0
+        if now - self._last_release >= self.batch_window:
+            due = self.pop_due(now)
+            if due:
+                self.engine.release(due, export=False, now=int(now))
+                self._last_release = now
+                self._export_pending = True
+                released = len(due)
+                self.released_total += released
+                self.logger.info(f"Released {released} expired blocks")
+
+        # New blocks are the only thing that can create an escalation;
+        # reverting is done by release() when a prefix expires
+        if (self.engine.escalator is not None and self._version != self._escalated_version
+                and now - self._last_escalation >= self.escalate_interval):
+            self._escalated_version = self._version
+            self._last_escalation = now
+            if self.engine.escalator.escalate(int(now))['replaced']:
+                self._export_pending = True
+
+        if self._export_pending and now - self._last_export >= self.export_interval:
+            self._export(now)
+
+        return released
+
+    def _export(self, now: float) -> None:
+        """Rewrite the flat files and the nginx geo includes"""
+        self.ip_manager.export_flat_files()
+        self._last_export = now
+        self._export_pending = False
+
+        # Released and escalated entries must also leave
+        # ip_blacklist_generated.conf
+        try:
+            changed = self.ip_manager.compile_geo_includes()
+        except Exception as e:
+            self.logger.warning(f"Could not compile nginx geo includes: {e}")
+            return
+        if any(changed.values()):
+            self.logger.info("Updated nginx geo includes (reload nginx to apply)")
+
+    def seconds_until_next(self) -> float:
+        """
+        Get time to sleep before the next tick
+
+        Returns:
+            Seconds, bounded by poll_interval
+        """
+        now = self.clock()
+        wake = now + self.poll_interval
+
+        expiry = self.next_expiry()
+        if expiry is not None:
+            wake = min(wake, max(expiry, self._last_release + self.batch_window))
+        if self._export_pending:
+            wake = min(wake, self._last_export + self.export_interval)
+
+        return max(0.0, wake - now)
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Run until stop_event is set
+
+        Args:
+            stop_event: Event that ends the loop (e.g. set by a signal handler)
+        """
+        stop_event = stop_event or threading.Event()
+        self.reload(force=True)
+        self.logger.info(f"Expiry scheduler started ({len(self)} temporary blocks pending)")
+
+        while not stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                # Keep the schedule; the IPs stay due and are retried
+                self.logger.error(f"Release failed: {e}")
+                self._version = None
+                stop_event.wait(self.poll_interval)
+                continue
+            stop_event.wait(self.seconds_until_next())
+
+        if self._export_pending:
+            self._export(self.clock())
+        self.logger.info(f"Expiry scheduler stopped ({self.released_total} blocks released)")
@@ -9,26 +9,273 @@ Handles Google (IP whitelist) and Bing (reverse DNS) verification.
 """
 
 import json
+import time
+import atexit
 import socket
 import ipaddress
-from datetime import datetime, timedelta
-from typing import Optional, Dict
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Iterable, List, Tuple
 import os
-from .utils import log_action
+from .utils import log_action, file_lock
+from .ipindex import IPIntervalIndex
+from .geoinclude import (
+    GEO_RANGES_THRESHOLD, render_geo, render_ipset_restore, write_if_changed
+)
+
+SEARCH_ENGINES_GEO = "/etc/ukabu/config/search_engines_generated.conf"
+SEARCH_ENGINES_IPSET = "/var/lib/ukabu/search_engines.ipset"
+SEARCH_ENGINES_SET_NAME = "ukabu-search-engines"
+
+BING_HOSTNAME_SUFFIX = '.search.msn.com'
+
+
+def _normalize_ip(ip: str) -> str:
+    """Canonical text form of an IP address (for IPv6 comparisons)."""
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return ip
+
+
+class SystemResolver:
+    """DNS resolver backed by the system (blocking) resolver."""
+    
+    def reverse(self, ip: str) -> str:
+        """Reverse lookup: IP -> hostname (raises socket.herror if none)."""
+        hostname, _, _ = socket.gethostbyaddr(ip)
+        return hostname
+    
+    def forward(self, hostname: str) -> List[str]:
+        """Forward lookup: hostname -> all IPv4 and IPv6 addresses."""
+        infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class BingVerificationCache:
+    """
+    Bounded, TTL-aware cache of Bing reverse DNS verification results.
+    
+    Entries are kept in LRU order and capped at max_entries. Positive and
+    negative results expire independently. The cache file is only read on
+    first use, and writes are debounced: the file is rewritten (atomically,
+    compact JSON) after flush_every changes or flush_interval seconds,
+    and once more at interpreter exit.
+    
+    Several processes may share the file: a flush re-reads it under
+    <cache>.lock and keeps the newer result per IP, so verifications
+    written by another process since this one loaded are not lost.
+    """
+    
+    def __init__(self, path: str,
+                 max_entries: int = 10000,
+                 positive_ttl: int = 86400,
+                 negative_ttl: int = 3600,
+                 flush_every: int = 100,
+                 flush_interval: float = 30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        
+        # ip -> (verified, epoch timestamp), oldest first
+        self._entries = OrderedDict()
+        self._loaded = False
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+        self._atexit_registered = False
+    
+    def _ttl(self, verified: bool) -> int:
+        return self.positive_ttl if verified else self.negative_ttl
+    
+    def _read_file(self) -> Dict[str, Tuple[bool, float]]:
+        """Read unexpired entries from the cache file (ip -> (verified, stamp))."""
+        if not os.path.exists(self.path):
+            return {}
+        
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load Bing cache: {e}")
+            return {}
+        
+        now = time.time()
+        entries = {}
+        for ip, cached in data.items():
+            try:
+                verified = bool(cached['verified'])
+                stamp = datetime.fromisoformat(cached['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if now - stamp < self._ttl(verified):
+                entries[ip] = (verified, stamp)
+        return entries
+    
+    def _replace_entries(self, entries: Dict[str, Tuple[bool, float]]):
+        """Keep the most recent entries, oldest first for LRU order."""
+        ranked = sorted(entries.items(), key=lambda item: item[1][1])
+        self._entries = OrderedDict(ranked[-self.max_entries:])
+    
+    def _load(self):
+        """Load cache file on first use, dropping expired entries."""
+        self._loaded = True
+        self._replace_entries(self._read_file())
+    
+    def get(self, ip: str) -> Optional[bool]:
+        """
+        Get cached verification result.
+        
+        Returns:
+            True/False if a fresh result is cached, None otherwise
+        """
+        if not self._loaded:
+            self._load()
+        
+        cached = self._entries.get(ip)
+        if cached is None:
+            return None
+        
+        verified, stamp = cached
+        if time.time() - stamp >= self._ttl(verified):
+            del self._entries[ip]
+            self._mark_dirty()
+            return None
+        
+        self._entries.move_to_end(ip)
+        return verified
+    
+    def set(self, ip: str, verified: bool):
+        """Store verification result, evicting least recently used entries."""
+        if not self._loaded:
+            self._load()
+        
+        self._entries[ip] = (verified, time.time())
+        self._entries.move_to_end(ip)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        
+        self._mark_dirty()
+    
+    def _mark_dirty(self):
+        self._dirty += 1
+        
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+        
+        if (self._dirty >= self.flush_every or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+    
+    def flush(self) -> bool:
+        """
+        Write pending changes to the cache file.
+        
+        Returns:
+            True if the file was written
+        """
+        if not self._dirty:
+            return False
+        return self._write(merge=True)
+    
+    def _write(self, merge: bool) -> bool:
+        """Rewrite the cache file, merging in other writers' entries if asked."""
+        temp_path = f"{self.path}.tmp"
+        try:
+            with file_lock(Path(f"{self.path}.lock")):
+                if merge:
+                    # Newest result per IP wins
+                    entries = self._read_file()
+                    for ip, (verified, stamp) in self._entries.items():
+                        if ip not in entries or stamp >= entries[ip][1]:
+                            entries[ip] = (verified, stamp)
+                    self._replace_entries(entries)
+                
+                data = {
+                    ip: {'verified': verified,
+                         'timestamp': datetime.fromtimestamp(stamp).isoformat()}
+                    for ip, (verified, stamp) in self._entries.items()
+                }
+                with open(temp_path, 'w') as f:
+                    json.dump(data, f, separators=(',', ':'))
+                os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Warning: Could not save Bing cache: {e}")
+            return False
+        
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+        return True
+    
+    def clear(self) -> int:
+        """
+        Remove all entries and persist immediately.
+        
+        Returns:
+            Number of entries removed
+        """
+        if not self._loaded:
+            self._load()
+        
+        count = len(self._entries)
+        self._entries.clear()
+        # Clearing replaces the file instead of merging into it
+        self._write(merge=False)
+        return count
+    
+    def verified_ips(self) -> List[str]:
+        """IPs with a fresh positive verification."""
+        if not self._loaded:
+            self._load()
+        now = time.time()
+        return [
+            ip for ip, (verified, stamp) in self._entries.items()
+            if verified and now - stamp < self.positive_ttl
+        ]
+    
+    def verified_count(self) -> int:
+        """Number of cached positive verifications."""
+        if not self._loaded:
+            self._load()
+        return sum(1 for verified, _ in self._entries.values() if verified)
+    
+    def __len__(self) -> int:
+        if not self._loaded:
+            self._load()
+        return len(self._entries)
+
 
 class SearchEngineDetector:
     """Detects and verifies search engine bots."""
     
     def __init__(self, 
                  google_config="/etc/ukabu/config/search_engines_google.conf",
-                 bing_cache="/etc/ukabu/config/search_engines_bing_cache.json"):
+                 bing_cache="/etc/ukabu/config/search_engines_bing_cache.json",
+                 bing_cache_size: int = 10000,
+                 bing_positive_ttl: int = 86400,
+                 bing_negative_ttl: int = 3600,
+                 resolver=None):
         self.google_config = google_config
         self.bing_cache = bing_cache
         self.google_ips = self._load_google_ips()
-        self.bing_cache_data = self._load_bing_cache()
+        self.google_index = IPIntervalIndex(self.google_ips)
+        # Loaded lazily on the first Bing lookup
+        self.bing_verifications = BingVerificationCache(
+            bing_cache,
+            max_entries=bing_cache_size,
+            positive_ttl=bing_positive_ttl,
+            negative_ttl=bing_negative_ttl
+        )
+        # Anything with reverse(ip) and forward(hostname) methods
+        self.resolver = resolver or SystemResolver()
     
     def _load_google_ips(self) -> set:
-        """Load Google bot IP ranges from config file."""
+        """Load Google bot IP ranges (IPv4 and IPv6) from config file."""
         ips = set()
         
         if not os.path.exists(self.google_config):
@@ -45,25 +292,6 @@ class SearchEngineDetector:
         
         return ips
     
-    def _load_bing_cache(self) -> dict:
-        """Load Bing DNS verification cache."""
-        if not os.path.exists(self.bing_cache):
-            return {}
-        
-        try:
-            with open(self.bing_cache, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    
-    def _save_bing_cache(self):
-        """Save Bing DNS verification cache."""
-        try:
-            with open(self.bing_cache, 'w') as f:
-                json.dump(self.bing_cache_data, f, indent=2)
-        except Exception as e:
-            print(f"Warning: Could not save Bing cache: {e}")
-    
     def verify(self, ip: str, verbose: bool = False) -> Optional[Dict[str, str]]:
         """
         Verify if IP belongs to a known search engine.
@@ -93,24 +321,13 @@ class SearchEngineDetector:
         return None
     
     def _is_google(self, ip: str) -> bool:
-        """Check if IP is in Google IP whitelist."""
-        try:
-            ip_addr = ipaddress.ip_address(ip)
-            
-            for ip_range in self.google_ips:
-                try:
-                    if '/' in ip_range:
-                        network = ipaddress.ip_network(ip_range, strict=False)
-                        if ip_addr in network:
-                            return True
-                    elif str(ip_addr) == ip_range:
-                        return True
-                except:
-                    continue
-            
-            return False
-        except:
-            return False
+        """
+        Check if IP is in Google IP whitelist.
+        
+        Uses the interval index built at load time, so a lookup is a
+        single bisect instead of a scan over every range.
+        """
+        return self.google_index.lookup(ip) is not None
     
     def _is_bing(self, ip: str, verbose: bool = False) -> bool:
         """
@@ -119,43 +336,47 @@ class SearchEngineDetector:
         Steps:
         1. Reverse DNS lookup: IP -> hostname
         2. Verify hostname ends with .search.msn.com
-        3. Forward DNS lookup: hostname -> IP
-        4. Verify IP matches original
+        3. Forward DNS lookup: hostname -> IPs
+        4. Verify original IP is among the forward addresses
         
-        Results are cached for 24 hours.
+        Positive results are cached for 24 hours, negative results for
+        1 hour (see BingVerificationCache).
         """
         # Check cache first
-        if ip in self.bing_cache_data:
-            cached = self.bing_cache_data[ip]
-            cache_time = datetime.fromisoformat(cached['timestamp'])
-            
-            # Cache valid for 24 hours
-            if datetime.now() - cache_time < timedelta(hours=24):
-                if verbose:
-                    print(f"  (using cached result: {cached['verified']})")
-                return cached['verified']
+        cached = self.bing_verifications.get(ip)
+        if cached is not None:
+            if verbose:
+                print(f"  (using cached result: {cached})")
+            return cached
         
-        # Perform verification
-        verified = False
+        verified = self._verify_bing_dns(ip, verbose)
         
+        # Update cache (persisted in batches)
+        self.bing_verifications.set(ip, verified)
+        
+        return verified
+    
+    def _verify_bing_dns(self, ip: str, verbose: bool = False) -> bool:
+        """Run the reverse/forward DNS check for one IP (no caching)."""
         try:
             # Step 1: Reverse DNS lookup
-            hostname, _, _ = socket.gethostbyaddr(ip)
+            hostname = self.resolver.reverse(ip)
             
             if verbose:
                 print(f"  Reverse DNS: {ip} -> {hostname}")
             
             # Step 2: Verify hostname
-            if hostname.endswith('.search.msn.com'):
-                # Step 3: Forward DNS lookup
-                forward_ip = socket.gethostbyname(hostname)
-                
-                if verbose:
-                    print(f"  Forward DNS: {hostname} -> {forward_ip}")
-                
-                # Step 4: Verify IP matches
-                if forward_ip == ip:
-                    verified = True
+            if not hostname.endswith(BING_HOSTNAME_SUFFIX):
+                return False
+            
+            # Step 3: Forward DNS lookup (all A/AAAA records)
+            forward_ips = self.resolver.forward(hostname)
+            
+            if verbose:
+                print(f"  Forward DNS: {hostname} -> {', '.join(forward_ips)}")
+            
+            # Step 4: Verify IP is among the forward addresses
+            return _normalize_ip(ip) in {_normalize_ip(addr) for addr in forward_ips}
         except socket.herror:
             if verbose:
                 print(f"  No reverse DNS record found")
@@ -163,14 +384,49 @@ class SearchEngineDetector:
             if verbose:
                 print(f"  Verification failed: {e}")
         
-        # Update cache
-        self.bing_cache_data[ip] = {
-            'verified': verified,
-            'timestamp': datetime.now().isoformat()
-        }
-        self._save_bing_cache()
+        return False
+    
+    def verify_many(self, ips: Iterable[str], concurrency: int = 16) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Verify many IPs concurrently.
         
-        return verified
+        Input is deduplicated, Google ranges and the Bing cache are
+        consulted first, and only the remaining IPs are resolved, using a
+        thread pool of blocking resolver calls.
+        
+        Args:
+            ips: IP addresses to verify
+            concurrency: Maximum number of parallel DNS checks
+        
+        Returns:
+            Dict mapping each IP to the verify() result (None if not verified)
+        """
+        results: Dict[str, Optional[Dict[str, str]]] = {}
+        pending = []
+        
+        for ip in dict.fromkeys(ip.strip() for ip in ips):
+            if not ip:
+                continue
+            results[ip] = None
+            if self._is_google(ip):
+                results[ip] = {'engine': 'Google', 'method': 'ip_whitelist'}
+                continue
+            cached = self.bing_verifications.get(ip)
+            if cached is not None:
+                if cached:
+                    results[ip] = {'engine': 'Bing', 'method': 'reverse_dns'}
+                continue
+            pending.append(ip)
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                for ip, verified in zip(pending, pool.map(self._verify_bing_dns, pending)):
+                    self.bing_verifications.set(ip, verified)
+                    if verified:
+                        results[ip] = {'engine': 'Bing', 'method': 'reverse_dns'}
+            self.bing_verifications.flush()
+        
+        return results
     
     def update_google_ips(self, dry_run: bool = False, verbose: bool = False) -> bool:
         """
@@ -211,34 +467,40 @@ class SearchEngineDetector:
             
             data = json.loads(result.stdout)
             
-            # Extract IPv4 prefixes
+            # Extract IPv4 and IPv6 prefixes
             ipv4_ranges = []
+            ipv6_ranges = []
             for prefix in data.get('prefixes', []):
                 if 'ipv4Prefix' in prefix:
                     ipv4_ranges.append(prefix['ipv4Prefix'])
+                elif 'ipv6Prefix' in prefix:
+                    ipv6_ranges.append(prefix['ipv6Prefix'])
             
-            if not ipv4_ranges:
-                print("Error: No IPv4 ranges found in response")
+            if not ipv4_ranges and not ipv6_ranges:
+                print("Error: No IP ranges found in response")
                 return False
             
+            total = len(ipv4_ranges) + len(ipv6_ranges)
+            
             # Write to config file
             with open(self.google_config, 'w') as f:
                 f.write(f"# Google bot IP ranges\n")
                 f.write(f"# Auto-updated: {datetime.now().isoformat()}\n")
                 f.write(f"# Source: {url}\n")
-                f.write(f"# Count: {len(ipv4_ranges)} ranges\n\n")
-                for ip_range in ipv4_ranges:
+                f.write(f"# Count: {len(ipv4_ranges)} IPv4, {len(ipv6_ranges)} IPv6 ranges\n\n")
+                for ip_range in ipv4_ranges + ipv6_ranges:
                     f.write(f"{ip_range}\n")
             
-            log_action(f"Updated Google IP whitelist ({len(ipv4_ranges)} ranges)")
+            log_action(f"Updated Google IP whitelist ({total} ranges)")
             
             if verbose:
-                print(f"âœ“ Updated {len(ipv4_ranges)} Google IP ranges")
+                print(f"âœ“ Updated {len(ipv4_ranges)} IPv4 and {len(ipv6_ranges)} IPv6 Google IP ranges")
             else:
                 print(f"âœ“ Updated Google IP whitelist")
             
-            # Reload cached IPs
+            # Reload cached IPs and rebuild lookup index
             self.google_ips = self._load_google_ips()
+            self.google_index = IPIntervalIndex(self.google_ips)
             
             return True
             
@@ -246,6 +508,58 @@ class SearchEngineDetector:
             print(f"Error updating Google IPs: {e}")
             return False
     
+    def compile_includes(self,
+                         geo_path: str = SEARCH_ENGINES_GEO,
+                         ipset_path: str = SEARCH_ENGINES_IPSET,
+                         ranges_threshold: int = GEO_RANGES_THRESHOLD,
+                         dry_run: bool = False,
+                         verbose: bool = False) -> Dict[str, bool]:
+        """
+        Compile Google ranges and verified Bing IPs into nginx/ipset files.
+        
+        Writes a geo definition for $is_search_engine (included from
+        config.conf) and an `ipset restore` script for the
+        ukabu-search-engines sets. Networks are collapsed first, and each
+        file is only rewritten when its content changes.
+        
+        Args:
+            geo_path: Output path for the nginx geo include
+            ipset_path: Output path for the ipset restore script
+            ranges_threshold: IPv4 count above which geo uses ranges mode
+            dry_run: If True, only show what would be done
+            verbose: Verbose output
+        
+        Returns:
+            Dict with 'geo' and 'ipset' set to True if that file changed
+        """
+        networks = list(self.google_ips) + self.bing_verifications.verified_ips()
+        
+        geo_content = render_geo(
+            'is_search_engine', networks,
+            title="Verified search engine IPs (Google ranges + Bing reverse DNS)",
+            ranges_threshold=ranges_threshold
+        )
+        ipset_content = render_ipset_restore(SEARCH_ENGINES_SET_NAME, networks)
+        
+        changed = {
+            'geo': write_if_changed(geo_path, geo_content, dry_run=dry_run),
+            'ipset': write_if_changed(ipset_path, ipset_content, dry_run=dry_run),
+        }
+        
+        for name, path in (('geo', geo_path), ('ipset', ipset_path)):
+            if dry_run:
+                if changed[name]:
+                    print(f"[DRY RUN] Would update {path}")
+            elif changed[name]:
+                print(f"âœ“ Updated {path}")
+            elif verbose:
+                print(f"  {path} unchanged")
+        
+        if not dry_run and any(changed.values()):
+            log_action(f"Compiled search engine includes ({len(networks)} entries)")
+        
+        return changed
+    
     def clear_bing_cache(self, dry_run: bool = False) -> bool:
         """
         Clear Bing DNS verification cache.
@@ -257,12 +571,10 @@ class SearchEngineDetector:
             True if successful
         """
         if dry_run:
-            print(f"[DRY RUN] Would clear Bing DNS cache ({len(self.bing_cache_data)} entries)")
+            print(f"[DRY RUN] Would clear Bing DNS cache ({len(self.bing_verifications)} entries)")
             return True
         
-        count = len(self.bing_cache_data)
-        self.bing_cache_data = {}
-        self._save_bing_cache()
+        count = self.bing_verifications.clear()
         
         log_action(f"Cleared Bing DNS cache ({count} entries)")
         print(f"âœ“ Cleared Bing DNS cache ({count} entries)")
@@ -289,9 +601,9 @@ class SearchEngineDetector:
                 print(f"    ... and {len(self.google_ips) - 5} more")
         
         print(f"\nBing (Reverse DNS):")
-        print(f"  Cached Verifications: {len(self.bing_cache_data)}")
-        if self.bing_cache_data:
-            verified = sum(1 for v in self.bing_cache_data.values() if v['verified'])
+        print(f"  Cached Verifications: {len(self.bing_verifications)}")
+        if len(self.bing_verifications):
+            verified = self.bing_verifications.verified_count()
             print(f"  Verified IPs: {verified}")
         
         print("")
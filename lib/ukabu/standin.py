@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Stand-in for the ukabu-trackerd socket
+
+Newline-delimited JSON, one response line per message, any number of
+messages per connection. Both message shapes are answered from one
+in-memory strike table:
+
+- nginx (the Go daemon's socket protocol):
+
+    {"type": "failure", "ip": ..., "domain": ..., "reason": ..., "timestamp": ...}
+    -> {"strike_count": 1, "blocked": false}
+
+  Strikes count per IP and domain; the strike that reaches the threshold
+  blocks the IP. "success" clears the strikes of the IP for the domain.
+
+- manager (DaemonClient): {"action": ...} commands, including batch
+  frames:
+
+    {"action": "batch", "commands": [{...}, ...]}
+    -> {"status": "ok", "data": {"results": [{...}, ...]}}
+
+  and streamed, paged listings of strikes and blocks ("stream": true with
+  "limit" and "cursor"; the cursor is an offset into the listing).
+
+- subscriptions: {"action": "subscribe"} turns the connection into an
+  event stream (see daemon.DaemonClient.subscribe). Subscribers that fall
+  more than SUBSCRIBER_QUEUE_SIZE events behind are dropped.
+
+Used to exercise the clients, benchmarks and load tests without the Go
+daemon, in-process (StandinDaemon) or on its own:
+
+    python3 -m ukabu.standin --socket /tmp/trackerd.sock
+"""
+
+import os
+import sys
+import json
+import queue
+import socket
+import argparse
+import threading
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Failure reason whose first occurrence may be excused
+TIMEOUT_REASON = 'timeout'
+
+# Events a subscriber may lag behind before it is dropped
+SUBSCRIBER_QUEUE_SIZE = 10000
+
+# Seconds between checks for expired blocks
+EXPIRE_INTERVAL = 1.0
+
+
+class _Subscriber:
+    """Event queue of one subscribed connection"""
+
+    def __init__(self, events: Optional[Set[str]]):
+        self.events = events
+        self.queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class StandinDaemon:
+    """Threaded Unix socket server answering nginx and manager messages"""
+
+    def __init__(
+        self,
+        socket_path: str,
+        strike_threshold: int = 3,
+        lockout_period: int = 10080,
+        excuse_first_timeout: bool = False
+    ):
+        """
+        Initialize stand-in daemon
+
+        Args:
+            socket_path: Path of the Unix socket to listen on
+            strike_threshold: Strikes that block an IP (as ukabu-trackerd)
+            lockout_period: Lockout of a strike block in minutes
+                (0 for permanent)
+            excuse_first_timeout: Do not count the first 'timeout'
+                failure of an IP on a domain
+        """
+        self.socket_path = socket_path
+        self.strike_threshold = strike_threshold
+        self.lockout_period = lockout_period
+        self.excuse_first_timeout = excuse_first_timeout
+        # {ip: {domain: strike count}}
+        self.strikes: Dict[str, Dict[str, int]] = {}
+        self.blocks: Dict[str, Dict[str, Any]] = {}
+        self.messages_handled = 0
+        self.seq = 0
+        self._subscribers: List[_Subscriber] = []
+        self._stopped = threading.Event()
+        self._timeouts_excused: Set[Tuple[str, str]] = set()
+        self._state_lock = threading.Lock()
+        self._server: Optional[socket.socket] = None
+        self._connections: Set[socket.socket] = set()
+        self._started = time.time()
+
+    def __enter__(self) -> 'StandinDaemon':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Listen on the socket and serve connections in background threads"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(1024)
+        self._server = server
+        self._stopped.clear()
+        threading.Thread(target=self._accept_loop, name='ukabu-standin', daemon=True).start()
+        threading.Thread(target=self._expire_loop, name='ukabu-standin-expire', daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop listening, drop open connections and remove the socket"""
+        self._stopped.set()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for conn in list(self._connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def strike_count(self, ip_address: str) -> int:
+        """Get the strikes of an IP over all domains"""
+        return sum(self.strikes.get(ip_address, {}).values())
+
+    def expire_blocks(self, now: Optional[float] = None) -> int:
+        """
+        Remove blocks whose lockout has passed
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Number of blocks removed
+        """
+        if now is None:
+            now = time.time()
+        with self._state_lock:
+            expired = [ip for ip, info in self.blocks.items()
+                       if info.get('expires_at') is not None and info['expires_at'] <= now]
+            for ip_address in expired:
+                del self.blocks[ip_address]
+                self._publish({'event': 'expire', 'ip': ip_address})
+        return len(expired)
+
+    def _expire_loop(self) -> None:
+        while not self._stopped.wait(EXPIRE_INTERVAL):
+            self.expire_blocks()
+
+    def _add_block(self, ip_address: str, duration: int, reason: str, **extra: Any) -> None:
+        """Record a block and publish it (state lock held)"""
+        info = {'duration': duration, 'reason': reason, **extra}
+        info['expires_at'] = int(time.time()) + duration * 60 if duration else None
+        self.blocks[ip_address] = info
+        self._publish({'event': 'block', 'ip': ip_address, **info})
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        """Number an event and queue it for subscribers (state lock held)"""
+        self.seq += 1
+        event['seq'] = self.seq
+        for subscriber in self._subscribers:
+            if subscriber.events is not None and event['event'] not in subscriber.events:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except queue.Full:
+                subscriber.overflowed = True
+
+    def _accept_loop(self) -> None:
+        server = self._server
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        """Answer each message line on one connection, in order"""
+        self._connections.add(conn)
+        try:
+            with conn, conn.makefile('rb') as reader:
+                for line in reader:
+                    if not line.strip():
+                        continue
+                    try:
+                        message = json.loads(line)
+                        if message.get('action') == 'subscribe':
+                            self._serve_subscription(conn, message)
+                            return
+                        if message.get('stream') and message.get('action') in ('strikes', 'blocks'):
+                            self._send_stream(conn, message)
+                            continue
+                        response = self.handle(message)
+                    except (json.JSONDecodeError, AttributeError):
+                        response = self._invalid('invalid JSON')
+                    conn.sendall(json.dumps(response).encode('utf-8') + b'\n')
+        except OSError:
+            pass
+        finally:
+            self._connections.discard(conn)
+
+    def _serve_subscription(self, conn: socket.socket, command: Dict[str, Any]) -> None:
+        """Push events to a subscribed connection until it goes away"""
+        events = command.get('events')
+        subscriber = _Subscriber(set(events) if isinstance(events, list) else None)
+        try:
+            heartbeat = float(command.get('heartbeat') or 10.0)
+        except (TypeError, ValueError):
+            heartbeat = 10.0
+
+        # Register and snapshot under one lock, so no event falls between
+        with self._state_lock:
+            lines = [{'status': 'ok', 'event': 'subscribed', 'seq': self.seq}]
+            if command.get('snapshot'):
+                lines.extend({'event': 'block', 'ip': ip, 'snapshot': True, **info}
+                             for ip, info in self.blocks.items())
+                lines.extend({'event': 'strike', 'ip': ip, 'strikes': sum(domains.values()), 'snapshot': True}
+                             for ip, domains in self.strikes.items())
+                lines.append({'event': 'synced', 'seq': self.seq})
+            self._subscribers.append(subscriber)
+
+        try:
+            conn.sendall(b''.join(json.dumps(line).encode('utf-8') + b'\n' for line in lines))
+            while not subscriber.overflowed and not self._stopped.is_set():
+                try:
+                    event = subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    event = {'event': 'heartbeat'}
+                batch = [event]
+                while len(batch) < 1000:
+                    try:
+                        batch.append(subscriber.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                conn.sendall(b''.join(json.dumps(item).encode('utf-8') + b'\n' for item in batch))
+        finally:
+            with self._state_lock:
+                self._subscribers.remove(subscriber)
+
+    @staticmethod
+    def _invalid(message: str) -> Dict[str, Any]:
+        """Error response readable as either shape"""
+        return {'status': 'error', 'message': message, 'strike_count': 0, 'blocked': False}
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer one message of either shape
+
+        Args:
+            message: Message dictionary
+
+        Returns:
+            Response dictionary
+        """
+        if 'type' in message:
+            return self.handle_event(message)
+        if 'action' in message:
+            return self.handle_command(message)
+        return self._invalid('message needs a type or an action')
+
+    def handle_event(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer an nginx failure/success message like ukabu-trackerd
+
+        Args:
+            message: {"type", "ip", "domain", "reason", "timestamp"}
+
+        Returns:
+            {"strike_count", "blocked"} (and "message" on errors)
+        """
+        kind = message.get('type')
+        ip_address = message.get('ip') or ''
+        domain = message.get('domain') or ''
+
+        with self._state_lock:
+            self.messages_handled += 1
+
+            if kind == 'success':
+                domains = self.strikes.get(ip_address)
+                if domains is not None and domain in domains:
+                    del domains[domain]
+                    if not domains:
+                        del self.strikes[ip_address]
+                    self._publish({'event': 'flush', 'ip': ip_address, 'domain': domain,
+                                   'strikes': self.strike_count(ip_address)})
+                return {'strike_count': 0, 'blocked': False}
+
+            if kind != 'failure':
+                return {'strike_count': 0, 'blocked': False, 'message': 'unknown message type'}
+
+            domains = self.strikes.setdefault(ip_address, {})
+            count = domains.get(domain, 0)
+            key = (ip_address, domain)
+            if (self.excuse_first_timeout and message.get('reason') == TIMEOUT_REASON
+                    and key not in self._timeouts_excused):
+                self._timeouts_excused.add(key)
+            else:
+                count += 1
+                domains[domain] = count
+                self._publish({'event': 'strike', 'ip': ip_address, 'domain': domain,
+                               'strike_count': count, 'strikes': self.strike_count(ip_address)})
+            if not domains:
+                del self.strikes[ip_address]
+
+            if count >= self.strike_threshold:
+                self._add_block(ip_address, self.lockout_period, '3_strikes', domain=domain)
+                return {'strike_count': count, 'blocked': True}
+            return {'strike_count': count, 'blocked': False}
+
+    def handle_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute one manager command
+
+        Args:
+            command: Command dictionary
+
+        Returns:
+            Response dictionary
+        """
+        action = command.get('action')
+        if action == 'batch':
+            commands = command.get('commands')
+            if not isinstance(commands, list):
+                return {'status': 'error', 'message': 'batch needs a commands list'}
+            results: List[Dict[str, Any]] = []
+            for item in commands:
+                if not isinstance(item, dict) or item.get('action') in (None, 'batch'):
+                    results.append({'status': 'error', 'message': 'invalid batch item'})
+                else:
+                    results.append(self.handle_command(item))
+            return {'status': 'ok', 'data': {'results': results}}
+
+        with self._state_lock:
+            self.messages_handled += 1
+            ip_address = command.get('ip')
+
+            if action == 'ping':
+                return {'status': 'ok'}
+            if action == 'reload':
+                self._publish({'event': 'reload'})
+                return {'status': 'ok'}
+            if action == 'strikes':
+                if ip_address:
+                    return {'status': 'ok', 'data': {ip_address: self.strike_count(ip_address)}}
+                return {'status': 'ok', 'data': {ip: sum(d.values()) for ip, d in self.strikes.items()}}
+            if action == 'stats':
+                return {'status': 'ok', 'data': {
+                    'uptime_seconds': int(time.time() - self._started),
+                    'total_strikes': sum(sum(d.values()) for d in self.strikes.values()),
+                    'active_blocks': len(self.blocks),
+                }}
+            if action == 'blocks':
+                blocks = [{'ip': ip, **info} for ip, info in self.blocks.items()]
+                return {'status': 'ok', 'data': {'blocks': blocks}}
+
+            if not ip_address:
+                if action in ('flush', 'block', 'unblock'):
+                    return {'status': 'error', 'message': 'missing ip'}
+                return {'status': 'error', 'message': f'unknown action: {action}'}
+            if action == 'flush':
+                if self.strikes.pop(ip_address, None) is not None:
+                    self._publish({'event': 'flush', 'ip': ip_address, 'strikes': 0})
+                return {'status': 'ok'}
+            if action == 'block':
+                self._add_block(ip_address, command.get('duration', 0), command.get('reason', ''))
+                return {'status': 'ok'}
+            if action == 'unblock':
+                if self.blocks.pop(ip_address, None) is None:
+                    return {'status': 'error', 'message': f'{ip_address} is not blocked'}
+                self._publish({'event': 'unblock', 'ip': ip_address})
+                return {'status': 'ok'}
+            return {'status': 'error', 'message': f'unknown action: {action}'}
+
+    def _send_stream(self, conn: socket.socket, command: Dict[str, Any]) -> None:
+        """Send one page of a listing as NDJSON records plus a trailer"""
+        chunk = bytearray()
+        for line in self.stream_page(command):
+            chunk += json.dumps(line).encode('utf-8') + b'\n'
+            if len(chunk) >= 65536:
+                conn.sendall(chunk)
+                chunk.clear()
+        conn.sendall(chunk)
+
+    def stream_page(self, command: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Get one page of a streamed listing
+
+        Args:
+            command: 'strikes' or 'blocks' command with 'limit' and 'cursor'
+
+        Returns:
+            Iterator of records followed by the trailer
+        """
+        try:
+            offset = int(command.get('cursor') or 0)
+            limit = int(command.get('limit') or 0)
+        except (TypeError, ValueError):
+            yield {'status': 'error', 'message': 'invalid cursor or limit'}
+            return
+        if offset < 0 or limit <= 0:
+            yield {'status': 'error', 'message': 'invalid cursor or limit'}
+            return
+
+        with self._state_lock:
+            self.messages_handled += 1
+            if command.get('action') == 'strikes':
+                page = [{'ip': ip, 'strikes': sum(domains.values())}
+                        for ip, domains in islice(self.strikes.items(), offset, offset + limit)]
+                total = len(self.strikes)
+            else:
+                page = [{'ip': ip, **info}
+                        for ip, info in islice(self.blocks.items(), offset, offset + limit)]
+                total = len(self.blocks)
+
+        yield from page
+        end = offset + len(page)
+        yield {'status': 'ok', 'next_cursor': str(end) if end < total else None}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Stand-in for the ukabu-trackerd socket')
+    parser.add_argument('--socket', required=True, help='Unix socket path to listen on')
+    parser.add_argument('--strike-threshold', type=int, default=3, help='Strikes that block an IP (default: 3)')
+    parser.add_argument('--lockout', type=int, default=10080, help='Lockout in minutes, 0 for permanent (default: 10080)')
+    parser.add_argument('--excuse-first-timeout', action='store_true', help='Do not count the first timeout failure')
+    args = parser.parse_args()
+
+    daemon = StandinDaemon(
+        args.socket,
+        strike_threshold=args.strike_threshold,
+        lockout_period=args.lockout,
+        excuse_first_timeout=args.excuse_first_timeout
+    )
+    daemon.start()
+    print(f"Stand-in daemon listening on {args.socket}", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+
+
+if __name__ == '__main__':
+    main()
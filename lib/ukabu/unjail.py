@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Release of expired temporary blocks for UKABU WAF
+
+Replaces the per-line jq / per-IP ipset loop of ukabu-unjail.sh: the
+blacklist is read once, expiries are compared as epoch integers, expired
+IPs are removed from the blacklist in one write and from the temporary
+ipsets in one `ipset restore` transaction.
+"""
+
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from .ipmanager import IPManager
+from .ipset import IPSetClient, TEMPORARY_SET_PREFIX, ipset_member
+from .ipsync import IPSetSynchronizer
+from .escalation import SubnetEscalator, MEMBERS_KEY, DAEMON_SOURCE, active_members
+from .utils import get_expiry_epoch
+
+
+class UnjailEngine:
+    """Remove expired temporary blocks from blacklist and ipsets"""
+
+    def __init__(
+        self,
+        ip_manager: IPManager,
+        ipset_client: Optional[IPSetClient] = None,
+        set_prefix: str = TEMPORARY_SET_PREFIX,
+        escalator: Optional[SubnetEscalator] = None,
+        synchronizer: Optional[IPSetSynchronizer] = None
+    ):
+        """
+        Initialize unjail engine
+
+        Args:
+            ip_manager: IP manager owning the blacklist
+            ipset_client: ipset wrapper (default: IPSetClient())
+            set_prefix: Name prefix of the temporary block sets
+            escalator: Also escalate clustered blocks after each run
+            synchronizer: Places restored members in the ipsets
+                (default: IPSetSynchronizer over ipset_client)
+        """
+        self.ip_manager = ip_manager
+        self.ipset = ipset_client or IPSetClient(dry_run=ip_manager.dry_run)
+        self.set_prefix = set_prefix
+        self.escalator = escalator
+        self.synchronizer = synchronizer or IPSetSynchronizer(ip_manager, self.ipset)
+        self.logger = logging.getLogger('ukabu-manager.unjail')
+
+    def find_expired(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Split blacklist into expired and remaining entries
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Dict with 'expired' (list of entries), 'kept' and 'permanent'
+            counts
+        """
+        if now is None:
+            now = int(time.time())
+
+        expired: List[Dict[str, Any]] = []
+        kept = 0
+        permanent = 0
+        for entry in self.ip_manager.get_blacklist():
+            expiry = get_expiry_epoch(entry)
+            if expiry is None:
+                # Permanent, or no usable timestamp: keep
+                permanent += 1
+            elif expiry <= now:
+                expired.append(entry)
+            else:
+                kept += 1
+
+        return {'expired': expired, 'kept': kept, 'permanent': permanent}
+
+    def release_from_ipsets(self, ip_addresses: List[str]) -> Dict[str, int]:
+        """
+        Delete addresses from all temporary sets in one restore
+
+        Only members actually present are deleted, so the transaction
+        cannot fail on missing entries. Sets with timeout support are
+        skipped: the kernel expires their members itself.
+
+        Args:
+            ip_addresses: IP addresses / CIDR ranges
+
+        Returns:
+            Counts: {'removed', 'missing'}
+        """
+        timeout_sets = set(self.ipset.timeout_sets(self.set_prefix))
+        set_names = [
+            name for name in self.ipset.list_sets(self.set_prefix)
+            if name not in timeout_sets
+        ]
+        if not set_names:
+            return {'removed': 0, 'missing': 0}
+        sets = self.ipset.save(set_names)
+
+        lines = []
+        missing = 0
+        for ip_address in ip_addresses:
+            member = ipset_member(ip_address)
+            found = False
+            for name, info in sets.items():
+                if member in info['members']:
+                    lines.append(f"del {name} {member}")
+                    found = True
+            if not found:
+                missing += 1
+                self.logger.debug(f"IP {ip_address} not found in any temporary ipset")
+
+        self.ipset.restore(lines)
+        return {'removed': len(lines), 'missing': missing}
+
+    def restore_escalated(self, ip_addresses: List[str], now: Optional[int] = None) -> int:
+        """
+        Put back the unexpired members of escalated prefixes
+
+        Members are added to the blacklist and the ipsets while the
+        prefix is still blocked, so the addresses stay blocked throughout.
+        Daemon strike blocks counted into the prefix are skipped: the
+        daemon still holds them itself.
+
+        Args:
+            ip_addresses: IP addresses / CIDR ranges about to be released
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Number of member blocks restored
+        """
+        if now is None:
+            now = int(time.time())
+
+        members: List[Dict[str, Any]] = []
+        for ip_address in ip_addresses:
+            entry = self.ip_manager.get_blacklist_entry(ip_address)
+            if entry is not None and entry.get(MEMBERS_KEY):
+                members.extend(
+                    member for member in active_members(entry, now)
+                    if member.get('source') != DAEMON_SOURCE
+                )
+        if not members:
+            return 0
+
+        self.ip_manager.bulk_add(members, target='blacklist')
+        self.synchronizer.apply_changes(members, [], now)
+        self.logger.info(f"Restored {len(members)} blocks from expired escalated prefixes")
+        return len(members)
+
+    def release(self, ip_addresses: List[str], export: bool = True, now: Optional[int] = None) -> Dict[str, int]:
+        """
+        Unjail addresses: remove from temporary ipsets, then blacklist
+
+        Firewall first: if ipset fails the blacklist still lists the IPs
+        and the next run retries. Members of escalated prefixes that have
+        not expired yet are restored first.
+
+        Args:
+            ip_addresses: IP addresses / CIDR ranges
+            export: Rewrite the flat blacklist file afterwards (otherwise
+                the change stays in the journal / database)
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Counts: {'removed', 'missing'} for the ipsets and 'restored'
+        """
+        restored = self.restore_escalated(ip_addresses, now)
+        released = self.release_from_ipsets(ip_addresses)
+        self.ip_manager.bulk_remove(ip_addresses, target='blacklist')
+        if export:
+            self.ip_manager.export_flat_files()
+        return {**released, 'restored': restored}
+
+    def run(self, now: Optional[int] = None) -> Dict[str, int]:
+        """
+        Release all expired temporary blocks
+
+        Args:
+            now: Epoch seconds (default: current time)
+
+        Returns:
+            Counts: {'expired', 'kept', 'permanent', 'ipset_removed',
+            'ipset_missing', 'restored', 'escalated'}
+        """
+        if now is None:
+            now = int(time.time())
+        result = self.find_expired(now)
+        expired = [entry['ip_address'] for entry in result['expired']]
+        stats = {
+            'expired': len(expired),
+            'kept': result['kept'],
+            'permanent': result['permanent'],
+            'ipset_removed': 0,
+            'ipset_missing': 0,
+            'restored': 0,
+            'escalated': 0,
+        }
+
+        if expired:
+            for entry in result['expired']:
+                self.logger.debug(
+                    f"Expired: {entry['ip_address']} (blocked at {entry.get('timestamp')}, "
+                    f"lockout {entry.get('lockout_period')}m)"
+                )
+
+            released = self.release(expired, now=now)
+            stats['ipset_removed'] = released['removed']
+            stats['ipset_missing'] = released['missing']
+            stats['restored'] = released['restored']
+
+            self.logger.info(
+                f"Unjailed {stats['expired']} IPs ({stats['kept']} temporary kept, "
+                f"{stats['permanent']} permanent)"
+            )
+
+        if self.escalator is not None:
+            stats['escalated'] = self.escalator.escalate(now)['escalated']
+
+        return stats
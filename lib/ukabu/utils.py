@@ -13,11 +13,13 @@ import sys
 import json
 import logging
 import shutil
+import fcntl
 import secrets
 import ipaddress
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 
 # Configuration paths
 UKABU_CONFIG_DIR = Path("/etc/ukabu/config")
@@ -32,11 +34,17 @@ NGINX_SITES_ENABLED = Path("/etc/nginx/sites-enabled")
 DOMAINS_CONFIG = UKABU_CONFIG_DIR / "domains.json"
 IP_WHITELIST = UKABU_CONFIG_DIR / "ip_whitelist.conf"
 IP_BLACKLIST = UKABU_CONFIG_DIR / "ip_blacklist.conf"
+IP_LISTS_DB = UKABU_LIB_DIR / "iplists.db"
+IP_BLACKLIST_COLUMNS = UKABU_LIB_DIR / "ip_blacklist.columns"
+IP_WHITELIST_GEO = UKABU_CONFIG_DIR / "ip_whitelist_generated.conf"
+IP_BLACKLIST_GEO = UKABU_CONFIG_DIR / "ip_blacklist_generated.conf"
+IPSET_SYNC_STATE = UKABU_LIB_DIR / "ipset_sync.json"
 PATH_WHITELIST = UKABU_CONFIG_DIR / "path_whitelist.conf"
 PATH_BLACKLIST = UKABU_CONFIG_DIR / "path_blacklist.conf"
 
-# Daemon socket
+# Daemon socket and database (go-daemon -db)
 DAEMON_SOCKET = "/var/run/ukabu-trackerd.sock"
+DAEMON_DB = UKABU_LIB_DIR / "strikes.db"
 
 # Audit log
 AUDIT_LOG = UKABU_LOG_DIR / "manager.log"
@@ -83,6 +91,16 @@ def setup_logging(verbose: bool = False, audit: bool = True) -> logging.Logger:
     return logger
 
 
+def log_action(message: str) -> None:
+    """
+    Record an administrative action (audit log when logging is set up)
+    
+    Args:
+        message: Description of the action
+    """
+    logging.getLogger('ukabu-manager').info(message)
+
+
 def validate_ip(ip_str: str) -> Tuple[bool, Optional[str]]:
     """
     Validate IP address or CIDR range
@@ -257,6 +275,33 @@ def save_line_file(filepath: Path, lines: List[str], backup: bool = True) -> Non
         raise RuntimeError(f"Failed to save {filepath}: {e}")
 
 
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[int]:
+    """
+    Hold an exclusive fcntl lock on a lock file
+    
+    The lock belongs to the open file, so it also excludes other
+    threads of the same process that take it, and is released if the
+    holder dies.
+    
+    Args:
+        lock_path: Lock file (created if missing)
+    
+    Yields:
+        File descriptor of the lock file (usable for small state)
+    """
+    lock_path.parent.mkdir(parents=True, exist_ok=True, mode=0o755)
+    try:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    except PermissionError:
+        raise PermissionError(f"Cannot open {lock_path} - insufficient permissions")
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield fd
+    finally:
+        os.close(fd)
+
+
 def confirm_action(prompt: str, default: bool = False) -> bool:
     """
     Prompt user for confirmation
@@ -310,6 +355,33 @@ def parse_iso_timestamp(timestamp_str: str) -> datetime:
     return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
 
 
+def get_expiry_epoch(entry: Dict[str, Any]) -> Optional[int]:
+    """
+    Get expiry time of a blacklist entry
+    
+    Args:
+        entry: Blacklist entry (timestamp, lockout_period in minutes)
+    
+    Returns:
+        Expiry as epoch seconds, or None for permanent entries and
+        entries without a parseable timestamp
+    """
+    try:
+        lockout = int(entry.get('lockout_period', 0) or 0)
+    except (TypeError, ValueError):
+        return None
+    if lockout <= 0:
+        return None
+    
+    try:
+        blocked = parse_iso_timestamp(str(entry.get('timestamp', '')))
+    except ValueError:
+        return None
+    if blocked.tzinfo is None:
+        blocked = blocked.replace(tzinfo=timezone.utc)
+    return int(blocked.timestamp()) + lockout * 60
+
+
 def is_secret_expired(timestamp_str: str, grace_hours: int = 12) -> bool:
     """
     Check if a secret has expired based on grace period
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+ukabu-daemon-bench.py - Round-trip microbenchmark for DaemonClient
+
+Compares command throughput of:
+1. One connection per command (the previous client behaviour)
+2. One persistent connection, one command per round trip
+3. One persistent connection, commands pipelined in batches
+4. One persistent connection, commands sent as batch frames
+
+By default a stand-in daemon (ukabu.standin) is started on a temporary
+socket, so the numbers measure the client and the socket
+round trip rather than the daemon's work. Use --socket to run against a
+live daemon instead.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'lib'))
+sys.path.insert(0, '/usr/local/lib')
+
+from ukabu.daemon import DaemonClient
+from ukabu.standin import StandinDaemon
+
+
+def bench_per_call(client, count):
+    """Run `count` pings, one round trip each."""
+    start = time.perf_counter()
+    for _ in range(count):
+        client.ping()
+    return time.perf_counter() - start
+
+
+def bench_pipelined(client, count, batch):
+    """Run `count` pings pipelined in batches of `batch`."""
+    commands = [{'action': 'ping'}] * batch
+    start = time.perf_counter()
+    done = 0
+    while done < count:
+        chunk = min(batch, count - done)
+        responses = client.pipeline(commands[:chunk])
+        assert all(r.get('status') == 'ok' for r in responses)
+        done += chunk
+    return time.perf_counter() - start
+
+
+def bench_batched(client, count, batch):
+    """Run `count` pings as batch frames of `batch` commands."""
+    commands = [{'action': 'ping'}] * count
+    start = time.perf_counter()
+    responses = client.batch(commands, chunk_size=batch)
+    assert len(responses) == count and all(r.get('status') == 'ok' for r in responses)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DaemonClient round-trip microbenchmark')
+    parser.add_argument('--socket', help='Daemon socket (default: start a stand-in daemon)')
+    parser.add_argument('--count', type=int, default=20000, help='Commands per run (default: 20000)')
+    parser.add_argument('--batch', type=int, default=64, help='Pipeline batch size (default: 64)')
+    parser.add_argument('--frame', type=int, default=500, help='Commands per batch frame (default: 500)')
+    args = parser.parse_args()
+
+    tmpdir = None
+    server = None
+    socket_path = args.socket
+    if socket_path is None:
+        tmpdir = tempfile.mkdtemp(prefix='ukabu-bench-')
+        socket_path = os.path.join(tmpdir, 'trackerd.sock')
+        server = StandinDaemon(socket_path)
+        server.start()
+
+    try:
+        one_shot = DaemonClient(socket_path, persistent=False)
+        persistent = DaemonClient(socket_path)
+
+        runs = [
+            ('connect per command', bench_per_call(one_shot, args.count)),
+            ('persistent connection', bench_per_call(persistent, args.count)),
+            (f'pipelined (batch {args.batch})', bench_pipelined(persistent, args.count, args.batch)),
+            (f'batch frames ({args.frame})', bench_batched(persistent, args.count, args.frame)),
+        ]
+        persistent.close()
+
+        baseline = runs[0][1]
+        print(f"{args.count} ping commands against {'stand-in daemon' if server else socket_path}")
+        for name, elapsed in runs:
+            print(f"  {name:<24} {args.count / elapsed:>10.0f} cmd/s "
+                  f"{elapsed / args.count * 1e6:>8.1f} us/cmd  x{baseline / elapsed:.1f}")
+    finally:
+        if server is not None:
+            server.stop()
+            os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -42,11 +42,11 @@ main() {
         return 1
     fi
     
-    # Extract IPv4 prefixes
-    local count=$(jq -r '.prefixes[] | select(.ipv4Prefix) | .ipv4Prefix' "$TEMP_FILE" | wc -l)
+    # Extract IPv4 and IPv6 prefixes
+    local count=$(jq -r '.prefixes[] | (.ipv4Prefix // .ipv6Prefix // empty)' "$TEMP_FILE" | wc -l)
     
     if [ "$count" -eq 0 ]; then
-        log "âœ— No IPv4 ranges found in response"
+        log "âœ— No IP ranges found in response"
         return 1
     fi
     
@@ -58,12 +58,22 @@ main() {
         echo "# Last update: $(date -Iseconds) ($count ranges fetched)"
         echo ""
         jq -r '.prefixes[] | select(.ipv4Prefix) | .ipv4Prefix' "$TEMP_FILE"
+        jq -r '.prefixes[] | select(.ipv6Prefix) | .ipv6Prefix' "$TEMP_FILE"
     } > "$OUTPUT_FILE"
     
     log "âœ“ Updated $count Google IP ranges"
     
     # Regenerate nginx config to update geo map
     if command -v ukabu-manager &> /dev/null; then
+        log "Compiling search engine lists..."
+        
+        # $is_search_engine geo include and the ukabu-search-engines ipsets
+        if ukabu-manager nginx compile-search-engines >> "$LOG_FILE" 2>&1; then
+            log "âœ“ Search engine lists compiled"
+        else
+            log "âœ— Search engine list compilation failed"
+        fi
+        
         log "Regenerating nginx config..."
         
         if ukabu-manager nginx generate-config >> "$LOG_FILE" 2>&1; then
@@ -11,6 +11,7 @@ IPSET_PERMANENT="ukabu-permanent"
 IPSET_TEMP_PREFIX="ukabu-temporary"
 MAX_TEMP_SETS=10
 MAX_ELEMENTS=10000
+SEARCH_ENGINES_IPSET="/var/lib/ukabu/search_engines.ipset"
 
 # Colors for output
 RED='\033[0;31m'
@@ -98,6 +99,13 @@ main() {
     create_ipset "ukabu-whitelist" 10000
     log_info "Created IPSet 'ukabu-whitelist' (for exempt IPs)"
     
+    # Search engine sets, as last compiled by
+    # `ukabu-manager nginx compile-search-engines`
+    if [ -f "$SEARCH_ENGINES_IPSET" ]; then
+        grep -v '^#' "$SEARCH_ENGINES_IPSET" | ipset restore -exist
+        log_info "Loaded IPSet 'ukabu-search-engines' from $SEARCH_ENGINES_IPSET"
+    fi
+    
     log_info "IPSet initialization complete!"
     log_info "Created sets:"
     echo "  - $IPSET_PERMANENT (permanent blocks)"
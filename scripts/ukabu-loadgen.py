@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+ukabu-loadgen.py - Load generator for the ukabu-trackerd socket
+
+Drives N concurrent clients against a Unix socket. Each client keeps one
+connection and sends one message at a time (closed loop), so the number
+of clients is the number of requests in flight. Reports throughput and
+p50/p99/p99.9 latency.
+
+Protocols:
+1. nginx   - {"type": "failure"|"success", ...} messages as sent by the
+             nginx njs module (the Go daemon's socket protocol)
+2. manager - {"action": ...} commands as sent by DaemonClient
+
+Without --socket, a stand-in daemon (ukabu.standin) is started in a
+separate process on a temporary socket.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'lib'))
+sys.path.insert(0, '/usr/local/lib')
+
+from ukabu.standin import StandinDaemon
+
+FAILURE_REASONS = ('invalid_solution', 'timeout', 'hmac_failed')
+MANAGER_ACTIONS = ('ping', 'strikes', 'stats', 'flush', 'block', 'unblock')
+
+
+def random_ip(rng, pool):
+    """Pick one of `pool` addresses in 10.0.0.0/8."""
+    n = rng.randrange(pool)
+    return f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def make_message(args, rng):
+    """Build the next message for the chosen protocol."""
+    ip_address = random_ip(rng, args.ips)
+    if args.protocol == 'nginx':
+        failure = rng.random() < args.failure_ratio
+        message = {
+            'type': 'failure' if failure else 'success',
+            'ip': ip_address,
+            'domain': rng.choice(args.domains),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        }
+        if failure:
+            message['reason'] = rng.choice(FAILURE_REASONS)
+        return message
+
+    command = {'action': args.action}
+    if args.action in ('strikes', 'flush', 'block', 'unblock'):
+        command['ip'] = ip_address
+    if args.action == 'block':
+        command['duration'] = 60
+    return command
+
+
+def is_error(response):
+    """Tell whether a response of either shape reports an error."""
+    return response.get('status') == 'error' or bool(response.get('message'))
+
+
+async def run_client(args, seed, deadline, latencies, counters):
+    """One closed-loop client: send, wait for the answer, repeat."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_unix_connection(args.socket, limit=16 * 1024 * 1024)
+    loop = asyncio.get_running_loop()
+    try:
+        while loop.time() < deadline and (args.requests is None or counters['sent'] < args.requests):
+            counters['sent'] += 1
+            payload = json.dumps(make_message(args, rng)).encode('utf-8') + b'\n'
+            start = time.perf_counter()
+            writer.write(payload)
+            line = await reader.readline()
+            latencies.append(time.perf_counter() - start)
+            if not line.endswith(b'\n'):
+                counters['disconnects'] += 1
+                return
+            if is_error(json.loads(line)):
+                counters['errors'] += 1
+    finally:
+        writer.close()
+
+
+async def run_clients(args, clients, seed):
+    """Run `clients` concurrent clients until the deadline."""
+    latencies = array('d')
+    counters = {'sent': 0, 'errors': 0, 'disconnects': 0}
+    deadline = asyncio.get_running_loop().time() + args.duration
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_client(args, seed * 100003 + i, deadline, latencies, counters) for i in range(clients)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+    failures = [r for r in results if isinstance(r, BaseException)]
+    counters['connect_failures'] = len(failures)
+    if failures and len(failures) == len(results):
+        raise failures[0]
+    return latencies, counters, elapsed
+
+
+def worker(args, clients, seed, queue):
+    """Process entry point: run clients and send the samples back."""
+    try:
+        latencies, counters, elapsed = asyncio.run(run_clients(args, clients, seed))
+        queue.put((latencies.tobytes(), counters, elapsed, None))
+    except Exception as e:
+        queue.put((b'', {}, 0.0, f"{type(e).__name__}: {e}"))
+
+
+def serve_standin(socket_path, ready):
+    """Process entry point: run a stand-in daemon until terminated."""
+    daemon = StandinDaemon(socket_path)
+    daemon.start()
+    ready.set()
+    while True:
+        time.sleep(3600)
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of sorted samples."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for the ukabu-trackerd socket')
+    parser.add_argument('--socket', help='Daemon socket (default: start a stand-in daemon)')
+    parser.add_argument('--protocol', choices=('nginx', 'manager'), default='nginx',
+                        help='Message shape (default: nginx)')
+    parser.add_argument('--action', choices=MANAGER_ACTIONS, default='ping',
+                        help='Command for --protocol manager (default: ping)')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients (default: 16)')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Processes the clients are spread over (default: 1)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (default: 10)')
+    parser.add_argument('--requests', type=int, help='Stop each process after this many requests')
+    parser.add_argument('--ips', type=int, default=65536, help='Distinct client IPs (default: 65536)')
+    parser.add_argument('--domains', default='example.com', help='Comma-separated domains (default: example.com)')
+    parser.add_argument('--failure-ratio', type=float, default=0.5,
+                        help='Share of nginx messages that are failures (default: 0.5)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+    args.domains = [d for d in args.domains.split(',') if d]
+    args.processes = max(1, min(args.processes, args.clients))
+
+    tmpdir = None
+    server = None
+    if args.socket is None:
+        tmpdir = tempfile.mkdtemp(prefix='ukabu-loadgen-')
+        args.socket = os.path.join(tmpdir, 'trackerd.sock')
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve_standin, args=(args.socket, ready), daemon=True)
+        server.start()
+        ready.wait(10)
+
+    try:
+        queue = multiprocessing.Queue()
+        share, extra = divmod(args.clients, args.processes)
+        workers = [
+            multiprocessing.Process(target=worker, args=(args, share + (i < extra), i + 1, queue))
+            for i in range(args.processes)
+        ]
+        for process in workers:
+            process.start()
+
+        samples = array('d')
+        counters = {'sent': 0, 'errors': 0, 'disconnects': 0, 'connect_failures': 0}
+        elapsed = 0.0
+        problems = []
+        for _ in workers:
+            data, worker_counters, worker_elapsed, problem = queue.get()
+            if problem:
+                problems.append(problem)
+                continue
+            samples.frombytes(data)
+            for key, value in worker_counters.items():
+                counters[key] += value
+            elapsed = max(elapsed, worker_elapsed)
+        for process in workers:
+            process.join()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+            if os.path.exists(args.socket):
+                os.unlink(args.socket)
+            os.rmdir(tmpdir)
+
+    if problems and not samples:
+        print(f"Load generator failed: {problems[0]}", file=sys.stderr)
+        sys.exit(2)
+
+    ordered = sorted(samples)
+    report = {
+        'socket': 'stand-in daemon' if server is not None else args.socket,
+        'protocol': args.protocol if args.protocol == 'nginx' else f"manager:{args.action}",
+        'clients': args.clients,
+        'processes': args.processes,
+        'seconds': round(elapsed, 3),
+        'requests': len(ordered),
+        'errors': counters['errors'],
+        'disconnects': counters['disconnects'],
+        'connect_failures': counters['connect_failures'],
+        'ops_per_second': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(sum(ordered) / len(ordered) * 1e3, 3) if ordered else 0.0,
+            'p50': round(percentile(ordered, 0.50) * 1e3, 3),
+            'p99': round(percentile(ordered, 0.99) * 1e3, 3),
+            'p999': round(percentile(ordered, 0.999) * 1e3, 3),
+            'max': round(ordered[-1] * 1e3, 3) if ordered else 0.0,
+        },
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    latency = report['latency_ms']
+    print(f"{report['protocol']} messages, {args.clients} clients in {args.processes} processes, "
+          f"{report['seconds']:.1f}s against {report['socket']}")
+    print(f"  requests   {report['requests']:>10}  ({report['errors']} errors, "
+          f"{report['disconnects']} disconnects, {report['connect_failures']} connect failures)")
+    print(f"  throughput {report['ops_per_second']:>10.0f} ops/s")
+    print(f"  latency    p50 {latency['p50']:.3f} ms  p99 {latency['p99']:.3f} ms  "
+          f"p99.9 {latency['p999']:.3f} ms  max {latency['max']:.3f} ms")
+    for problem in problems:
+        print(f"  worker failed: {problem}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,15 +10,36 @@ ukabu-verify-bing.py - Verify Bing bot via reverse DNS
 Performs 2-step verification:
 1. Reverse DNS: IP -> hostname
 2. Verify hostname ends with .search.msn.com
-3. Forward DNS: hostname -> IP
-4. Verify IP matches original
+3. Forward DNS: hostname -> IPs (all A/AAAA records)
+4. Verify original IP is among the forward addresses
+
+Batch mode (--batch FILE, or - for stdin) verifies one IP per line
+concurrently and prints one result per line.
 """
 
 import sys
 import socket
 import json
+import argparse
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+
+def normalize_ip(ip_address):
+    """Canonical text form of an IP address (for IPv6 comparisons)."""
+    try:
+        return str(ipaddress.ip_address(ip_address))
+    except ValueError:
+        return ip_address
+
+
+def forward_lookup(hostname):
+    """Resolve hostname to all of its IPv4 and IPv6 addresses."""
+    infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
 def verify_bing_ip(ip_address, verbose=False):
     """
     Verify if IP belongs to Bing bot.
@@ -56,17 +77,17 @@ def verify_bing_ip(ip_address, verbose=False):
         if verbose:
             print(f"  Step 3: Forward DNS lookup...")
         
-        forward_ip = socket.gethostbyname(hostname)
+        forward_ips = forward_lookup(hostname)
         
         if verbose:
-            print(f"    â†’ {forward_ip}")
+            print(f"    â†’ {', '.join(forward_ips)}")
         
-        # Step 4: Verify IP matches
-        if forward_ip != ip_address:
+        # Step 4: Verify IP is among the forward addresses
+        if normalize_ip(ip_address) not in {normalize_ip(ip) for ip in forward_ips}:
             if verbose:
                 print(f"  Step 4: IP verification FAILED")
                 print(f"    Expected: {ip_address}")
-                print(f"    Got: {forward_ip}")
+                print(f"    Got: {', '.join(forward_ips)}")
             return False
         
         if verbose:
@@ -84,27 +105,81 @@ def verify_bing_ip(ip_address, verbose=False):
             print(f"  Verification failed: {e}")
         return False
 
+def make_result(ip_address, verified):
+    """Build JSON result record for one IP."""
+    return {
+        'ip': ip_address,
+        'engine': 'Bing' if verified else None,
+        'verified': verified,
+        'method': 'reverse_dns',
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def read_batch(source):
+    """Read unique IPs (one per line) from a file or '-' for stdin."""
+    stream = sys.stdin if source == '-' else open(source, 'r')
+    try:
+        ips = []
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                ips.append(line)
+        return list(dict.fromkeys(ips))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def run_batch(source, concurrency, json_output):
+    """Verify a batch of IPs concurrently; returns number verified."""
+    ips = read_batch(source)
+    verified_count = 0
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for ip_address, verified in zip(ips, pool.map(verify_bing_ip, ips)):
+            if verified:
+                verified_count += 1
+            if json_output:
+                print(json.dumps(make_result(ip_address, verified)))
+            elif verified:
+                print(f"âœ“ {ip_address} verified as Bing bot")
+            else:
+                print(f"âœ— {ip_address} not verified as Bing bot")
+    
+    return verified_count
+
+
 def main():
     """Main entry point."""
-    if len(sys.argv) < 2:
-        print("Usage: ukabu-verify-bing.py <ip_address> [--verbose] [--json]")
+    parser = argparse.ArgumentParser(
+        usage="ukabu-verify-bing.py <ip_address> [--verbose] [--json]\n"
+              "       ukabu-verify-bing.py --batch <file|-> [--concurrency N] [--json]"
+    )
+    parser.add_argument('ip_address', nargs='?')
+    parser.add_argument('--verbose', '-v', action='store_true')
+    parser.add_argument('--json', action='store_true', dest='json_output')
+    parser.add_argument('--batch', metavar='FILE', help="Read IPs from FILE ('-' for stdin)")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='Parallel DNS checks in batch mode (default: 16)')
+    args = parser.parse_args()
+    
+    if args.batch:
+        verified_count = run_batch(args.batch, args.concurrency, args.json_output)
+        sys.exit(0 if verified_count else 1)
+    
+    if not args.ip_address:
+        parser.print_usage()
         sys.exit(1)
     
-    ip_address = sys.argv[1]
-    verbose = '--verbose' in sys.argv or '-v' in sys.argv
-    json_output = '--json' in sys.argv
+    ip_address = args.ip_address
+    verbose = args.verbose
+    json_output = args.json_output
     
     verified = verify_bing_ip(ip_address, verbose=verbose and not json_output)
     
     if json_output:
-        result = {
-            'ip': ip_address,
-            'engine': 'Bing' if verified else None,
-            'verified': verified,
-            'method': 'reverse_dns',
-            'timestamp': datetime.now().isoformat()
-        }
-        print(json.dumps(result, indent=2))
+        print(json.dumps(make_result(ip_address, verified), indent=2))
     elif not verbose:
         if verified:
             print(f"âœ“ {ip_address} verified as Bing bot")
@@ -0,0 +1,91 @@
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""Shared fixtures; makes the in-tree ukabu package importable"""
+
+import sys
+import json
+import types
+import logging
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(TESTS_DIR.parent / 'lib'))
+
+from ukabu import ipmanager  # noqa: E402
+from ukabu.ipmanager import IPManager  # noqa: E402
+from ukabu.utils import setup_logging  # noqa: E402
+
+
+class FakeIPSet:
+    """Handle on the JSON state of tests/fake_ipset.py"""
+
+    binary = str(TESTS_DIR / 'fake_ipset.py')
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {'sets': {}, 'calls': []}
+
+    def create(self, name, options='maxelem 20000', members=()):
+        """Create a set; members are IPs or (IP, timeout) pairs"""
+        state = self._read()
+        info = {'type': 'hash:net', 'options': options.split(), 'members': {}}
+        for member in members:
+            ip_address, timeout = member if isinstance(member, tuple) else (member, None)
+            info['members'][ip_address] = timeout
+        state['sets'][name] = info
+        self.path.write_text(json.dumps(state))
+
+    def members(self, name):
+        """Members of a set as {member: timeout}, None if the set is missing"""
+        info = self._read()['sets'].get(name)
+        return None if info is None else info['members']
+
+    def sets(self):
+        return self._read()['sets']
+
+    @property
+    def calls(self):
+        return self._read()['calls']
+
+
+@pytest.fixture
+def fake_ipset(tmp_path, monkeypatch):
+    path = tmp_path / 'ipset.json'
+    monkeypatch.setenv('FAKE_IPSET_STATE', str(path))
+    return FakeIPSet(path)
+
+
+@pytest.fixture
+def ip_manager(tmp_path):
+    """File-backed IPManager whose lists live in tmp_path"""
+    manager = IPManager()
+    manager.whitelist_path = tmp_path / 'ip_whitelist.conf'
+    manager.blacklist_path = tmp_path / 'ip_blacklist.conf'
+    manager.columns_cache_path = tmp_path / 'ip_blacklist.columns'
+    return manager
+
+
+@pytest.fixture
+def cli(ip_manager, tmp_path, monkeypatch):
+    """bin/ukabu-manager as a module; commands use ip_manager and tmp_path"""
+    loader = SourceFileLoader('ukabu_manager', str(TESTS_DIR.parent / 'bin' / 'ukabu-manager'))
+    module = types.ModuleType(loader.name)
+    loader.exec_module(module)
+    monkeypatch.setattr(module, 'setup_logging',
+                        lambda verbose=False, audit=True: setup_logging(verbose, audit=False))
+    monkeypatch.setattr(module, 'IPManager', lambda **kwargs: ip_manager)
+    monkeypatch.setattr(ipmanager, 'IP_WHITELIST_GEO', tmp_path / 'ip_whitelist_generated.conf')
+    monkeypatch.setattr(ipmanager, 'IP_BLACKLIST_GEO', tmp_path / 'ip_blacklist_generated.conf')
+    yield module
+    logging.getLogger('ukabu-manager').handlers.clear()
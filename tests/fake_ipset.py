@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""
+Stand-in for the ipset binary, keeping its sets in a JSON file
+
+Supports what IPSetClient uses: `list -n`, `list -t`, `save [SET]` and
+`restore [-exist]` with create/add/del/swap/destroy/flush lines. Like
+ipset, restore applies lines in order and stops at the first error.
+Every invocation is appended to the state's "calls" list.
+
+State file: $FAKE_IPSET_STATE
+    {"sets": {name: {"type", "options", "members": {member: timeout}}},
+     "calls": [[arg, ...], ...]}
+"""
+
+import os
+import sys
+import json
+import ipaddress
+
+
+class IPSetError(Exception):
+    pass
+
+
+def member_form(value):
+    """Print hosts without /32 or /128, like ipset"""
+    try:
+        network = ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        raise IPSetError(f"Syntax error: '{value}' is not a valid IP address")
+    if network.prefixlen == network.max_prefixlen:
+        return str(network.network_address)
+    return str(network)
+
+
+def option(options, name, default=None):
+    if name in options:
+        i = options.index(name)
+        if i + 1 < len(options):
+            return options[i + 1]
+    return default
+
+
+def has_timeout(info):
+    return 'timeout' in info['options']
+
+
+def run_line(sets, parts, exist):
+    command = parts[0]
+    if command == 'create':
+        name, set_type, options = parts[1], parts[2], parts[3:]
+        if name in sets:
+            if exist:
+                return
+            raise IPSetError(f"Set cannot be created: set with the same name already exists")
+        sets[name] = {'type': set_type, 'options': options, 'members': {}}
+        return
+
+    name = parts[1]
+    if name not in sets:
+        raise IPSetError(f"The set with the given name does not exist")
+    info = sets[name]
+
+    if command == 'add':
+        member = member_form(parts[2])
+        timeout = option(parts[3:], 'timeout')
+        if timeout is not None and not has_timeout(info):
+            raise IPSetError("Kernel error received: Unknown option 'timeout'")
+        if member in info['members']:
+            if exist:
+                return
+            raise IPSetError("Element cannot be added to the set: it's already added")
+        if len(info['members']) >= int(option(info['options'], 'maxelem', 65536)):
+            raise IPSetError("Hash is full, cannot add more elements")
+        if has_timeout(info):
+            default = int(option(info['options'], 'timeout', 0))
+            info['members'][member] = int(timeout) if timeout is not None else default
+        else:
+            info['members'][member] = None
+    elif command == 'del':
+        member = member_form(parts[2])
+        if member not in info['members']:
+            if exist:
+                return
+            raise IPSetError("Element cannot be deleted from the set: it's not added")
+        del info['members'][member]
+    elif command == 'swap':
+        other = parts[2]
+        if other not in sets:
+            raise IPSetError(f"The set with the given name does not exist")
+        sets[name], sets[other] = sets[other], sets[name]
+    elif command == 'destroy':
+        del sets[name]
+    elif command == 'flush':
+        info['members'].clear()
+    else:
+        raise IPSetError(f"Unknown command {command}")
+
+
+def save_lines(sets, names):
+    for name in names:
+        info = sets[name]
+        yield ' '.join(['create', name, info['type']] + info['options'])
+        for member, timeout in info['members'].items():
+            if timeout is None:
+                yield f"add {name} {member}"
+            else:
+                yield f"add {name} {member} timeout {timeout}"
+
+
+def main(argv):
+    path = os.environ['FAKE_IPSET_STATE']
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = {'sets': {}, 'calls': []}
+    state.setdefault('calls', []).append(argv)
+    sets = state.setdefault('sets', {})
+
+    status = 0
+    try:
+        if argv[:2] == ['list', '-n']:
+            print('\n'.join(sets))
+        elif argv[:2] == ['list', '-t']:
+            for name, info in sets.items():
+                print(f"Name: {name}\nType: {info['type']}\nRevision: 7\n"
+                      f"Header: {' '.join(info['options'])}\nReferences: 0\n")
+        elif argv[0] == 'save':
+            names = argv[1:] or list(sets)
+            for name in names:
+                if name not in sets:
+                    raise IPSetError(f"The set with the given name does not exist")
+            print('\n'.join(save_lines(sets, names)))
+        elif argv[0] == 'restore':
+            exist = '-exist' in argv
+            for lineno, line in enumerate(sys.stdin.read().splitlines(), 1):
+                parts = line.split()
+                if not parts or parts[0] == 'COMMIT':
+                    continue
+                try:
+                    run_line(sets, parts, exist)
+                except IPSetError as e:
+                    raise IPSetError(f"Error in line {lineno}: {e}")
+        else:
+            raise IPSetError(f"Unsupported command: {' '.join(argv)}")
+    except IPSetError as e:
+        print(f"ipset v7.15: {e}", file=sys.stderr)
+        status = 1
+
+    with open(path, 'w') as f:
+        json.dump(state, f)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,97 @@
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""DaemonClient batching and `unblock --from-file` against the stand-in daemon"""
+
+import pytest
+from click.testing import CliRunner
+
+from ukabu.daemon import DaemonClient, BATCH_SIZE
+from ukabu.standin import StandinDaemon
+
+
+def ips(count, prefix='10.0'):
+    return [f"{prefix}.{i // 256}.{i % 256}" for i in range(count)]
+
+
+@pytest.fixture
+def standin(tmp_path):
+    daemon = StandinDaemon(str(tmp_path / 'trackerd.sock'))
+    daemon.frames = []
+    handle_command = daemon.handle_command
+
+    def record(command):
+        # Sizes of the batch frames the daemon received
+        if command.get('action') == 'batch':
+            daemon.frames.append(len(command.get('commands') or []))
+        return handle_command(command)
+
+    daemon.handle_command = record
+    with daemon:
+        yield daemon
+
+
+@pytest.fixture
+def client(standin):
+    with DaemonClient(standin.socket_path) as client:
+        yield client
+
+
+def test_batch_splits_into_frames(standin, client):
+    addresses = ips(2 * BATCH_SIZE + 200)
+
+    failed = client.add_blocks(addresses, 60, 'test')
+
+    assert failed == {ip: None for ip in addresses}
+    assert standin.frames == [BATCH_SIZE, BATCH_SIZE, 200]
+    assert len(standin.blocks) == len(addresses)
+
+
+def test_batch_maps_errors_per_ip(standin, client):
+    client.add_blocks(['192.0.2.1', '192.0.2.3'], 60)
+
+    failed = client.remove_blocks(['192.0.2.1', '192.0.2.2', '192.0.2.3', '192.0.2.1'])
+
+    assert failed == {'192.0.2.1': None, '192.0.2.2': '192.0.2.2 is not blocked', '192.0.2.3': None}
+    assert standin.blocks == {}
+
+
+def test_batch_falls_back_to_single_commands(standin, client):
+    handle_command = standin.handle_command
+
+    def no_batches(command):
+        if command.get('action') == 'batch':
+            handle_command(command)
+            return {'status': 'error', 'message': 'unknown action: batch'}
+        return handle_command(command)
+
+    standin.handle_command = no_batches
+    addresses = ips(BATCH_SIZE + 10)
+
+    assert client.add_blocks(addresses, 60) == {ip: None for ip in addresses}
+    assert client.remove_blocks(['192.0.2.9']) == {'192.0.2.9': '192.0.2.9 is not blocked'}
+
+    # Both frames of the first call went out pipelined; later calls skip frames
+    assert standin.frames == [BATCH_SIZE, 10]
+    assert len(standin.blocks) == len(addresses)
+
+
+def test_unblock_from_file(cli, standin, ip_manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'DaemonClient', lambda: DaemonClient(standin.socket_path))
+    blocked = ips(BATCH_SIZE + 5, prefix='10.1')
+    DaemonClient(standin.socket_path).add_blocks(blocked, 60)
+    ip_manager.bulk_add(blocked[:3], target='blacklist', duration=60)
+    source = tmp_path / 'unblock.txt'
+    source.write_text('\n'.join(blocked + ['192.0.2.7', 'not-an-ip']) + '\n')
+
+    result = CliRunner().invoke(cli.cli, ['--verbose', 'unblock', '--from-file', str(source)])
+
+    assert result.exit_code == 0, result.output
+    assert standin.blocks == {}
+    assert ip_manager.get_blacklist() == []
+    assert 'Skipping 1 invalid entries' in result.output
+    assert 'Removed 3 IPs from blacklist' in result.output
+    assert f"Removed {len(blocked)} IPs from ipset (1 failed)" in result.output
+    assert 'Could not remove from ipset for 192.0.2.7: 192.0.2.7 is not blocked' in result.output
@@ -0,0 +1,75 @@
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""Subnet escalation with daemon blocks in the ipsets"""
+
+import time
+
+import pytest
+
+from ukabu.escalation import SubnetEscalator, MEMBERS_KEY, DAEMON_SOURCE
+from ukabu.ipset import IPSetClient
+from ukabu.ipsync import IPSetSynchronizer
+from ukabu.unjail import UnjailEngine
+
+from test_ipsync import make_daemon_db, PERMANENT, TEMPORARY
+
+DAEMON_IPS = ['198.51.100.1', '198.51.100.2', '198.51.100.3']
+LISTED_IPS = ['198.51.100.10', '198.51.100.11', '198.51.100.12']
+
+
+@pytest.fixture
+def setup(fake_ipset, ip_manager, tmp_path):
+    make_daemon_db(tmp_path / 'strikes.db', [
+        (ip_address, '2099-01-01 00:00:00+00:00', TEMPORARY) for ip_address in DAEMON_IPS
+    ] + [('203.0.113.7', None, PERMANENT)])
+    fake_ipset.create(PERMANENT, members=['203.0.113.7'])
+    fake_ipset.create(TEMPORARY, members=DAEMON_IPS)
+    client = IPSetClient(binary=fake_ipset.binary)
+    synchronizer = IPSetSynchronizer(
+        ip_manager, client,
+        state_path=tmp_path / 'ipset_sync.json', daemon_db=tmp_path / 'strikes.db'
+    )
+    for ip_address in LISTED_IPS:
+        ip_manager.add_to_blacklist(ip_address, 60, 'test')
+    synchronizer.sync()
+    escalator = SubnetEscalator(ip_manager, {4: (24, 4)}, client, synchronizer)
+    return escalator, synchronizer
+
+
+def test_escalation_counts_daemon_blocks_and_keeps_them(fake_ipset, ip_manager, setup):
+    escalator, _ = setup
+    calls = len(fake_ipset.calls)
+
+    stats = escalator.escalate(int(time.time()))
+
+    assert stats['escalated'] == 1
+    assert stats['replaced'] == len(LISTED_IPS)
+    entry = ip_manager.get_blacklist_entry('198.51.100.0/24')
+    sources = [member.get('source') for member in entry[MEMBERS_KEY]]
+    assert sources.count(DAEMON_SOURCE) == len(DAEMON_IPS)
+    assert set(fake_ipset.members(TEMPORARY)) == {'198.51.100.0/24', *DAEMON_IPS}
+    assert set(fake_ipset.members(PERMANENT)) == {'203.0.113.7'}
+    # One save and one restore of only the changed members, no full sync
+    assert [call[0] for call in fake_ipset.calls[calls:]] == ['save', 'save', 'restore']
+
+    # Daemon blocks already inside the prefix are not folded in again
+    stats = escalator.escalate(int(time.time()))
+    assert stats['folded'] == 0 and stats['replaced'] == 0
+
+
+def test_restore_escalated_skips_daemon_members(fake_ipset, ip_manager, setup):
+    escalator, synchronizer = setup
+    now = int(time.time())
+    escalator.escalate(now)
+
+    engine = UnjailEngine(ip_manager, escalator.ipset, synchronizer=synchronizer)
+    restored = engine.restore_escalated(['198.51.100.0/24'], now)
+
+    assert restored == len(LISTED_IPS)
+    assert set(fake_ipset.members(TEMPORARY)) == {'198.51.100.0/24', *DAEMON_IPS, *LISTED_IPS}
+    for ip_address in DAEMON_IPS:
+        assert ip_manager.get_blacklist_entry(ip_address) is None
+    assert set(fake_ipset.members(PERMANENT)) == {'203.0.113.7'}
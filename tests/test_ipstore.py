@@ -0,0 +1,69 @@
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""Containment lookups of the SQLite IP store"""
+
+import random
+import ipaddress
+
+import pytest
+
+from ukabu.ipstore import SQLiteIPStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteIPStore(tmp_path / 'iplists.db')
+    yield store
+    store.close()
+
+
+def most_specific(networks, ip_address):
+    address = ipaddress.ip_address(ip_address)
+    matches = [n for n in map(ipaddress.ip_network, networks) if address in n]
+    return str(max(matches, key=lambda n: n.prefixlen)) if matches else None
+
+
+def test_covering_matches_brute_force(store):
+    rng = random.Random(7)
+    networks = ['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24', '10.1.2.3/32',
+                '2001:db8::/32', '2001:db8:1::/48', '2001:db8:1::5/128']
+    for _ in range(300):
+        prefixlen = rng.choice([12, 20, 24, 28, 32])
+        address = ipaddress.ip_address(rng.getrandbits(32))
+        networks.append(str(ipaddress.ip_network(f"{address}/{prefixlen}", strict=False)))
+    networks = list(dict.fromkeys(networks))
+    store.apply_blacklist_ops({'op': 'add', 'entry': {'ip_address': n, 'lockout_period': 0}} for n in networks)
+    store.replace_whitelist(networks)
+
+    probes = ['10.1.2.3', '10.1.2.4', '10.1.3.1', '10.200.0.1', '11.0.0.1',
+              '2001:db8:1::5', '2001:db8:1::6', '2001:db8:2::1', '2001:db9::1', 'not-an-ip']
+    probes += [str(ipaddress.ip_address(rng.getrandbits(32))) for _ in range(300)]
+    for ip_address in probes:
+        expected = most_specific(networks, ip_address) if ip_address != 'not-an-ip' else None
+        entry = store.find_blacklist_covering(ip_address)
+        assert (entry['ip_address'] if entry else None) == expected, ip_address
+        assert store.find_whitelist_covering(ip_address) == expected, ip_address
+
+
+def test_covering_sees_new_prefix_lengths(store):
+    store.apply_blacklist_ops([{'op': 'add', 'entry': {'ip_address': '10.0.0.0/8'}}])
+    assert store.find_blacklist_covering('10.1.2.3')['ip_address'] == '10.0.0.0/8'
+
+    store.apply_blacklist_ops([{'op': 'add', 'entry': {'ip_address': '10.1.2.0/24'}}])
+    assert store.find_blacklist_covering('10.1.2.3')['ip_address'] == '10.1.2.0/24'
+
+    store.apply_blacklist_ops([{'op': 'remove', 'ip_address': '10.1.2.0/24'}])
+    assert store.find_blacklist_covering('10.1.2.3')['ip_address'] == '10.0.0.0/8'
+
+
+def test_covering_queries_use_indexes(store):
+    plans = [
+        "SELECT entry FROM blacklist WHERE family = 4 AND range_start = 1 AND range_end = 1 LIMIT 1",
+        "SELECT MAX(prefixlen) FROM blacklist WHERE family = 4 AND prefixlen < 33",
+    ]
+    for query in plans:
+        detail = ' '.join(row[-1] for row in store.conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+        assert detail.startswith('SEARCH blacklist USING'), detail
@@ -0,0 +1,149 @@
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""Blacklist to ipset sync against a fake ipset and daemon database"""
+
+import time
+import sqlite3
+
+import pytest
+
+from ukabu.ipset import IPSetClient
+from ukabu.ipsync import IPSetSynchronizer, read_daemon_blocks
+
+PERMANENT = 'ukabu-permanent'
+TEMPORARY = 'ukabu-temporary_0'
+
+
+def make_daemon_db(path, rows):
+    """blocked_ips table as written by ukabu-trackerd"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE blocked_ips (
+            ip TEXT PRIMARY KEY, domain TEXT, blocked_at TIMESTAMP,
+            lockout_expires TIMESTAMP, reason TEXT, ipset_name TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO blocked_ips (ip, lockout_expires, ipset_name) VALUES (?, ?, ?)", rows
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def synchronizer(fake_ipset, ip_manager, tmp_path):
+    return IPSetSynchronizer(
+        ip_manager,
+        IPSetClient(binary=fake_ipset.binary),
+        state_path=tmp_path / 'ipset_sync.json',
+        daemon_db=tmp_path / 'strikes.db'
+    )
+
+
+def test_sync_keeps_members_it_did_not_add(fake_ipset, ip_manager, synchronizer):
+    # Strike blocks the daemon put in the sets; not in ip_blacklist.conf
+    fake_ipset.create(PERMANENT, members=['198.51.100.9'])
+    fake_ipset.create(TEMPORARY, members=['203.0.113.50'])
+    ip_manager.add_to_blacklist('192.0.2.1', 0, 'test')
+    ip_manager.add_to_blacklist('192.0.2.2', 60, 'test')
+
+    stats = synchronizer.sync()
+
+    assert stats['removed'] == 0
+    assert set(fake_ipset.members(PERMANENT)) == {'198.51.100.9', '192.0.2.1'}
+    assert set(fake_ipset.members(TEMPORARY)) == {'203.0.113.50', '192.0.2.2'}
+
+    # Entries removed from the blacklist go; the daemon's stay
+    ip_manager.remove_from_blacklist('192.0.2.1')
+    ip_manager.remove_from_blacklist('192.0.2.2')
+    stats = synchronizer.sync()
+
+    assert stats['removed'] == 2
+    assert set(fake_ipset.members(PERMANENT)) == {'198.51.100.9'}
+    assert set(fake_ipset.members(TEMPORARY)) == {'203.0.113.50'}
+
+
+def test_sync_keeps_daemon_blocks_it_added_too(fake_ipset, ip_manager, synchronizer, tmp_path):
+    now = int(time.time())
+    make_daemon_db(tmp_path / 'strikes.db', [
+        ('203.0.113.50', '2099-01-01 00:00:00+00:00', TEMPORARY),
+        ('203.0.113.51', '2000-01-01 00:00:00+00:00', TEMPORARY),
+    ])
+    fake_ipset.create(TEMPORARY)
+    ip_manager.add_to_blacklist('203.0.113.50', 60, 'test')
+    ip_manager.add_to_blacklist('203.0.113.51', 60, 'test')
+    synchronizer.sync(now)
+
+    ip_manager.remove_from_blacklist('203.0.113.50')
+    ip_manager.remove_from_blacklist('203.0.113.51')
+    stats = synchronizer.sync(now)
+
+    # The daemon still blocks .50; its .51 block has expired
+    assert stats['removed'] == 1
+    assert set(fake_ipset.members(TEMPORARY)) == {'203.0.113.50'}
+
+
+def test_first_sync_deletes_nothing(fake_ipset, ip_manager, synchronizer):
+    fake_ipset.create(TEMPORARY, members=['203.0.113.50', '203.0.113.51'])
+
+    stats = synchronizer.sync()
+
+    assert stats['removed'] == 0
+    assert set(fake_ipset.members(TEMPORARY)) == {'203.0.113.50', '203.0.113.51'}
+
+
+def test_dry_run_keeps_no_record(fake_ipset, ip_manager, tmp_path):
+    fake_ipset.create(TEMPORARY)
+    ip_manager.add_to_blacklist('192.0.2.2', 60, 'test')
+    synchronizer = IPSetSynchronizer(
+        ip_manager, IPSetClient(binary=fake_ipset.binary, dry_run=True),
+        state_path=tmp_path / 'ipset_sync.json', daemon_db=tmp_path / 'strikes.db'
+    )
+
+    assert synchronizer.sync()['added'] == 1
+    assert not (tmp_path / 'ipset_sync.json').exists()
+    assert fake_ipset.members(TEMPORARY) == {}
+
+
+def test_read_daemon_blocks(tmp_path):
+    make_daemon_db(tmp_path / 'strikes.db', [
+        ('203.0.113.50', '2026-01-01 00:00:00.123456789+00:00', TEMPORARY),
+        ('203.0.113.52', None, PERMANENT),
+        ('not-an-ip', None, PERMANENT),
+    ])
+
+    blocks = read_daemon_blocks(tmp_path / 'strikes.db')
+
+    assert blocks == {'203.0.113.50': 1767225600, '203.0.113.52': None}
+    assert read_daemon_blocks(tmp_path / 'missing.db') == {}
+
+
+def test_migrate_timeouts_keeps_unknown_members(fake_ipset, ip_manager, synchronizer, tmp_path):
+    now = int(time.time())
+    make_daemon_db(tmp_path / 'strikes.db', [
+        ('203.0.113.51', '2000-01-01 00:00:00+00:00', TEMPORARY),
+        ('203.0.113.52', '2099-01-01 00:00:00+00:00', TEMPORARY),
+    ])
+    ip_manager.add_to_blacklist('192.0.2.2', 60, 'test')
+    ip_manager.add_to_blacklist('192.0.2.3', 0, 'test')
+    fake_ipset.create(TEMPORARY, members=[
+        '192.0.2.2',      # blacklisted for an hour
+        '192.0.2.3',      # permanently blacklisted
+        '203.0.113.50',   # unknown
+        '203.0.113.51',   # daemon block, expired
+        '203.0.113.52',   # daemon block, active
+    ])
+
+    stats = synchronizer.migrate_timeouts(now, default_lockout=30)
+
+    assert stats == {'sets': 1, 'migrated': 4, 'dropped': 1, 'capped': 1, 'defaulted': 1}
+    members = fake_ipset.members(TEMPORARY)
+    assert 'timeout' in fake_ipset.sets()[TEMPORARY]['options']
+    assert 3500 < members['192.0.2.2'] <= 3600
+    assert members['192.0.2.3'] == 0
+    assert members['203.0.113.50'] == 30 * 60
+    assert '203.0.113.51' not in members
+    assert members['203.0.113.52'] > 0
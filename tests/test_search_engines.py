@@ -0,0 +1,164 @@
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""Search engine verification against a stub resolver (no network)"""
+
+import json
+import socket
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+from ukabu.search_engines import SearchEngineDetector, BingVerificationCache
+
+BING = {'engine': 'Bing', 'method': 'reverse_dns'}
+GOOGLE = {'engine': 'Google', 'method': 'ip_whitelist'}
+
+
+class StubResolver:
+    """Answers from dicts and counts lookups"""
+
+    def __init__(self, ptr, addresses):
+        self.ptr = ptr
+        self.addresses = addresses
+        self.reverse_calls = []
+        self._lock = threading.Lock()
+
+    def reverse(self, ip):
+        with self._lock:
+            self.reverse_calls.append(ip)
+        if ip not in self.ptr:
+            raise socket.herror(1, 'Unknown host')
+        return self.ptr[ip]
+
+    def forward(self, hostname):
+        return self.addresses.get(hostname, [])
+
+
+@pytest.fixture
+def resolver():
+    return StubResolver(
+        ptr={
+            '157.55.39.1': 'msnbot-157-55-39-1.search.msn.com',
+            '157.55.39.2': 'msnbot-157-55-39-2.search.msn.com',
+            '203.0.113.5': 'crawler.search.msn.com.example.net',
+            '2620:1ec:c::10': 'msnbot-2620-1ec-c--10.search.msn.com',
+        },
+        addresses={
+            # Multi-address answer: the IP only has to be one of them
+            'msnbot-157-55-39-1.search.msn.com': ['157.55.39.200', '157.55.39.1'],
+            # Forward lookup does not confirm the PTR record
+            'msnbot-157-55-39-2.search.msn.com': ['198.51.100.1'],
+            'crawler.search.msn.com.example.net': ['203.0.113.5'],
+            'msnbot-2620-1ec-c--10.search.msn.com': ['2620:1ec:c:0:0:0:0:10'],
+        },
+    )
+
+
+@pytest.fixture
+def detector(tmp_path, resolver):
+    google = tmp_path / 'google.conf'
+    google.write_text("# Google\n66.249.64.0/19\n2001:4860:4801::/48\n")
+    return SearchEngineDetector(
+        google_config=str(google),
+        bing_cache=str(tmp_path / 'bing_cache.json'),
+        resolver=resolver,
+    )
+
+
+def test_verify_many_classifies_each_ip(detector, resolver):
+    results = detector.verify_many([
+        '157.55.39.1',      # PTR + forward confirmed
+        '157.55.39.2',      # forward does not contain the IP
+        '203.0.113.5',      # hostname only contains the Bing suffix
+        '192.0.2.9',        # no PTR record
+        '2620:1ec:c::10',   # IPv6, forward answer in another notation
+        '66.249.66.1',      # Google range, no DNS needed
+    ], concurrency=4)
+
+    assert results == {
+        '157.55.39.1': BING,
+        '157.55.39.2': None,
+        '203.0.113.5': None,
+        '192.0.2.9': None,
+        '2620:1ec:c::10': BING,
+        '66.249.66.1': GOOGLE,
+    }
+    assert '66.249.66.1' not in resolver.reverse_calls
+
+
+def test_verify_many_resolves_each_ip_once(detector, resolver):
+    detector.verify_many(['157.55.39.1', ' 157.55.39.1', '157.55.39.1', '', '192.0.2.9'])
+    assert sorted(resolver.reverse_calls) == ['157.55.39.1', '192.0.2.9']
+
+    # Positive and negative results are answered from the cache
+    again = detector.verify_many(['157.55.39.1', '192.0.2.9'])
+    assert again == {'157.55.39.1': BING, '192.0.2.9': None}
+    assert len(resolver.reverse_calls) == 2
+
+
+def test_verify_many_persists_cache(detector, tmp_path):
+    detector.verify_many(['157.55.39.1', '192.0.2.9'])
+
+    with open(tmp_path / 'bing_cache.json') as f:
+        cached = json.load(f)
+    assert cached['157.55.39.1']['verified'] is True
+    assert cached['192.0.2.9']['verified'] is False
+
+
+def test_cache_flush_merges_other_writers(tmp_path):
+    path = str(tmp_path / 'bing_cache.json')
+    first = BingVerificationCache(path)
+    second = BingVerificationCache(path)
+    first.set('157.55.39.1', True)
+    first.set('157.55.39.3', False)
+    second.set('157.55.39.2', True)
+    second.set('157.55.39.3', True)    # newer result for the same IP
+
+    assert first.flush() and second.flush()
+    first.set('157.55.39.4', True)
+    assert first.flush()
+
+    with open(path) as f:
+        cached = json.load(f)
+    assert {ip: entry['verified'] for ip, entry in cached.items()} == {
+        '157.55.39.1': True, '157.55.39.2': True, '157.55.39.3': True, '157.55.39.4': True,
+    }
+    assert sorted(first.verified_ips()) == sorted(cached)
+
+    assert second.clear() == 3
+    with open(path) as f:
+        assert json.load(f) == {}
+
+
+def test_verify_matches_verify_many(detector):
+    for ip in ('157.55.39.1', '157.55.39.2', '66.249.66.1'):
+        fresh = SearchEngineDetector(
+            google_config=detector.google_config,
+            bing_cache=detector.bing_cache + '.single',
+            resolver=detector.resolver,
+        )
+        assert fresh.verify(ip) == detector.verify_many([ip])[ip]
+
+
+def test_cli_compiles_and_loads_search_engines(cli, detector, fake_ipset, tmp_path, monkeypatch):
+    detector.bing_verifications.set('157.55.39.1', True)
+    detector.bing_verifications.flush()
+    monkeypatch.setattr(cli, 'SearchEngineDetector', lambda: detector)
+    geo = tmp_path / 'search_engines_generated.conf'
+    restore = tmp_path / 'search_engines.ipset'
+
+    result = CliRunner().invoke(cli.cli, [
+        'nginx', 'compile-search-engines', '--geo-file', str(geo),
+        '--ipset-file', str(restore), '--ipset-binary', fake_ipset.binary
+    ])
+
+    assert result.exit_code == 0, result.output
+    assert '66.249.64.0/19' in geo.read_text()
+    assert '157.55.39.1' in geo.read_text()
+    assert set(fake_ipset.members('ukabu-search-engines')) == {'66.249.64.0/19', '157.55.39.1'}
+    assert set(fake_ipset.members('ukabu-search-engines-v6')) == {'2001:4860:4801::/48'}
+    assert fake_ipset.calls == [['restore', '-exist']]
@@ -0,0 +1,128 @@
+# Copyright (c) 2025 by L2C2 Technologies. All rights reserved.
+#
+# For licensing inquiries, contact:
+# Indranil Das Gupta <indradg@l2c2.co.in>
+
+"""ipset save/restore and the unjail engine against a fake ipset"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from ukabu import ipmanager
+from ukabu.ipset import IPSetClient
+from ukabu.scheduler import ExpiryScheduler
+from ukabu.unjail import UnjailEngine
+
+NOW = 1_800_000_000
+
+
+def iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def block(ip_address, minutes_ago, lockout):
+    """Blacklist record blocked `minutes_ago` before NOW"""
+    return {'ip_address': ip_address, 'timestamp': iso(NOW - minutes_ago * 60),
+            'lockout_period': lockout, 'reason': 'test'}
+
+
+def test_save_parses_sets(fake_ipset):
+    fake_ipset.create('ukabu-permanent', 'family inet hashsize 1024 maxelem 50000', ['192.0.2.1'])
+    fake_ipset.create('ukabu-temporary_0', 'family inet maxelem 20000 timeout 0',
+                      [('198.51.100.7', 600), ('198.51.100.0/28', 60)])
+
+    sets = IPSetClient(binary=fake_ipset.binary).save()
+
+    assert sets['ukabu-permanent']['maxelem'] == 50000
+    assert sets['ukabu-permanent']['timeout'] is False
+    assert sets['ukabu-permanent']['members'] == {'192.0.2.1'}
+    assert sets['ukabu-temporary_0']['maxelem'] == 20000
+    assert sets['ukabu-temporary_0']['timeout'] is True
+    assert sets['ukabu-temporary_0']['members'] == {'198.51.100.7', '198.51.100.0/28'}
+
+
+def test_restore_is_one_transaction(fake_ipset):
+    fake_ipset.create('ukabu-temporary_0', members=['198.51.100.1', '198.51.100.2'])
+    client = IPSetClient(binary=fake_ipset.binary)
+
+    applied = client.restore([
+        'del ukabu-temporary_0 198.51.100.1',
+        'add ukabu-temporary_0 198.51.100.2',   # already present: -exist
+        'add ukabu-temporary_0 203.0.113.9',
+        '',
+    ])
+
+    assert applied == 3
+    assert set(fake_ipset.members('ukabu-temporary_0')) == {'198.51.100.2', '203.0.113.9'}
+    assert fake_ipset.calls == [['restore', '-exist']]
+    assert client.restore([]) == 0
+    assert len(fake_ipset.calls) == 1
+
+
+def test_restore_dry_run_and_errors(fake_ipset):
+    fake_ipset.create('ukabu-temporary_0', members=['198.51.100.1'])
+
+    IPSetClient(binary=fake_ipset.binary, dry_run=True).restore(['del ukabu-temporary_0 198.51.100.1'])
+    assert fake_ipset.calls == []
+
+    with pytest.raises(RuntimeError, match='ipset restore failed'):
+        IPSetClient(binary=fake_ipset.binary).restore(['add ukabu-missing 198.51.100.1'])
+    with pytest.raises(RuntimeError, match='not found'):
+        IPSetClient(binary='/nonexistent/ipset').save()
+
+
+def test_unjail_releases_expired_blocks(fake_ipset, ip_manager):
+    ip_manager.bulk_add([
+        block('198.51.100.1', minutes_ago=120, lockout=60),   # expired
+        block('198.51.100.2', minutes_ago=10, lockout=60),    # active
+        block('198.51.100.3', minutes_ago=120, lockout=60),   # expired, not in any set
+        block('192.0.2.1', minutes_ago=9999, lockout=0),      # permanent
+    ])
+    fake_ipset.create('ukabu-temporary_0', members=['198.51.100.1', '198.51.100.2'])
+    fake_ipset.create('ukabu-temporary_1', members=['198.51.100.1'])
+    fake_ipset.create('ukabu-permanent', 'maxelem 50000', ['192.0.2.1'])
+
+    stats = UnjailEngine(ip_manager, IPSetClient(binary=fake_ipset.binary)).run(now=NOW)
+
+    assert stats['expired'] == 2
+    assert stats['kept'] == 1
+    assert stats['permanent'] == 1
+    assert stats['ipset_removed'] == 2
+    assert stats['ipset_missing'] == 1
+    assert set(fake_ipset.members('ukabu-temporary_0')) == {'198.51.100.2'}
+    assert fake_ipset.members('ukabu-temporary_1') == {}
+    assert set(fake_ipset.members('ukabu-permanent')) == {'192.0.2.1'}
+    assert sorted(e['ip_address'] for e in ip_manager.get_blacklist()) == ['192.0.2.1', '198.51.100.2']
+    assert [call[0] for call in fake_ipset.calls].count('restore') == 1
+
+
+def test_unjail_leaves_timeout_sets_to_the_kernel(fake_ipset, ip_manager):
+    ip_manager.bulk_add([block('198.51.100.1', minutes_ago=120, lockout=60)])
+    fake_ipset.create('ukabu-temporary_0', 'maxelem 20000 timeout 0', [('198.51.100.1', 5)])
+
+    stats = UnjailEngine(ip_manager, IPSetClient(binary=fake_ipset.binary)).run(now=NOW)
+
+    assert stats['expired'] == 1
+    assert stats['ipset_removed'] == 0
+    assert '198.51.100.1' in fake_ipset.members('ukabu-temporary_0')
+    assert ip_manager.get_blacklist() == []
+
+
+def test_scheduler_recompiles_geo_includes(fake_ipset, ip_manager, tmp_path, monkeypatch):
+    geo = tmp_path / 'ip_blacklist_generated.conf'
+    monkeypatch.setattr(ipmanager, 'IP_WHITELIST_GEO', tmp_path / 'ip_whitelist_generated.conf')
+    monkeypatch.setattr(ipmanager, 'IP_BLACKLIST_GEO', geo)
+    ip_manager.bulk_add([
+        block('198.51.100.1', minutes_ago=120, lockout=60),
+        block('198.51.100.2', minutes_ago=10, lockout=60),
+    ])
+    ip_manager.compile_geo_includes()
+    fake_ipset.create('ukabu-temporary_0', members=['198.51.100.1', '198.51.100.2'])
+    engine = UnjailEngine(ip_manager, IPSetClient(binary=fake_ipset.binary))
+    scheduler = ExpiryScheduler(engine, export_interval=0, clock=lambda: NOW)
+
+    assert scheduler.tick() == 1
+
+    assert '198.51.100.1' not in geo.read_text()
+    assert '198.51.100.2' in geo.read_text()